@@ -0,0 +1,73 @@
+# benchmarks/bench_bulk_edit.py
+"""Repricing many products: one UPDATE per product (the old cell-by-cell path) vs. catalog_bulk.
+
+Usage: python benchmarks/bench_bulk_edit.py [--products 200000] [--target 50000] [--legacy-sample 2000]
+The target is every product in one category (--target of them). The
+per-product loop runs --legacy-sample products and is scaled; it leaves
+out the clicking and reloads it used to take.
+"""
+import argparse
+import time
+
+from bench_utils import temp_database, populate_catalog, print_table
+import database
+from database import execute_query, fetch_all
+from catalog_bulk import reassign, reprice, set_tax_type
+from catalog_grid import CatalogQuery
+from catalog_index import catalog_index
+
+
+def per_product(ids):
+    for pid, price in fetch_all(f"SELECT id, selling_price FROM products WHERE id IN ({','.join('?' * len(ids))})",
+                                ids):
+        new_price = round(price * 1.05, 2)
+        execute_query("UPDATE products SET selling_price = ? WHERE id = ?", (new_price, pid))
+        execute_query("INSERT INTO price_history (product_id, selling_price, updated_by) VALUES (?, ?, ?)",
+                      (pid, new_price, 1))
+        catalog_index.refresh([pid])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    parser.add_argument("--target", type=int, default=50000)
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            populate_catalog(conn, args.products)
+            conn.execute("INSERT INTO categories (name) VALUES ('Bench Target')")
+            target_category = conn.execute("SELECT id FROM categories WHERE name = 'Bench Target'").fetchone()[0]
+            supplier = conn.execute("INSERT INTO suppliers (name) VALUES ('Bench Supplier')").lastrowid
+            conn.execute("UPDATE products SET category_id = ? WHERE id % ? = 0",
+                         (target_category, args.products // args.target))
+            conn.commit()
+            conn.execute("ANALYZE")
+        catalog_index.ensure_loaded()
+        query = CatalogQuery(category_id=target_category)
+        matched = query.count()
+
+        sample = [row[0] for row in fetch_all(f"{query.ids_sql()[0]} LIMIT ?", query.ids_sql()[1] + [args.legacy_sample])]
+        start = time.perf_counter()
+        per_product(sample)
+        legacy = (time.perf_counter() - start) * matched / len(sample)
+
+        results = [("Per-product UPDATE + history (scaled)", f"{legacy:,.1f}", "-")]
+        for label, run in [("reprice +5% (filter)", lambda: reprice(query, percent=5, updated_by=1)),
+                           ("reprice -10.00 (filter)", lambda: reprice(query, amount=-10, updated_by=1)),
+                           ("reprice cost +5% (filter)", lambda: reprice(query, percent=5, field="cost_price")),
+                           ("reassign supplier (filter)", lambda: reassign(query, supplier_id=supplier)),
+                           ("switch tax type (filter)", lambda: set_tax_type(query, "inclusive")),
+                           (f"reprice +5% ({args.legacy_sample:,} selected ids)",
+                            lambda: reprice(sample, percent=5, updated_by=1))]:
+            start = time.perf_counter()
+            result = run()
+            results.append((label, f"{time.perf_counter() - start:,.2f}", f"{result['changed']:,}"))
+
+    print_table(f"Bulk edits, {matched:,} of {args.products:,} products in the filter (seconds)",
+                ("Operation", "Seconds", "Changed"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_catalog_index.py
+"""Scans/sec for the in-memory catalog index vs. the POS barcode SQL query.
+
+Usage: python benchmarks/bench_catalog_index.py [--products 850000] [--scans 200000]
+(850k products with 20% Size variants is ~1M distinct barcodes.)
+"""
+import argparse
+import random
+import resource
+import tracemalloc
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+from bench_indexes import POS_BARCODE_QUERY
+import database
+from catalog_index import CatalogIndex
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=850000)
+    parser.add_argument("--scans", type=int, default=200000)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            print(f"Populating {args.products:,} products...")
+            populate_catalog(conn, args.products)
+
+        rng = random.Random(3)
+        barcodes = [f"{8900000000000 + rng.randint(1, args.products)}" for _ in range(args.scans)]
+
+        rss_before = rss_mb()
+        tracemalloc.start()
+        index = CatalogIndex()
+        load_time, _ = timed(index.load)
+        index_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_after = rss_mb()
+
+        mem_time, _ = timed(lambda: [index.lookup(b) for b in barcodes])
+        # The POS query ORs across a join and cannot use an index, so sample it.
+        sql_scans = barcodes[: max(1, min(200, args.scans // 20))]
+        with database.connection_manager.connection() as conn:
+            sql_time, _ = timed(lambda: [conn.execute(POS_BARCODE_QUERY, (b, b)).fetchall() for b in sql_scans])
+
+        print_table(f"Barcode scans ({index.barcode_count:,} barcodes, {len(index):,} products)",
+                    ("Path", "scans/sec", "us/scan"), [
+                        ("In-memory index", f"{len(barcodes) / mem_time:,.0f}", f"{mem_time / len(barcodes) * 1e6:.2f}"),
+                        ("SQLite POS query", f"{len(sql_scans) / sql_time:,.0f}", f"{sql_time / len(sql_scans) * 1e6:.2f}"),
+                    ])
+        print(f"\nIndex load time: {load_time:.2f}s")
+        print(f"Index memory (tracemalloc): {index_bytes / 1024 / 1024:.1f} MB")
+        print(f"Peak RSS growth during load: {rss_after - rss_before:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
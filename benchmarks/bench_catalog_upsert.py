@@ -0,0 +1,96 @@
+# benchmarks/bench_catalog_upsert.py
+"""Re-importing a price list: per-row lookup + UPDATE/INSERT vs. the staging-table merge.
+
+Usage: python benchmarks/bench_catalog_upsert.py [--rows 100000] [--new 0.1] [--changed 0.2] [--legacy-sample 5000]
+The catalogue starts with --rows products; the re-import file holds the
+same number of rows, a --new fraction of them new barcodes and a --changed
+fraction of the rest with new prices. Rows are passed in memory so only the
+merge is timed. The per-row loop runs --legacy-sample rows and is scaled.
+"""
+import argparse
+import random
+import time
+
+from bench_utils import temp_database, print_table
+from database import execute_query, fetch_one
+from catalog_import import import_rows, summary_text
+
+POSITIONS = {"Name": 0, "Barcode": 1, "Cost": 2, "Sale": 3, "Stock": 4}
+
+
+def catalogue(rows, seed=3):
+    rng = random.Random(seed)
+    return [(f"Product {n}", str(8800000000000 + n), cost, round(cost * 1.2, 2), rng.randint(0, 500))
+            for n, cost in ((n, round(rng.uniform(10, 2000), 2)) for n in range(rows))]
+
+
+def price_list(existing, new_share, changed_share, seed=4):
+    rng = random.Random(seed)
+    n_new = int(len(existing) * new_share)
+    rows = []
+    for name, barcode, cost, sale, stock in existing[n_new:]:
+        if rng.random() < changed_share:
+            cost, sale = round(cost * 1.05, 2), round(sale * 1.05, 2)
+        rows.append((name, barcode, cost, sale, stock))
+    rows += [(f"New Product {n}", str(9900000000000 + n), 50.0, 60.0, 10) for n in range(n_new)]
+    rng.shuffle(rows)
+    return rows
+
+
+def per_row_upsert(rows):
+    """What a straightforward upsert in the old import loop would do: one lookup and one write per row."""
+    counts = {"imported": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+    for name, barcode, cost, sale, stock in rows:
+        found = fetch_one("SELECT id, cost_price, selling_price, stock FROM products WHERE barcode = ?", (barcode,))
+        if found is None:
+            execute_query("""
+                INSERT INTO products (name, barcode, tax_id, base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
+                VALUES (?, ?, 1, 1, 1, ?, ?, ?)
+            """, (name, barcode, cost, sale, stock))
+            counts["imported"] += 1
+        elif tuple(found[1:]) != (cost, sale, stock):
+            execute_query("UPDATE products SET cost_price = ?, selling_price = ?, stock = ? WHERE id = ?",
+                          (cost, sale, stock, found[0]))
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--new", type=float, default=0.1)
+    parser.add_argument("--changed", type=float, default=0.2)
+    parser.add_argument("--legacy-sample", type=int, default=5000)
+    args = parser.parse_args()
+
+    existing = catalogue(args.rows)
+    rows = price_list(existing, args.new, args.changed)
+    results = []
+
+    with temp_database():
+        import_rows(existing, POSITIONS)
+        sample = rows[:args.legacy_sample]
+        started = time.perf_counter()
+        counts = per_row_upsert(sample)
+        seconds = (time.perf_counter() - started) * len(rows) / len(sample)
+        results.append((f"Per-row SELECT + UPDATE/INSERT (scaled from {len(sample):,})", f"{seconds:.1f}",
+                        f"{len(rows) / seconds:,.0f}", f"sample: {summary_text(counts)}"))
+
+    for key in ("Barcode", "Name"):
+        with temp_database():
+            import_rows(existing, POSITIONS)
+            stats = import_rows(rows, POSITIONS, mode="upsert", key=key)
+            results.append((f"Staging-table merge on {key}, 5,000-row chunks", f"{stats['seconds']:.1f}",
+                            f"{stats['rows_per_sec']:,.0f}", summary_text(stats)))
+            total = fetch_one("SELECT COUNT(*) FROM products")[0]
+            results[-1] += (f"{total:,}",)
+    results[0] += ("",)
+
+    print_table(f"Re-importing {len(rows):,} rows over {args.rows:,} products",
+                ("Importer", "Seconds", "Rows/sec", "Diff", "Products after"), results)
+
+
+if __name__ == "__main__":
+    main()
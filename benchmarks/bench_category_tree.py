@@ -0,0 +1,92 @@
+# benchmarks/bench_category_tree.py
+"""Category tree: the old scan-per-node builder vs. the one-pass adjacency map, and
+"products under category X" via a recursive CTE vs. the closure table.
+
+Usage: python benchmarks/bench_category_tree.py [--categories 500,2000,5000] [--products 200000]
+The builders are timed without Tk: the old one walks the full list for
+every node (as load_categories did), the new one only builds the map and
+the first level the lazy Treeview inserts.
+"""
+import argparse
+import random
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+import database
+from category_tree import SUBTREE_FILTER, CategoryTree, load_tree
+
+CTE_COUNT = """
+    WITH RECURSIVE subtree (id) AS (
+        SELECT ? UNION ALL SELECT c.id FROM categories c JOIN subtree s ON c.parent_id = s.id
+    )
+    SELECT COUNT(*) FROM products p WHERE p.category_id IN (SELECT id FROM subtree)
+"""
+
+
+def old_build(categories):
+    inserted = []
+    for cat in categories:
+        if cat[2] is None:
+            inserted.append(cat[0])
+
+    def insert_children(parent_id):
+        for cat in categories:
+            if cat[2] == parent_id:
+                inserted.append(cat[0])
+                insert_children(cat[0])
+
+    for cat in categories:
+        if cat[2] is None:
+            insert_children(cat[0])
+    return len(inserted)
+
+
+def populate_categories(conn, count, fanout=8, seed=21):
+    rng = random.Random(seed)
+    ids = []
+    for n in range(count):
+        parent = rng.choice(ids[-fanout * 20:]) if ids and n >= fanout else None
+        ids.append(conn.execute("INSERT INTO categories (name, parent_id) VALUES (?, ?)",
+                                (f"Category {n:05d}", parent)).lastrowid)
+    conn.commit()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", default="500,2000,5000")
+    parser.add_argument("--products", type=int, default=200000)
+    args = parser.parse_args()
+
+    build_rows, query_rows = [], []
+    for count in (int(n) for n in args.categories.split(",")):
+        with temp_database():
+            with database.connection_manager.connection() as conn:
+                ids = populate_categories(conn, count)
+                populate_catalog(conn, args.products)
+                rng = random.Random(5)
+                conn.executemany("UPDATE products SET category_id = ? WHERE id = ?",
+                                 [(rng.choice(ids), pid) for pid in range(1, args.products + 1)])
+                conn.commit()
+                conn.execute("ANALYZE")
+            rows = database.fetch_all("SELECT id, name, parent_id, location_tag FROM categories ORDER BY name")
+            old, _ = timed(lambda: old_build(rows), repeat=3)
+            new, _ = timed(lambda: [CategoryTree(rows).roots], repeat=3)
+            loaded, _ = timed(load_tree, repeat=3)
+            build_rows.append((f"{count:,}", f"{old * 1000:,.1f}", f"{new * 1000:.2f}", f"{loaded * 1000:.1f}"))
+
+            # The top-level categories hold the largest subtrees
+            roots = [cid for cid, in database.fetch_all("SELECT id FROM categories WHERE parent_id IS NULL")]
+            cte, _ = timed(lambda: [database.fetch_one(CTE_COUNT, (cid,)) for cid in roots], repeat=3)
+            closure, _ = timed(lambda: [database.fetch_one(f"SELECT COUNT(*) FROM products p WHERE {SUBTREE_FILTER}",
+                                                           (cid,)) for cid in roots], repeat=3)
+            query_rows.append((f"{count:,}", len(roots), f"{cte / len(roots) * 1000:.1f}",
+                               f"{closure / len(roots) * 1000:.1f}"))
+
+    print_table("Building the category tree (ms)",
+                ("Categories", "Scan per node", "Adjacency map", "load_tree incl. query"), build_rows)
+    print_table(f"Products under a top-level category, {args.products:,} products (ms per query)",
+                ("Categories", "Roots", "Recursive CTE", "Closure table"), query_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_forecasting.py
+"""Demand forecasting: per-product Python loop vs. the vectorized forecasting module.
+
+Usage: python benchmarks/bench_forecasting.py [--products 50000] [--days 365] [--density 0.3]
+The rollup is filled directly (no raw sales); the loop is timed on a sample
+of products and scaled to the full catalogue.
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from bench_utils import temp_database, populate_catalog, populate_suppliers, timed, print_table
+import database
+from forecasting import (demand_matrix, moving_average, exp_smoothing, weekday_profile,
+                         expected_demand, safety_stock, forecast_orders)
+
+
+def populate_rollup(conn, n_products, days, density, seed=11):
+    rng = random.Random(seed)
+    end = datetime.now().date()
+    dates = [str(end - timedelta(days=d)) for d in range(days)]
+    rows = []
+    for pid in range(1, n_products + 1):
+        rate = rng.uniform(0.5, 20)
+        for day in dates:
+            if rng.random() < density:
+                qty = float(rng.randint(1, int(rate * 2) + 1))
+                rows.append((day, pid, qty, qty * 100, 0.0, 1))
+        if len(rows) >= 500000:
+            conn.executemany("INSERT INTO daily_product_sales VALUES (?, ?, ?, ?, ?, ?)", rows)
+            rows = []
+    conn.executemany("INSERT INTO daily_product_sales VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def loop_forecast(series, start_weekday, horizon, lead_time, window=28, alpha=0.3, z=1.645):
+    """One product at a time, in plain Python: the same numbers as the seasonal method."""
+    n = len(series)
+    recent = series[-window:]
+    level = sum(recent) / len(recent)
+    mean = sum(series) / n
+    smooth = series[0]
+    for x in series[1:]:
+        smooth = alpha * x + (1 - alpha) * smooth
+    profile = []
+    for day in range(7):
+        values = [series[i] for i in range(n) if (start_weekday + i) % 7 == day]
+        profile.append(sum(values) / len(values) / mean if mean else 1.0)
+    demand = sum(level * profile[(start_weekday + n + h) % 7] for h in range(horizon))
+    sigma = (sum((x - mean) ** 2 for x in series) / (n - 1)) ** 0.5
+    return demand + z * sigma * lead_time ** 0.5, smooth
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--density", type=float, default=0.3, help="share of days with sales")
+    parser.add_argument("--loop-sample", type=int, default=1000)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            print(f"Populating {args.products:,} products x {args.days} days of rollup...")
+            populate_catalog(conn, args.products, variant_ratio=0)
+            populate_suppliers(conn, args.products)
+            populate_rollup(conn, args.products, args.days, args.density)
+            rollup_rows = conn.execute("SELECT COUNT(*) FROM daily_product_sales").fetchone()[0]
+
+        end = datetime.now().date()
+        start = end - timedelta(days=args.days - 1)
+        product_ids = np.arange(1, args.products + 1, dtype=np.int64)
+        load_time, matrix = timed(lambda: demand_matrix(start, end, product_ids), repeat=2)
+
+        rows = np.arange(args.products)
+        horizons = np.full(args.products, 14)
+        lead_times = np.full(args.products, 7)
+        compute = [
+            ("Moving average", lambda: moving_average(matrix)),
+            ("Exponential smoothing", lambda: exp_smoothing(matrix)),
+            ("Weekday profile", lambda: weekday_profile(matrix, start)),
+            ("Seasonal demand (profile + level)", lambda: expected_demand(matrix, start, "seasonal", rows, horizons)),
+            ("Safety stock", lambda: safety_stock(matrix, rows, lead_times)),
+        ]
+        results = [(label, f"{timed(fn, repeat=3)[0] * 1000:.0f}") for label, fn in compute]
+
+        def all_methods():
+            expected_demand(matrix, start, "seasonal", rows, horizons)
+            exp_smoothing(matrix)
+            safety_stock(matrix, rows, lead_times)
+        vector_time, _ = timed(all_methods, repeat=3)
+
+        sample = matrix[:args.loop_sample].tolist()
+        loop_time, _ = timed(lambda: [loop_forecast(s, start.weekday(), 14, 7) for s in sample])
+        loop_full = loop_time * args.products / len(sample)
+        results.append(("All methods, vectorized", f"{vector_time * 1000:.0f}"))
+        results.append((f"All methods, Python loop (scaled from {len(sample):,})", f"{loop_full * 1000:.0f}"))
+        results.append(("Demand matrix load from rollup", f"{load_time * 1000:.0f}"))
+
+        orders_time, items = timed(lambda: forecast_orders(start, end, 7, "seasonal"), repeat=2)
+        results.append(("forecast_orders end to end", f"{orders_time * 1000:.0f}"))
+
+        print_table(f"Forecasting, {args.products:,} products x {args.days} days "
+                    f"({rollup_rows:,} rollup rows) (ms)", ("Step", "Time"), results)
+        print(f"Vectorized vs loop: {loop_full / vector_time:.0f}x; {len(items):,} suggestions")
+
+
+if __name__ == "__main__":
+    main()
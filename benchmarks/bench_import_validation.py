@@ -0,0 +1,65 @@
+# benchmarks/bench_import_validation.py
+"""Cost of the import validation stage: unvalidated vs. in-process vs. process-pool checks.
+
+Usage: python benchmarks/bench_import_validation.py [--rows 200000] [--bad 0.02] [--workers 4]
+A --bad fraction of the CSV rows carry a non-numeric price, a bad barcode
+or a repeated barcode, so the rejected-rows workbook is written too.
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from bench_utils import temp_database, print_table
+from bench_catalog_import import MAPPING, catalog_rows
+from database import execute_query
+from catalog_import import import_catalog
+
+
+def write_dirty_csv(path, rows, bad_share, seed=5):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(MAPPING.values())
+        for n, row in enumerate(catalog_rows(rows)):
+            if rng.random() < bad_share:
+                kind = rng.randrange(3)
+                if kind == 0:
+                    row[8] = "n/a"
+                elif kind == 1:
+                    row[1] = "8.8E+12"
+                else:
+                    row[1] = str(8800000000000 + max(n - 1, 0))
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--bad", type=float, default=0.02)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="store_bench_") as tmpdir:
+        path = os.path.join(tmpdir, "catalog.csv")
+        write_dirty_csv(path, args.rows, args.bad)
+        runs = [("No validation (engine skips what it cannot parse)", dict(validate=False)),
+                ("Validated in-process", dict(workers=1)),
+                (f"Validated on {args.workers} worker processes", dict(workers=args.workers))]
+        for label, options in runs:
+            with temp_database():
+                execute_query("INSERT INTO categories (name) VALUES ('General')")
+                execute_query("INSERT INTO suppliers (name) VALUES ('Default Supplier')")
+                stats = import_catalog(path, MAPPING, **options)
+            results.append((label, f"{stats['seconds']:.1f}", f"{stats['rows_per_sec']:,.0f}",
+                            f"{stats['imported']:,}", f"{stats['skipped']:,}",
+                            "yes" if stats.get("rejected_file") else "-"))
+
+    print_table(f"Importing {args.rows:,} CSV rows, {args.bad:.0%} dirty (cpu_count={os.cpu_count()})",
+                ("Run", "Seconds", "Rows/sec", "Imported", "Skipped", "Rejects workbook"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_indexes.py
+"""Before/after benchmark for the secondary index set (migrations.INDEXES).
+
+Usage: python benchmarks/bench_indexes.py [--products 500000] [--sales 100000]
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from bench_utils import temp_database, populate_catalog, populate_sales, timed, print_table
+import database
+from migrations import create_indexes
+
+POS_BARCODE_QUERY = """
+    SELECT p.id, p.name, p.selling_price, p.stock, p.barcode,
+           pv.variant_value as size
+    FROM products p
+    LEFT JOIN product_variants pv ON p.id = pv.product_id AND pv.variant_name = 'Size'
+    WHERE p.barcode = ? OR p.id IN (
+        SELECT product_id FROM product_variants WHERE barcode = ?
+    )
+"""
+
+PRODUCT_SALES_QUERY = """
+    SELECT SUM(si.quantity) as total_qty, COUNT(DISTINCT DATE(s.created_at)) as sale_days
+    FROM sales s
+    JOIN sale_items si ON s.id = si.sale_id
+    WHERE si.product_id = ?
+    AND DATE(s.created_at) BETWEEN ? AND ?
+    AND s.is_return = 0
+"""
+
+SALE_LINES_QUERY = "SELECT product_id, quantity FROM sale_items WHERE sale_id = ?"
+
+
+def run_workload(conn, n_products, n_sales, lookups):
+    rng = random.Random(1)
+    barcodes = [f"{8900000000000 + rng.randint(1, n_products)}" for _ in range(lookups)]
+    product_ids = [rng.randint(1, n_products) for _ in range(lookups)]
+    sale_ids = [rng.randint(1, n_sales) for _ in range(lookups)]
+    end = datetime.now().date()
+    start = end - timedelta(days=30)
+
+    results = {}
+    results["POS barcode scan"], _ = timed(
+        lambda: [conn.execute(POS_BARCODE_QUERY, (b, b)).fetchall() for b in barcodes])
+    results["Smart Order per-product sales"], _ = timed(
+        lambda: [conn.execute(PRODUCT_SALES_QUERY, (p, start, end)).fetchone() for p in product_ids])
+    results["Sale lines by sale_id"], _ = timed(
+        lambda: [conn.execute(SALE_LINES_QUERY, (s,)).fetchall() for s in sale_ids])
+    return {k: v / lookups * 1000 for k, v in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=500000)
+    parser.add_argument("--sales", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            for name, _ in database.INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {name}")
+            conn.execute("PRAGMA user_version = 0")
+            conn.commit()
+
+            print(f"Populating {args.products:,} products, {args.sales:,} sales x {args.lines} lines...")
+            populate_catalog(conn, args.products)
+            populate_sales(conn, args.sales, args.lines, args.products)
+
+            before = run_workload(conn, args.products, args.sales, args.lookups)
+            build_time, _ = timed(lambda: (create_indexes(conn), conn.execute("ANALYZE")))
+            after = run_workload(conn, args.products, args.sales, args.lookups)
+
+            rows = [(name, f"{before[name]:.3f}", f"{after[name]:.3f}", f"{before[name] / after[name]:.0f}x")
+                    for name in before]
+            print_table(f"Per-query latency in ms ({args.products:,} products)",
+                        ("Query", "Before", "After", "Speedup"), rows)
+            print(f"\nIndex build time: {build_time:.2f}s")
+
+            plan = conn.execute("EXPLAIN QUERY PLAN " + PRODUCT_SALES_QUERY,
+                                (1, "2000-01-01", "2000-01-02")).fetchall()
+            print("Smart Order plan: " + "; ".join(row[-1] for row in plan))
+
+
+if __name__ == "__main__":
+    main()
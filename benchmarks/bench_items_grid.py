@@ -0,0 +1,70 @@
+# benchmarks/bench_items_grid.py
+"""Items grid: loading every product into the Treeview vs. the keyset-paged window.
+
+Usage: python benchmarks/bench_items_grid.py [--sizes 1000,100000,1000000] [--visible 25] [--steps 200]
+"Full load" is the old load_items query fetched and formatted in full (the
+Treeview inserts it then did are not counted, so it is a lower bound).
+"Open" is PagedRows + the first window, count included; "scroll step" is
+the mean of --steps three-row wheel scrolls from the middle of the list;
+"jump" is a scrollbar drag to an arbitrary offset.
+"""
+import argparse
+import random
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+import database
+from catalog_grid import GRID_SQL, SORTS, CatalogQuery, PagedRows, grid_values
+
+
+def full_load():
+    rows = database.fetch_all(GRID_SQL.format(sort=SORTS["Name"]) + " ORDER BY p.name")
+    return [grid_values(row) for row in rows]
+
+
+def open_grid(visible, **filters):
+    rows = PagedRows(CatalogQuery(**filters))
+    rows.window(0, visible)
+    return rows
+
+
+def scroll(rows, visible, steps):
+    top, _ = rows.window(rows.total // 2, visible)
+    for _ in range(steps):
+        top, _ = rows.window(top + 3, visible)
+
+
+def jumps(rows, visible, count=20, seed=9):
+    rng = random.Random(seed)
+    for _ in range(count):
+        rows.window(rng.randrange(rows.total), visible)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--visible", type=int, default=25)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        with temp_database():
+            with database.connection_manager.connection() as conn:
+                populate_catalog(conn, size)
+                conn.execute("UPDATE products SET category_id = 1 + id % 10")
+                conn.commit()
+                conn.execute("ANALYZE")
+            full, _ = timed(full_load)
+            opened, rows = timed(lambda: open_grid(args.visible), repeat=3)
+            filtered, _ = timed(lambda: open_grid(args.visible, category_id=3), repeat=3)
+            scrolled, _ = timed(lambda: scroll(rows, args.visible, args.steps))
+            jumped, _ = timed(lambda: jumps(rows, args.visible))
+            results.append((f"{size:,}", f"{full * 1000:,.0f}", f"{opened * 1000:.1f}", f"{filtered * 1000:.1f}",
+                            f"{scrolled / args.steps * 1000:.2f}", f"{jumped / 20 * 1000:.1f}"))
+
+    print_table(f"Items grid, {args.visible} visible rows (ms)",
+                ("Products", "Full load", "Open", "Open, category filter", "Scroll step", "Jump"), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_journal_replay.py
+"""Sale journal throughput: fsync'd appends, and replaying a backlog into SQLite.
+
+Usage: python benchmarks/bench_journal_replay.py [--sales 100000] [--lines 5] [--appends 2000]
+"""
+import argparse
+import os
+import random
+import time
+
+from bench_utils import temp_database, populate_catalog, print_table
+import database
+from sale_journal import SaleJournal, encode
+from sales_service import make_sale
+
+
+def make_sales(n, lines, n_products, seed=5):
+    rng = random.Random(seed)
+    for i in range(n):
+        cart = [{'id': rng.randint(1, n_products), 'price': 100.0, 'qty': float(rng.randint(1, 3))}
+                for _ in range(lines)]
+        yield make_sale(f"JRNL{i:09d}", "Walk-in Customer", cart, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sales", type=int, default=100000)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--appends", type=int, default=2000, help="fsync'd appends to time")
+    parser.add_argument("--batches", default="100,500,2000")
+    args = parser.parse_args()
+
+    with temp_database() as db_path:
+        with database.connection_manager.connection() as conn:
+            populate_catalog(conn, args.products)
+
+        # Register side: one fsync per sale
+        journal = SaleJournal(os.path.join(os.path.dirname(db_path), "append.journal"))
+        sales = list(make_sales(args.appends, args.lines, args.products, seed=9))
+        started = time.perf_counter()
+        for sale in sales:
+            journal.append(sale)
+        append_time = time.perf_counter() - started
+
+        # Backlog: written without per-record fsync, then replayed at several batch sizes
+        rows = []
+        for batch_size in [int(b) for b in args.batches.split(",")]:
+            path = os.path.join(os.path.dirname(db_path), f"backlog{batch_size}.journal")
+            size = 0
+            with open(path, "wb") as f:
+                for sale in make_sales(args.sales, args.lines, args.products):
+                    sale['invoice_no'] += f"-{batch_size}"
+                    data = encode(sale)
+                    size += len(data)
+                    f.write(data)
+            journal = SaleJournal(path, batch_size=batch_size)
+            started = time.perf_counter()
+            replayed, _ = journal.replay()
+            elapsed = time.perf_counter() - started
+
+            # Replaying the same backlog again must write nothing
+            with open(path, "wb") as f:
+                for sale in make_sales(args.sales, args.lines, args.products):
+                    sale['invoice_no'] += f"-{batch_size}"
+                    f.write(encode(sale))
+            started = time.perf_counter()
+            again, skipped = journal.replay()
+            rerun = time.perf_counter() - started
+            rows.append((batch_size, f"{replayed:,}", f"{replayed / elapsed:,.0f}", f"{elapsed:.1f}",
+                         f"{again}/{skipped:,}", f"{skipped / rerun:,.0f}"))
+
+    print(f"Journal: {size / args.sales:.0f} bytes per {args.lines}-line sale")
+    print(f"Appends: {args.appends / append_time:,.0f} sales/sec with fsync ({append_time / args.appends * 1000:.2f} ms each)")
+    print_table(f"Replay of {args.sales:,} journaled sales",
+                ("Batch", "Replayed", "sales/sec", "Seconds", "Re-replay new/skipped", "skip/sec"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_order_analysis.py
+"""Smart Order on the Tk thread vs. OrderAnalysis in the background.
+
+Usage: python benchmarks/bench_order_analysis.py [--products 20000] [--lines 2000000] [--suppliers 20]
+A stand-in event loop ticks every 10 ms while the analysis runs; the
+longest gap between ticks is how long the window would have been frozen.
+The Smart Order tab keeps its OrderAnalysis (and worker processes) between
+runs, so the timed run is the second one; the first, which spawns the
+pool, is reported as the cold total.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import temp_database, populate_catalog, populate_suppliers, populate_sales, timed, print_table
+import database
+from sales_rollup import rebuild
+from forecasting import forecast_orders
+from order_analysis import OrderAnalysis
+
+
+class TickingRoot:
+    """Minimal after()/after_cancel() loop driven from the main thread."""
+
+    def __init__(self):
+        self.timers = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.timers[self.next_id] = (time.perf_counter() + ms / 1000, func)
+        return self.next_id
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def run_until(self, done, tick_ms=10):
+        """Tick until done(); returns the longest gap between ticks (ms)."""
+        longest, last = 0.0, time.perf_counter()
+        while not done():
+            time.sleep(tick_ms / 1000)
+            now = time.perf_counter()
+            longest = max(longest, (now - last) * 1000 - tick_ms)
+            last = now
+            for timer_id, (due, func) in sorted(self.timers.items(), key=lambda kv: kv[1][0]):
+                if due <= now:
+                    self.timers.pop(timer_id, None)
+                    func()
+        return longest
+
+
+def run_background(start, end, method, workers):
+    root = TickingRoot()
+    first_rows, rows, done = [], [], []
+    began = time.perf_counter()
+
+    def on_rows(items):
+        if not first_rows:
+            first_rows.append(time.perf_counter() - began)
+        rows.extend(items)
+
+    analysis = OrderAnalysis(root, on_rows, on_done=lambda stats, error: done.append(stats), workers=workers)
+    analysis.start(start, end, 7, method)
+    root.run_until(lambda: done)
+    cold = time.perf_counter() - began
+
+    del first_rows[:], rows[:], done[:]
+    began = time.perf_counter()
+    analysis.start(start, end, 7, method)
+    stall = root.run_until(lambda: done)
+    analysis.shutdown()
+    return time.perf_counter() - began, first_rows[0] if first_rows else 0.0, stall, len(rows), cold
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=2000000)
+    parser.add_argument("--lines-per-sale", type=int, default=5)
+    parser.add_argument("--suppliers", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            print(f"Populating {args.products:,} products, {args.lines:,} sale lines...")
+            populate_catalog(conn, args.products, variant_ratio=0)
+            populate_suppliers(conn, args.products, n_suppliers=args.suppliers)
+            populate_sales(conn, args.lines // args.lines_per_sale, args.lines_per_sale, args.products,
+                           days=60, chronological=True)
+            conn.commit()
+        rebuild()
+
+        end = datetime.now().date()
+        start = end - timedelta(days=30)
+        rows = []
+        for method in ("simple", "seasonal"):
+            sync_time, items = timed(lambda: forecast_orders(start, end, 7, method), repeat=2)
+            rows.append((method, "Tk thread (before)", f"{sync_time:.2f}", "-", f"{sync_time:.2f}",
+                         f"{sync_time * 1000:.0f}", f"{len(items):,}"))
+            for workers in (1, args.workers):
+                total, first, stall, count, cold = run_background(start, end, method, workers)
+                label = "OrderAnalysis, coordinator thread" if workers == 1 else f"OrderAnalysis, {workers} processes"
+                rows.append((method, label, f"{total:.2f}", f"{cold:.2f}", f"{first:.2f}", f"{stall:.0f}",
+                             f"{count:,}"))
+
+        print_table(f"Smart Order, 30-day window, {args.products:,} products, {args.suppliers} suppliers",
+                    ("Method", "Runs on", "Total (s)", "Cold total (s)", "First rows (s)", "Longest UI stall (ms)", "Rows"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/bench_po_builder.py
+"""Smart Order "Generate POs": one execute_query per header/line vs. the PO service.
+
+Usage: python benchmarks/bench_po_builder.py [--lines 500 5000] [--suppliers 20]
+"""
+import argparse
+import random
+
+from bench_utils import temp_database, populate_catalog, populate_suppliers, timed, print_table
+import database
+from database import execute_query
+from sequences import next_number
+from purchase_order_service import create_purchase_orders
+
+
+def legacy_generate(lines, user_id=1):
+    """The old SmartOrderTab.generate_pos loop: a commit per header and per line."""
+    po_groups = {}
+    for line in lines:
+        po_groups.setdefault(line['supplier_id'], []).append(line)
+    for sup_id, items in po_groups.items():
+        po_id = execute_query("""
+            INSERT INTO purchase_orders (po_number, supplier_id, total_amount, created_by, status)
+            VALUES (?, ?, ?, ?, 'draft')
+        """, (next_number("PO"), sup_id, sum(i['qty'] * i['cost_price'] for i in items), user_id))
+        for item in items:
+            execute_query("""
+                INSERT INTO po_items (po_id, product_id, quantity_ordered, cost_price)
+                VALUES (?, ?, ?, ?)
+            """, (po_id, item['product_id'], item['qty'], item['cost_price']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--suppliers", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            populate_catalog(conn, max(args.lines), variant_ratio=0)
+            suppliers = populate_suppliers(conn, max(args.lines), n_suppliers=args.suppliers)
+            conn.commit()
+        rng = random.Random(5)
+        rows = []
+        for n in args.lines:
+            lines = [{'supplier_id': rng.choice(suppliers), 'product_id': pid, 'qty': float(rng.randint(1, 50)),
+                      'cost_price': round(rng.uniform(10, 500), 2)} for pid in range(1, n + 1)]
+            legacy_time, _ = timed(lambda: legacy_generate(lines))
+            service_time, summary = timed(lambda: create_purchase_orders(lines, 1), repeat=3)
+            rows.append((f"{n:,}", f"{summary['po_count']}", f"{legacy_time * 1000:.0f}",
+                         f"{service_time * 1000:.1f}", f"{legacy_time / service_time:.0f}x"))
+
+        print_table(f"Generate POs ({args.suppliers} suppliers) (ms)",
+                    ("Lines", "POs", "execute_query per row", "PO service (1 transaction)", "Speedup"), rows)
+
+
+if __name__ == "__main__":
+    main()
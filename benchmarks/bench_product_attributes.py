@@ -0,0 +1,96 @@
+# benchmarks/bench_product_attributes.py
+"""Variant/Size per product: correlated product_variants subqueries vs. the product_attributes join.
+
+Usage: python benchmarks/bench_product_attributes.py [--products 500000] [--variant-ratio 0.4] [--lookups 2000]
+Times the full items-grid read, 100-row keyset grid pages at random keys, the
+item properties read (three fetch_one calls before, one join now) and the
+write-side cost: adding one Variant row per product for --lookups products.
+"""
+import argparse
+import random
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+import database
+from catalog_grid import GRID_SQL, SORTS
+
+OLD_GRID_SQL = GRID_SQL.replace("""        a.variant,
+        a.size,""", """        (SELECT pv1.variant_value FROM product_variants pv1 WHERE pv1.product_id = p.id AND pv1.variant_name = 'Variant' LIMIT 1) AS variant,
+        (SELECT pv2.variant_value FROM product_variants pv2 WHERE pv2.product_id = p.id AND pv2.variant_name = 'Size' LIMIT 1) AS size,""").replace(
+    "    LEFT JOIN product_attributes a ON a.product_id = p.id\n", "")
+
+
+def grid(sql, keys=None):
+    sql = sql.format(sort=SORTS["Name"])
+    if keys is None:
+        return len(database.fetch_all(sql + " ORDER BY p.name, p.id"))
+    # Keyset pages, as CatalogQuery reads them
+    return sum(len(database.fetch_all(sql + " WHERE (p.name, p.id) >= (?, ?) ORDER BY p.name, p.id LIMIT 100", key))
+               for key in keys)
+
+
+def old_properties(ids):
+    for pid in ids:
+        database.fetch_one("SELECT id, name, company, category_id, cost_price, selling_price, gst_rate, tax_type "
+                           "FROM products WHERE id = ?", (pid,))
+        database.fetch_one("SELECT variant_value FROM product_variants WHERE product_id = ? "
+                           "AND variant_name = 'Variant' LIMIT 1", (pid,))
+        database.fetch_one("SELECT variant_value FROM product_variants WHERE product_id = ? "
+                           "AND variant_name = 'Size' LIMIT 1", (pid,))
+
+
+def new_properties(ids):
+    for pid in ids:
+        database.fetch_one("""
+            SELECT p.id, p.name, p.company, c.name, p.cost_price, p.selling_price, p.gst_rate, p.tax_type,
+                   a.variant, a.size, u.name
+            FROM products p
+            LEFT JOIN categories c ON c.id = p.category_id
+            LEFT JOIN product_attributes a ON a.product_id = p.id
+            LEFT JOIN uoms u ON u.id = p.base_uom_id
+            WHERE p.id = ?
+        """, (pid,))
+
+
+def add_variants(ids, triggers):
+    with database.connection_manager.connection() as conn:
+        conn.execute("BEGIN")
+        if not triggers:
+            conn.execute("DROP TRIGGER trg_variants_attributes_ins")
+        conn.executemany("INSERT INTO product_variants (product_id, variant_name, variant_value) VALUES (?, 'Variant', 'Red')",
+                         [(pid,) for pid in ids])
+        conn.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=500000)
+    parser.add_argument("--variant-ratio", type=float, default=0.4)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            populate_catalog(conn, args.products, args.variant_ratio)
+            conn.execute("ANALYZE")
+        ids = [rng.randint(1, args.products) for _ in range(args.lookups)]
+        keys = [tuple(database.fetch_one("SELECT name, id FROM products WHERE id = ?", (pid,))) for pid in ids[:200]]
+
+        results = []
+        for label, old, new in [
+            ("Full grid read", lambda: grid(OLD_GRID_SQL), lambda: grid(GRID_SQL)),
+            ("200 grid pages of 100", lambda: grid(OLD_GRID_SQL, keys), lambda: grid(GRID_SQL, keys)),
+            (f"{args.lookups:,} item properties reads", lambda: old_properties(ids), lambda: new_properties(ids)),
+            (f"{args.lookups:,} variant inserts (no trigger / trigger)",
+             lambda: add_variants(ids, False), lambda: add_variants(ids, True)),
+        ]:
+            before, _ = timed(old, repeat=3)
+            after, _ = timed(new, repeat=3)
+            results.append((label, f"{before * 1000:,.1f}", f"{after * 1000:,.1f}", f"{before / after:.2f}x"))
+
+    print_table(f"Variant/Size projection, {args.products:,} products, {args.variant_ratio:.0%} with a Size (ms)",
+                ("Read", "Subqueries", "product_attributes", "Speed-up"), results)
+
+
+if __name__ == "__main__":
+    main()
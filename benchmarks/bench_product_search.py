@@ -0,0 +1,50 @@
+# benchmarks/bench_product_search.py
+"""Typeahead latency: the old leading-wildcard LIKE vs. FTS5 vs. the trigram fallback.
+
+Usage: python benchmarks/bench_product_search.py [--products 200000]
+"""
+import argparse
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+import database
+from product_search import FTS5Search, TrigramSearch
+
+LIKE_QUERY = "SELECT id, name, selling_price, barcode FROM products WHERE name LIKE ? OR barcode LIKE ? LIMIT 5"
+# What a cashier types, keystroke by keystroke
+QUERIES = ["sh", "sha", "sham", "shamp", "shampoo", "nestle te", "nestle tea",
+           "89000001", "7700000012", "juice 1234", "zzz"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=200000)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            print(f"Populating {args.products:,} products...")
+            populate_catalog(conn, args.products)
+
+            def like():
+                return [conn.execute(LIKE_QUERY, (f"%{q}%", f"%{q}%")).fetchall() for q in QUERIES]
+            like_time, _ = timed(like, repeat=3)
+
+        fts = FTS5Search()
+        fts_time, _ = timed(lambda: [fts.search(q) for q in QUERIES], repeat=3)
+
+        trigram = TrigramSearch()
+        load_time, _ = timed(trigram.load, repeat=1)
+        tri_time, _ = timed(lambda: [trigram.search(q) for q in QUERIES], repeat=3)
+
+        n = len(QUERIES)
+        print_table(f"Typeahead search, {args.products:,} products ({n} keystrokes)",
+                    ("Backend", "ms/keystroke (avg)"), [
+                        ("LIKE '%q%'", f"{like_time / n * 1000:.2f}"),
+                        ("FTS5 prefix", f"{fts_time / n * 1000:.2f}"),
+                        ("Trigram (fallback)", f"{tri_time / n * 1000:.2f}"),
+                    ])
+        print(f"\nTrigram index build: {load_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
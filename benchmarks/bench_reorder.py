@@ -0,0 +1,85 @@
+# benchmarks/bench_reorder.py
+"""Smart Order analysis: per-product N+1 queries vs. a grouped query over raw
+sale lines vs. the reorder engine reading the daily_product_sales rollup.
+
+Usage: python benchmarks/bench_reorder.py [--products 20000] [--lines 5000000] [--legacy-sample 2000]
+The legacy loop is timed on a sample of products and scaled to the full list.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import temp_database, populate_catalog, populate_suppliers, populate_sales, timed, print_table
+import database
+from reorder_engine import suggest_orders, reorder_candidates
+from sales_rollup import rebuild, product_totals
+
+LEGACY_SALES_QUERY = """
+    SELECT SUM(si.quantity) as total_qty, COUNT(DISTINCT DATE(s.created_at)) as sale_days
+    FROM sales s
+    JOIN sale_items si ON s.id = si.sale_id
+    WHERE si.product_id = ?
+    AND DATE(s.created_at) BETWEEN ? AND ?
+    AND s.is_return = 0
+"""
+
+RAW_GROUPED_QUERY = """
+    SELECT si.product_id, SUM(si.quantity), COUNT(DISTINCT substr(s.created_at, 1, 10))
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    WHERE s.created_at >= ? AND s.created_at < ?
+      AND s.is_return = 0 AND s.is_held = 0
+    GROUP BY si.product_id
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=5000000)
+    parser.add_argument("--lines-per-sale", type=int, default=5)
+    parser.add_argument("--days", type=int, default=60, help="days of sales history")
+    parser.add_argument("--legacy-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            print(f"Populating {args.products:,} products, {args.lines:,} sale lines...")
+            populate_catalog(conn, args.products, variant_ratio=0)
+            populate_suppliers(conn, args.products)
+            populate_sales(conn, args.lines // args.lines_per_sale, args.lines_per_sale, args.products,
+                           days=args.days, chronological=True)
+            conn.commit()
+        started = time.perf_counter()
+        rollup_rows = rebuild()
+        print(f"Rollup rebuilt: {rollup_rows:,} rows in {time.perf_counter() - started:.2f}s")
+        with database.connection_manager.connection() as conn:
+            conn.execute("ANALYZE")
+            conn.commit()
+
+        candidates = reorder_candidates()
+        sample = candidates[:args.legacy_sample]
+        end = datetime.now().date()
+        rows = []
+        for label, window_days in (("30 days", 30), ("1 day", 0)):
+            start = end - timedelta(days=window_days)
+
+            def legacy():
+                for prod in sample:
+                    database.fetch_one(LEGACY_SALES_QUERY, (prod[0], start, end))
+            legacy_time, _ = timed(legacy)
+            legacy_full = legacy_time * len(candidates) / len(sample)
+
+            raw_time, _ = timed(lambda: database.fetch_all(
+                RAW_GROUPED_QUERY, (str(start), str(end + timedelta(days=1)))), repeat=3)
+            rollup_time, _ = timed(lambda: product_totals(start, end), repeat=3)
+            engine_time, items = timed(lambda: suggest_orders(start, end, 7), repeat=3)
+            rows.append((label, f"{legacy_full:.2f}", f"{raw_time:.3f}", f"{rollup_time:.3f}", f"{engine_time:.3f}",
+                         f"{legacy_full / engine_time:.0f}x", f"{len(items):,}"))
+
+        print_table(f"Smart Order, {len(candidates):,} products x {args.lines:,} sale lines (seconds)",
+                    ("Window", f"N+1 ({len(candidates) + 1:,} queries, scaled from {len(sample):,})",
+                     "Sales: raw lines", "Sales: rollup", "Reorder engine", "Speedup vs N+1", "Suggestions"), rows)
+
+if __name__ == "__main__":
+    main()
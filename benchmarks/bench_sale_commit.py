@@ -0,0 +1,84 @@
+# benchmarks/bench_sale_commit.py
+"""Sale save time by basket size: the old per-line statements vs. sales_service.save_sale.
+
+Usage: python benchmarks/bench_sale_commit.py [--products 50000] [--sales 50]
+"""
+import argparse
+import random
+import sqlite3
+
+from bench_utils import temp_database, populate_catalog, timed, print_table
+import database
+from sales_service import save_sale
+
+BASKETS = [1, 10, 40, 80, 150, 300]
+
+
+def legacy_save(invoice_no, cart, connect=None):
+    """What POSWindow.complete_sale used to do: one INSERT and one UPDATE per line."""
+    conn = connect() if connect else database.get_db_connection()
+    c = conn.cursor()
+    total = sum(item['total'] for item in cart)
+    c.execute("""
+        INSERT INTO sales (invoice_no, customer_name, total, discount, payment_method, is_held, cashier_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (invoice_no, "Walk-in Customer", total, 0.0, "cash", 0, 1))
+    sale_id = c.lastrowid
+    for item in cart:
+        c.execute("""
+            INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price)
+            VALUES (?, ?, ?, ?, ?)
+        """, (sale_id, item['id'], item['qty'], item['price'], item['total']))
+        c.execute("UPDATE products SET stock = stock - ? WHERE id = ?", (item['qty'], item['id']))
+    conn.commit()
+    conn.close()
+
+
+def make_cart(rng, n_products, lines):
+    cart = []
+    for _ in range(lines):
+        pid = rng.randint(1, n_products)
+        qty = float(rng.randint(1, 3))
+        cart.append({'id': pid, 'name': f"P{pid}", 'price': 100.0, 'qty': qty, 'total': 100.0 * qty})
+    return cart
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--sales", type=int, default=50, help="sales saved per basket size and path")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    rows = []
+    with temp_database():
+        with database.connection_manager.connection() as conn:
+            populate_catalog(conn, args.products)
+        counter = [0]
+
+        def run(save, lines):
+            carts = [make_cart(rng, args.products, lines) for _ in range(args.sales)]
+
+            def go():
+                for cart in carts:
+                    counter[0] += 1
+                    save(f"BENCH-INV{counter[0]:08d}", cart)
+            return timed(go, repeat=3)[0] / args.sales * 1000
+
+        def fresh_connection():
+            # The original get_db_connection(): a new connection per sale, synchronous=FULL
+            return sqlite3.connect(database.DB_FILE)
+
+        for lines in BASKETS:
+            original_ms = run(lambda inv, cart: legacy_save(inv, cart, fresh_connection), lines)
+            legacy_ms = run(legacy_save, lines)
+            service_ms = run(lambda inv, cart: save_sale(inv, "Walk-in Customer", cart, 1), lines)
+            rows.append((lines, f"{original_ms:.2f}", f"{legacy_ms:.2f}", f"{service_ms:.2f}",
+                         f"{original_ms / service_ms:.1f}x"))
+
+    print_table(f"Sale commit, {args.products:,} products (ms per sale)",
+                ("Lines", "Original", "Per-line, pooled", "save_sale", "vs original"), rows)
+
+
+if __name__ == "__main__":
+    main()
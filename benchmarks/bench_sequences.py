@@ -0,0 +1,46 @@
+# benchmarks/bench_sequences.py
+"""Document numbers/sec by block size, with several tills sharing one database.
+
+Usage: python benchmarks/bench_sequences.py [--tills 4] [--numbers 20000]
+"""
+import argparse
+import threading
+import time
+
+from bench_utils import temp_database, print_table
+from sequences import SequenceService
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tills", type=int, default=4)
+    parser.add_argument("--numbers", type=int, default=20000, help="numbers per till")
+    args = parser.parse_args()
+
+    rows = []
+    with temp_database():
+        for block_size in (1, 10, 100, 1000):
+            tills = [SequenceService(f"T{n}-{block_size}", block_size=block_size) for n in range(args.tills)]
+            issued = []
+
+            def run(seq):
+                issued.append([seq.next_number("INV") for _ in range(args.numbers)])
+
+            threads = [threading.Thread(target=run, args=(seq,)) for seq in tills]
+            started = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - started
+            total = args.tills * args.numbers
+            unique = len({n for numbers in issued for n in numbers})
+            rows.append((block_size, f"{total / elapsed:,.0f}", sum(s.reservations for s in tills),
+                         "yes" if unique == total else f"NO ({total - unique} dupes)"))
+
+    print_table(f"{args.tills} tills x {args.numbers:,} invoice numbers",
+                ("Block", "numbers/sec", "DB reservations", "Unique"), rows)
+
+
+if __name__ == "__main__":
+    main()
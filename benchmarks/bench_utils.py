@@ -0,0 +1,141 @@
+# benchmarks/bench_utils.py
+"""Shared helpers for the benchmark scripts (synthetic data + timing)."""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import database  # noqa: E402
+
+
+@contextmanager
+def temp_database():
+    """Point database.DB_FILE at a fresh, initialised database in a temp dir."""
+    tmpdir = tempfile.mkdtemp(prefix="store_bench_")
+    path = os.path.join(tmpdir, "bench.db")
+    original = database.DB_FILE
+    database.DB_FILE = path
+    try:
+        database.init_db()
+        yield path
+    finally:
+        database.connection_manager.close_all()
+        database.DB_FILE = original
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def populate_catalog(conn, n_products, variant_ratio=0.2, seed=42, batch=50000):
+    """Insert n_products products (plus Size variants for a fraction of them)."""
+    rng = random.Random(seed)
+    words = ["Rice", "Soap", "Tea", "Milk", "Oil", "Sugar", "Salt", "Flour", "Juice", "Biscuit",
+             "Shampoo", "Toothpaste", "Detergent", "Coffee", "Butter", "Cheese", "Bread", "Jam"]
+    brands = ["Nestle", "Unilever", "P&G", "Shan", "National", "Tapal", "Dalda", "Olpers"]
+    sizes = ["Small", "Medium", "Large", "500g", "1kg", "250ml", "1L"]
+
+    rows = []
+    for i in range(1, n_products + 1):
+        name = f"{rng.choice(brands)} {rng.choice(words)} {rng.choice(words)} {i}"
+        cost = round(rng.uniform(10, 2000), 2)
+        rows.append((name, f"{8900000000000 + i}", rng.choice(brands), 1, 1, 1, 1, 1,
+                     cost, round(cost * 1.2, 2), float(rng.randint(0, 500))))
+        if len(rows) >= batch:
+            _insert_products(conn, rows)
+            rows = []
+    if rows:
+        _insert_products(conn, rows)
+
+    variants = []
+    for pid in rng.sample(range(1, n_products + 1), int(n_products * variant_ratio)):
+        variants.append((pid, "Size", rng.choice(sizes), f"7700{pid:09d}", None, 0.0))
+    conn.executemany("""
+        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, variants)
+    conn.commit()
+
+
+def _insert_products(conn, rows):
+    conn.executemany("""
+        INSERT INTO products (name, barcode, company, category_id, supplier_id, tax_id,
+                              base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+
+
+def populate_suppliers(conn, n_products, n_suppliers=20, seed=3):
+    """Create n_suppliers suppliers and one active supplier price per product; returns supplier ids."""
+    rng = random.Random(seed)
+    ids = []
+    for n in range(n_suppliers):
+        cur = conn.execute("INSERT INTO suppliers (name, lead_time_days) VALUES (?, ?)",
+                           (f"Bench Supplier {n + 1}", rng.randint(1, 10)))
+        ids.append(cur.lastrowid)
+    conn.executemany("INSERT INTO supplier_prices (product_id, supplier_id, cost_price) VALUES (?, ?, ?)",
+                     [(pid, rng.choice(ids), round(rng.uniform(10, 2000), 2)) for pid in range(1, n_products + 1)])
+    conn.commit()
+    return ids
+
+
+def populate_sales(conn, n_sales, lines_per_sale, n_products, days=30, seed=7, batch=20000, chronological=False):
+    """Insert n_sales sales spread over the last `days` days with random lines.
+
+    With chronological=True sale ids increase with created_at, as on a real till.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    start_id = (conn.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0]) + 1
+    offsets = [(rng.randint(0, days - 1), rng.randint(0, 86399)) for _ in range(n_sales)]
+    if chronological:
+        offsets.sort(key=lambda o: -(o[0] * 86400 + o[1]))
+    sales, lines = [], []
+    for n in range(n_sales):
+        sale_id = start_id + n
+        created = now - timedelta(days=offsets[n][0], seconds=offsets[n][1])
+        sales.append((sale_id, f"BENCH{sale_id:09d}", "Walk-in Customer", 0.0, "cash",
+                      created.strftime("%Y-%m-%d %H:%M:%S")))
+        for _ in range(lines_per_sale):
+            qty = float(rng.randint(1, 5))
+            lines.append((sale_id, rng.randint(1, n_products), qty, 100.0, qty * 100.0))
+        if len(lines) >= batch:
+            _insert_sales(conn, sales, lines)
+            sales, lines = [], []
+    if sales:
+        _insert_sales(conn, sales, lines)
+
+
+def _insert_sales(conn, sales, lines):
+    conn.executemany("""
+        INSERT INTO sales (id, invoice_no, customer_name, total, payment_method, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, sales)
+    conn.executemany("""
+        INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price)
+        VALUES (?, ?, ?, ?, ?)
+    """, lines)
+    conn.commit()
+
+
+def timed(fn, repeat=1):
+    """Run fn `repeat` times and return (best_seconds, last_result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def print_table(title, header, rows):
+    print()
+    print(title)
+    print("-" * len(title))
+    widths = [max(len(str(x)) for x in col) for col in zip(header, *rows)]
+    for row in [header] + list(rows):
+        print("  ".join(str(v).ljust(w) for v, w in zip(row, widths)))
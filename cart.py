@@ -0,0 +1,91 @@
+# cart.py
+"""POS cart keyed by (product_id, variant_id).
+
+Lines are the same dicts save_sale() expects (id, variant_id, name, price,
+qty, total) kept in scan order. Lookups, quantity changes and the subtotal
+are O(1); every change is reported to subscribers as (event, key, line) with
+event one of 'add', 'update', 'remove' or 'clear', so a view can redraw only
+the affected row.
+"""
+
+
+class Cart:
+    def __init__(self):
+        self._lines = {}      # key -> line dict, insertion (scan) order
+        self._subtotal = 0.0
+        self._listeners = []
+
+    @staticmethod
+    def key_for(product_id, variant_id=None):
+        return (product_id, variant_id)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _emit(self, event, key, line):
+        for callback in self._listeners:
+            callback(event, key, line)
+
+    # ---------- queries ----------
+    @property
+    def subtotal(self):
+        return self._subtotal
+
+    def get(self, product_id, variant_id=None):
+        return self._lines.get((product_id, variant_id))
+
+    def __contains__(self, key):
+        return key in self._lines
+
+    def __iter__(self):
+        return iter(list(self._lines.values()))
+
+    def __len__(self):
+        return len(self._lines)
+
+    # ---------- changes ----------
+    def add(self, product_id, name, price, qty=1.0, variant_id=None):
+        """Add qty of a product; an existing line for the same key is topped up."""
+        key = (product_id, variant_id)
+        line = self._lines.get(key)
+        if line is not None:
+            self._set_qty(key, line, line['qty'] + qty)
+            return line
+        price = price if price is not None else 0.0
+        line = {'id': product_id, 'variant_id': variant_id, 'name': name,
+                'price': price, 'qty': qty, 'total': price * qty}
+        self._lines[key] = line
+        self._subtotal += line['total']
+        self._emit('add', key, line)
+        return line
+
+    def set_qty(self, product_id, qty, variant_id=None):
+        key = (product_id, variant_id)
+        line = self._lines[key]
+        if qty == 0:
+            return self.remove(product_id, variant_id)
+        self._set_qty(key, line, qty)
+        return line
+
+    def _set_qty(self, key, line, qty):
+        old_total = line['total']
+        line['qty'] = qty
+        line['total'] = line['price'] * qty
+        self._subtotal += line['total'] - old_total
+        self._emit('update', key, line)
+
+    def remove(self, product_id, variant_id=None):
+        key = (product_id, variant_id)
+        line = self._lines.pop(key, None)
+        if line is None:
+            return None
+        self._subtotal -= line['total']
+        if not self._lines:
+            self._subtotal = 0.0  # drop accumulated float drift
+        self._emit('remove', key, line)
+        return line
+
+    def clear(self):
+        self._lines = {}
+        self._subtotal = 0.0
+        self._emit('clear', None, None)
@@ -0,0 +1,108 @@
+# catalog_bulk.py
+"""Set-based bulk edits over many products at once.
+
+Each operation applies to a target: a CatalogQuery (every product the
+items grid's current filter matches) or a list of product ids (a
+multi-selection). The target ids are copied into a temp table and the
+change runs as one UPDATE joined to it, with price_history rows for
+changed selling prices written by one INSERT ... SELECT, all in one
+transaction:
+
+    reprice(CatalogQuery(category_id=4), percent=7.5, updated_by=user_id)
+    reassign([12, 15, 19], supplier_id=3)
+    set_tax_type(CatalogQuery(company="Nestle"), "inclusive")
+
+Every operation returns {"matched", "changed", "history", "seconds"}.
+"""
+import time
+
+import database
+from catalog_index import catalog_index
+
+PRICE_FIELDS = ("selling_price", "cost_price")
+TAX_TYPES = ("exclusive", "inclusive")
+
+
+def _fill_targets(c, target):
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_targets (product_id INTEGER PRIMARY KEY)")
+    c.execute("DELETE FROM bulk_targets")
+    if hasattr(target, "ids_sql"):
+        sql, params = target.ids_sql()
+        c.execute(f"INSERT INTO bulk_targets (product_id) {sql}", params)
+    else:
+        c.executemany("INSERT OR IGNORE INTO bulk_targets (product_id) VALUES (?)", [(int(pid),) for pid in target])
+    return c.execute("SELECT COUNT(*) FROM bulk_targets").fetchone()[0]
+
+
+def _apply(target, assignments, params=None, history_price=None, updated_by=None, refresh_index=False):
+    """UPDATE products SET <assignments> for the target rows where a value changes.
+
+    assignments maps column -> SQL expression over the product's columns and
+    named :params; history_price, if given, is the expression for the new
+    selling price.
+    """
+    start = time.perf_counter()
+    params = dict(params or {}, updated_by=updated_by)
+    differs = " OR ".join(f"{column} IS NOT {expr}" for column, expr in assignments.items())
+    targets = "id IN (SELECT product_id FROM bulk_targets)"
+    changed_ids = []
+    with database.connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            matched = _fill_targets(c, target)
+            history = 0
+            if history_price is not None:
+                c.execute(f"""
+                    INSERT INTO price_history (product_id, selling_price, updated_by)
+                    SELECT id, {history_price}, :updated_by FROM products
+                    WHERE {targets} AND selling_price IS NOT {history_price}
+                """, params)
+                history = c.rowcount
+            if refresh_index:
+                changed_ids = [row[0] for row in c.execute(
+                    f"SELECT id FROM products WHERE {targets} AND ({differs})", params)]
+            c.execute(f"""
+                UPDATE products SET {", ".join(f"{column} = {expr}" for column, expr in assignments.items())}
+                WHERE {targets} AND ({differs})
+            """, params)
+            changed = c.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    if changed_ids:
+        catalog_index.refresh(changed_ids)
+    return {"matched": matched, "changed": changed, "history": history,
+            "seconds": round(time.perf_counter() - start, 3)}
+
+
+def reprice(target, percent=None, amount=None, field="selling_price", updated_by=None):
+    """Raise or lower a price by a percentage or a fixed amount; prices are rounded to 2 places
+    and never go below zero."""
+    if field not in PRICE_FIELDS:
+        raise ValueError(f"Unknown price field: {field}")
+    if (percent is None) == (amount is None):
+        raise ValueError("Give either a percentage or an amount")
+    if percent is not None:
+        expr, params = f"ROUND(MAX(COALESCE({field}, 0) * (1 + :percent / 100.0), 0), 2)", {"percent": float(percent)}
+    else:
+        expr, params = f"ROUND(MAX(COALESCE({field}, 0) + :amount, 0), 2)", {"amount": float(amount)}
+    selling = field == "selling_price"
+    return _apply(target, {field: expr}, params, history_price=expr if selling else None,
+                  updated_by=updated_by, refresh_index=selling)
+
+
+def reassign(target, category_id=None, supplier_id=None):
+    """Move products to a category and/or supplier."""
+    values = {"category_id": category_id, "supplier_id": supplier_id}
+    values = {column: value for column, value in values.items() if value is not None}
+    if not values:
+        raise ValueError("Give a category or a supplier")
+    return _apply(target, {column: f":{column}" for column in values}, values)
+
+
+def set_tax_type(target, tax_type):
+    if tax_type not in TAX_TYPES:
+        raise ValueError(f"Unknown tax type: {tax_type}")
+    return _apply(target, {"tax_type": ":tax_type"}, {"tax_type": tax_type})
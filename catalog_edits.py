@@ -0,0 +1,121 @@
+# catalog_edits.py
+"""Buffered inline edits for the Inventory items grid.
+
+Cell edits are staged per product and field; a later edit of the same
+cell replaces the earlier one. flush() writes everything staged in one
+transaction (one UPDATE per product, a price_history row per selling
+price change) and keeps the values it overwrote, so undo() can put the
+last flushed batch back, also in one transaction:
+
+    edits = EditBuffer(updated_by=user_id)
+    edits.stage(42, "name", "Tapal Danedar 950g")
+    edits.stage(42, "selling_price", 1250.0)
+    result = edits.flush()      # {"products": [42], "cells": 2}
+    edits.undo()
+
+With a Tk root the buffer also flushes itself `delay_ms` after the last
+staged edit and reports to on_flush(result, error) on the Tk thread.
+"""
+import database
+from catalog_index import catalog_index
+
+EDITABLE = ("barcode", "company", "name", "category_id", "supplier_id", "cost_price", "selling_price", "tax_type")
+
+
+class EditBuffer:
+    def __init__(self, updated_by=None, root=None, delay_ms=2000, on_flush=None):
+        self.updated_by = updated_by
+        self.root = root
+        self.delay_ms = delay_ms
+        self.on_flush = on_flush        # (result or None, error or None), for timer flushes
+        self.pending = {}               # product_id -> {field: value}
+        self.last_batch = None          # product_id -> {field: value before the last flush}
+        self._timer = None
+
+    def __len__(self):
+        return sum(len(fields) for fields in self.pending.values())
+
+    def stage(self, product_id, field, value):
+        if field not in EDITABLE:
+            raise ValueError(f"Field cannot be edited inline: {field}")
+        self.pending.setdefault(int(product_id), {})[field] = value
+        self._schedule()
+
+    def discard(self, product_id=None):
+        """Drop staged edits, for one product or all of them."""
+        if product_id is None:
+            self.pending.clear()
+        else:
+            self.pending.pop(int(product_id), None)
+        if not self.pending:
+            self._cancel_timer()
+
+    def flush(self):
+        """Write every staged edit in one transaction; returns {"products", "cells"}."""
+        self._cancel_timer()
+        if not self.pending:
+            return {"products": [], "cells": 0}
+        batch, cells = self.pending, len(self)
+        previous = self._write(batch)
+        self.pending = {}
+        self.last_batch = previous
+        return {"products": sorted(previous), "cells": cells}
+
+    def undo(self):
+        """Restore the values the last flush overwrote; returns the product ids touched."""
+        if not self.last_batch:
+            return []
+        self._write(self.last_batch)
+        ids = sorted(self.last_batch)
+        self.last_batch = None
+        return ids
+
+    def _write(self, batch):
+        """Apply {product_id: {field: value}}; returns the same shape holding the old values."""
+        previous = {}
+        with database.connection_manager.connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                for product_id, fields in batch.items():
+                    names = list(fields)
+                    old = c.execute(f"SELECT {', '.join(names)} FROM products WHERE id = ?",
+                                    (product_id,)).fetchone()
+                    if old is None:
+                        continue    # deleted since the edit was staged
+                    previous[product_id] = dict(zip(names, old))
+                    c.execute(f"UPDATE products SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?",
+                              [fields[name] for name in names] + [product_id])
+                history = [(product_id, fields["selling_price"], self.updated_by)
+                           for product_id, fields in batch.items()
+                           if "selling_price" in fields and product_id in previous
+                           and previous[product_id]["selling_price"] != fields["selling_price"]]
+                c.executemany("INSERT INTO price_history (product_id, selling_price, updated_by) VALUES (?, ?, ?)",
+                              history)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        catalog_index.refresh(list(previous))
+        return previous
+
+    # ---------- timer ----------
+    def _schedule(self):
+        if self.root is None:
+            return
+        self._cancel_timer()
+        self._timer = self.root.after(self.delay_ms, self._timed_flush)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+
+    def _timed_flush(self):
+        self._timer = None
+        try:
+            result, error = self.flush(), None
+        except Exception as e:
+            result, error = None, e
+        if self.on_flush:
+            self.on_flush(result, error)
@@ -0,0 +1,229 @@
+# catalog_grid.py
+"""Keyset-paged product rows for the Inventory items grid.
+
+CatalogQuery pushes the grid's filters and sort into SQL and reads pages
+with keyset pagination: the next page starts after the (sort value, id)
+of the last row shown, so every page is one index range scan of `limit`
+rows however deep into the catalogue it is:
+
+    query = CatalogQuery(category_id=3)
+    first = query.page(limit=50)
+    more = query.page(after=query.key(first[-1]), limit=50)
+
+A category filter matches that category only, unless subcategories=True
+takes in everything below it (via category_closure). That becomes an IN
+over the subtree, which no longer walks the (category_id, name, id) index
+in display order, so it is opt-in; a category without children stays a
+plain equality either way.
+
+PagedRows keeps the rows around the visible window (plus a prefetch
+buffer each side) so scrolling only touches the database when it leaves
+the buffer. A jump (scrollbar drag) finds the key at the target offset
+on the covering index and pages from there.
+"""
+import database
+from category_tree import subtree_ids
+
+# Grid heading -> SQL sort expression; NULLs sort as blank / zero so row-value keysets stay exact
+SORTS = {
+    "Name": "p.name",
+    "ID": "p.id",
+    "Barcode": "COALESCE(p.barcode, '')",
+    "Company": "COALESCE(p.company, '')",
+    "Cost": "COALESCE(p.cost_price, 0)",
+    "Sale": "COALESCE(p.selling_price, 0)",
+    "Stock": "COALESCE(p.stock, 0)",
+}
+TAX_METHODS = {"Applicable on Trade Price": "exclusive", "Included in Retail Price": "inclusive"}
+
+GRID_SQL = """
+    SELECT
+        p.id,
+        p.barcode,
+        p.company,
+        p.name,
+        a.variant,
+        a.size,
+        u.name AS unit,
+        c.name AS category,
+        s.name AS supplier,
+        p.cost_price,
+        p.selling_price,
+        p.stock,
+        c.location_tag,
+        p.tax_type,
+        {sort} AS sort_key
+    FROM products p
+    LEFT JOIN product_attributes a ON a.product_id = p.id
+    LEFT JOIN uoms u ON p.base_uom_id = u.id
+    LEFT JOIN categories c ON p.category_id = c.id
+    LEFT JOIN suppliers s ON p.supplier_id = s.id
+"""
+
+
+def _number(value):
+    try:
+        return float(value) if value not in (None, "") else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def grid_values(row):
+    """Treeview values for one GRID_SQL row."""
+    tax_method = "Included in Retail Price" if row[13] == "inclusive" else "Applicable on Trade Price"
+    return (row[0], row[1], row[2], row[3], row[4] or "", row[5] or "", row[6] or "Piece",
+            row[7], row[8], f"Rs. {_number(row[9]):.2f}", f"Rs. {_number(row[10]):.2f}",
+            f"{_number(row[11]):.2f}", tax_method, row[12] if row[12] is not None else "", "PropertyParams")
+
+
+class CatalogQuery:
+    def __init__(self, category_id=None, supplier_id=None, company=None, tax_type=None, sort="Name",
+                 descending=False, subcategories=False):
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        if category_id is not None and subcategories:
+            ids = subtree_ids(category_id)
+            if len(ids) > 1:
+                category_id = tuple(ids)
+        self.filters = {"category_id": category_id, "supplier_id": supplier_id, "company": company,
+                        "tax_type": tax_type}
+        self.sort = sort
+        self.descending = descending
+
+    def _where(self, conditions=(), params=()):
+        conditions, params = list(conditions), list(params)
+        for column, value in self.filters.items():
+            if isinstance(value, tuple):
+                conditions.append(f"p.{column} IN ({','.join('?' * len(value))})")
+                params.extend(value)
+            elif value is not None:
+                conditions.append(f"p.{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+    def _order(self, backwards=False):
+        direction = "DESC" if self.descending != backwards else "ASC"
+        return f" ORDER BY {SORTS[self.sort]} {direction}, p.id {direction}"
+
+    def _after(self, key, backwards=False, inclusive=False):
+        op = "<" if self.descending != backwards else ">"
+        return f"({SORTS[self.sort]}, p.id) {op}{'=' if inclusive else ''} (?, ?)", list(key)
+
+    @staticmethod
+    def key(row):
+        """Keyset position of a GRID_SQL row: (sort value, id)."""
+        return row[-1], row[0]
+
+    def ids_sql(self):
+        """SELECT of the matching product ids, for set-based writes over the filter."""
+        where, params = self._where()
+        return f"SELECT p.id FROM products p{where}", params
+
+    def count(self):
+        where, params = self._where()
+        return database.fetch_one(f"SELECT COUNT(*) FROM products p{where}", params)[0]
+
+    def page(self, after=None, limit=50, backwards=False, inclusive=False):
+        """Up to `limit` rows after (or, backwards, before) the key, in display order."""
+        condition, params = (None, []) if after is None else self._after(after, backwards, inclusive)
+        where, params = self._where([condition] if condition else [], params)
+        rows = database.fetch_all(f"{GRID_SQL.format(sort=SORTS[self.sort])}{where}"
+                                  f"{self._order(backwards)} LIMIT ?", params + [limit])
+        return rows[::-1] if backwards else rows
+
+    def last_page(self, limit):
+        return self.page(limit=limit, backwards=True)
+
+    def key_at(self, offset):
+        """Key of the row at `offset`, read from the index alone; None past the end."""
+        where, params = self._where()
+        row = database.fetch_one(f"SELECT {SORTS[self.sort]}, p.id FROM products p{where}"
+                                 f"{self._order()} LIMIT 1 OFFSET ?", params + [offset])
+        return tuple(row) if row else None
+
+    def offset_of(self, key):
+        """How many rows sort before `key`."""
+        condition, params = self._after(key, backwards=True)
+        where, params = self._where([condition], params)
+        return database.fetch_one(f"SELECT COUNT(*) FROM products p{where}", params)[0]
+
+
+class PagedRows:
+    """The rows around a scrolling window, fetched a page at a time."""
+
+    def __init__(self, query, prefetch=100):
+        self.query = query
+        self.prefetch = prefetch
+        self.total = query.count()
+        self.rows = []          # buffered rows in display order
+        self.start = 0          # offset of rows[0]
+
+    @property
+    def end(self):
+        return self.start + len(self.rows)
+
+    def window(self, top, size):
+        """Rows [top, top + size), clamped to the catalogue; reads only what the buffer lacks."""
+        top = max(0, min(top, self.total - size))
+        stop = min(top + size, self.total)
+        if not (self.start <= top and stop <= self.end):
+            self._fill(top, stop)
+        return top, self.rows[top - self.start:stop - self.start]
+
+    def _fill(self, top, stop):
+        want = stop - top + self.prefetch
+        if self.rows and self.start <= top <= self.end:
+            # Scrolled past the bottom of the buffer: page forward
+            more = self.query.page(after=self.query.key(self.rows[-1]), limit=stop - self.end + self.prefetch)
+            self.rows += more
+        elif self.rows and top < self.start and stop >= self.start:
+            # Scrolled above the buffer: page backward
+            more = self.query.page(after=self.query.key(self.rows[0]), limit=self.start - top + self.prefetch,
+                                   backwards=True)
+            self.rows = more + self.rows
+            self.start -= len(more)
+        elif stop + self.prefetch >= self.total:
+            # Jump to the end: the last page read backwards
+            self.rows = self.query.last_page(min(self.total, want + self.prefetch))
+            self.start = self.total - len(self.rows)
+        else:
+            # Jump elsewhere: find the key at the offset on the index, then page from it
+            start = max(0, top - self.prefetch)
+            key = self.query.key_at(start)
+            self.rows = self.query.page(after=key, limit=want + (top - start), inclusive=True) if key else []
+            self.start = start
+        self._trim(top, stop)
+
+    def _trim(self, top, stop):
+        keep_from = max(self.start, top - self.prefetch)
+        keep_to = min(self.end, stop + self.prefetch)
+        self.rows = self.rows[keep_from - self.start:keep_to - self.start]
+        self.start = keep_from
+
+    def refresh_rows(self, product_ids):
+        """Re-read these products and replace them in the buffer; returns {id: row} for those found.
+
+        Buffered rows keep their old sort key, so an edit that changes the sort
+        column does not move the row (or break the keyset) until the next load.
+        """
+        ids = [int(pid) for pid in product_ids]
+        fresh = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = database.fetch_all(f"{GRID_SQL.format(sort=SORTS[self.query.sort])} "
+                                      f"WHERE p.id IN ({','.join('?' * len(chunk))})", chunk)
+            fresh.update((row[0], row) for row in rows)
+        for index, row in enumerate(self.rows):
+            if row[0] in fresh:
+                fresh[row[0]] = self.rows[index] = tuple(fresh[row[0]][:-1]) + (row[-1],)
+        return fresh
+
+    def locate(self, product_id):
+        """Offset of a product in this query's order, or None if the filters exclude it."""
+        row = database.fetch_one(f"SELECT {SORTS[self.query.sort]}, p.id FROM products p WHERE p.id = ?",
+                                 (product_id,))
+        if row is None:
+            return None
+        offset = self.query.offset_of(tuple(row))
+        found = self.query.page(after=tuple(row), limit=1, inclusive=True)
+        return offset if found and found[0][0] == product_id else None
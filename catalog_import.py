@@ -0,0 +1,451 @@
+# catalog_import.py
+"""Streaming product catalogue import (Excel, CSV/TSV) for large supplier files.
+
+Rows are streamed from the file (openpyxl read-only mode for .xlsx, the
+csv module for .csv/.tsv/.txt) in chunks of `chunk_size`, so memory stays
+flat however long the file is. Each chunk is coerced column by column:
+text columns are stripped in one pass and numeric columns converted with
+one float() pass, falling back to value-by-value parsing (thousands
+separators, bad values) only for a column that fails. Category, supplier
+and unit names are resolved through dictionaries loaded once per import,
+and each chunk is written with one executemany for the
+products and one for their variants, in its own BEGIN IMMEDIATE
+transaction. The product_search rows for a chunk are built in one
+statement rather than by the per-row triggers:
+
+    stats = import_catalog("catalog.xlsx", {"Name": "Item", "Sale": "Price", ...})
+    print(stats["rows_per_sec"], stats["peak_memory_mb"])
+
+`mapping` maps product FIELDS to column headers in the file; unmapped
+fields take the same defaults as the old per-row importer.
+
+mode="upsert" matches rows to existing products on a natural key (KEYS:
+barcode by default) instead of always inserting. Each chunk's keys and
+prices go into a TEMP staging table, matched against products in one
+statement, and the mapped Cost/Sale/Stock of changed matches are updated
+with one UPDATE; only unmatched rows are inserted. Rows without a key
+cannot match and are inserted as in insert mode, and when a key repeats
+the last row wins. The stats double as the
+run's diff summary: imported (inserted), updated, unchanged and skipped.
+"""
+import csv
+import itertools
+import sys
+import time
+
+import database
+from catalog_index import catalog_index
+from migrations import defer_catalog_triggers, restore_catalog_triggers
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FIELDS = ["Barcode", "Company", "Name", "Variant", "Size", "Unit", "Category", "Supplier", "Cost", "Sale", "Stock"]
+MODES = ("insert", "upsert")
+# Natural key field -> (products column, position in a prepared product tuple)
+KEYS = {"Barcode": ("barcode", 1), "Name": ("name", 0)}
+# Fields an upsert updates in place -> (products column, position in a prepared product tuple)
+UPSERT_FIELDS = {"Cost": ("cost_price", 8), "Sale": ("selling_price", 9), "Stock": ("stock", 10)}
+NUMERIC_FIELDS = ("Cost", "Sale", "Stock")
+CSV_EXTENSIONS = (".csv", ".tsv", ".txt")
+FILE_TYPES = [("Excel Files", "*.xlsx *.xls"), ("CSV / TSV Files", "*.csv *.tsv *.txt")]
+
+
+# ========================
+#    READERS
+# ========================
+def _xlsx_rows(path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _xls_rows(path):
+    # xlrd has no streaming mode; .xls sheets stop at 65,536 rows anyway
+    import pandas as pd
+    frame = pd.read_excel(path, engine='xlrd', header=None, dtype=object)
+    for row in frame.itertuples(index=False, name=None):
+        yield tuple(None if pd.isna(value) else value for value in row)
+
+
+def is_csv(path):
+    return path.lower().endswith(CSV_EXTENSIONS)
+
+
+def _csv_dialect(path):
+    if path.lower().endswith(".tsv"):
+        return csv.excel_tab
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        sample = f.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return csv.excel
+
+
+def _csv_rows(path):
+    # Cells stay strings; prepare_chunk coerces them a column at a time
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        yield from csv.reader(f, _csv_dialect(path))
+
+
+def iter_rows(path):
+    """Yield the header row, then every data row, as tuples of cell values."""
+    if is_csv(path):
+        rows = _csv_rows(path)
+    else:
+        rows = _xls_rows(path) if path.lower().endswith('.xls') else _xlsx_rows(path)
+    for row in rows:
+        if any(value is not None and value != "" for value in row):
+            yield row
+
+
+def column_names(header):
+    return [str(name).strip() if name is not None else f"Column {i + 1}" for i, name in enumerate(header)]
+
+
+def read_header(path, preview=5):
+    """(column names, first `preview` data rows) without reading the rest of the file."""
+    rows = iter_rows(path)
+    try:
+        columns = column_names(next(rows, ()))
+        sample = [row for _, row in zip(range(preview), rows)]
+    finally:
+        rows.close()
+    return columns, sample
+
+
+def row_count_hint(path):
+    """Data rows according to the sheet's stored dimensions, or line count for CSV (None if unknown)."""
+    if is_csv(path):
+        lines = 0
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                lines += block.count(b"\n")
+        return max(lines - 1, 0)
+    if path.lower().endswith('.xls'):
+        return None
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+    finally:
+        workbook.close()
+    return max_row - 1 if max_row else None
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ========================
+#    ROW PREPARATION
+# ========================
+def load_lookups():
+    """Name -> id dictionaries for categories, suppliers and units, loaded once per import."""
+    return {
+        "Category": {name: id_ for id_, name in database.fetch_all("SELECT id, name FROM categories")},
+        "Supplier": {name: id_ for id_, name in database.fetch_all("SELECT id, name FROM suppliers")},
+        "Unit": {name: id_ for id_, name in database.fetch_all("SELECT id, name FROM uoms")},
+    }
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))  # barcodes and codes typed as numbers
+    return str(value).strip()
+
+
+def text_column(values):
+    try:
+        return [value.strip() for value in values]
+    except AttributeError:  # Excel cells: numbers, dates, None
+        return [cell_text(value) for value in values]
+
+
+def number_column(values):
+    """Floats for one column of a chunk (blank = 0); None where a value is not a number."""
+    try:
+        return [float(value) if value not in (None, "") else 0.0 for value in values]
+    except (TypeError, ValueError):
+        pass
+    numbers = []
+    for value in values:
+        text = cell_text(value).replace(",", "")
+        try:
+            numbers.append(float(text) if text else 0.0)
+        except ValueError:
+            numbers.append(None)
+    return numbers
+
+
+def chunk_columns(rows, positions):
+    """{field: column values} for the mapped fields of a chunk; short rows read as blank."""
+    width = max(positions.values(), default=-1) + 1
+    padded = [row if len(row) >= width else tuple(row) + ("",) * (width - len(row)) for row in rows]
+    table = list(zip(*padded)) if padded else []
+    return {field: table[pos] if table else () for field, pos in positions.items()}
+
+
+def prepare_chunk(rows, positions, lookups):
+    """Turn raw rows into product parameters and their variants.
+
+    Returns (products, variants, skipped); variants are (index into
+    products, variant_name, value, price, stock).
+    """
+    columns = chunk_columns(rows, positions)
+
+    def column(field, default=""):
+        return columns[field] if field in columns else [default] * len(rows)
+
+    text = {field: text_column(column(field)) for field in FIELDS
+            if field not in NUMERIC_FIELDS and field != "Unit"}
+    cost, sale, stock = (number_column(column(field)) for field in NUMERIC_FIELDS)
+    # An unmapped unit means the default "Piece"; a blank cell means unit 1
+    units = [lookups["Unit"].get(value, 1) for value in text_column(column("Unit", "Piece"))]
+    categories = [lookups["Category"].get(value) for value in text["Category"]]
+    suppliers = [lookups["Supplier"].get(value) for value in text["Supplier"]]
+
+    products, variants = [], []
+    for name, barcode, company, variant, size, category_id, supplier_id, unit_id, cost_val, sale_val, stock_val \
+            in zip(text["Name"], text["Barcode"], text["Company"], text["Variant"], text["Size"],
+                   categories, suppliers, units, cost, sale, stock):
+        if not name or cost_val is None or sale_val is None or stock_val is None:
+            continue
+        index = len(products)
+        products.append((name, barcode or None, company or None,
+                         category_id, supplier_id, 1, unit_id, unit_id, cost_val, sale_val, stock_val))
+        if variant:
+            variants.append((index, "Variant", variant, sale_val, stock_val))
+        if size:
+            variants.append((index, "Size", size, sale_val, stock_val))
+    return products, variants, len(rows) - len(products)
+
+
+# ========================
+#    WRITING
+# ========================
+def write_products(c, products, variants):
+    """Bulk insert inside the caller's transaction; returns the new product ids in order."""
+    if not products:
+        return []
+    # Within one write transaction AUTOINCREMENT hands out consecutive ids
+    before = c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'products'").fetchone()
+    first_id = (before[0] if before else 0) + 1
+    # Search and attribute rows are built once for the whole chunk instead of per insert
+    deferred = defer_catalog_triggers(c)
+    c.executemany("""
+        INSERT INTO products (name, barcode, company, category_id, supplier_id, tax_id, base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, products)
+    last_id = c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'products'").fetchone()[0]
+    if last_id - first_id + 1 != len(products):
+        raise RuntimeError("Product ids were not allocated consecutively; import aborted")
+
+    c.executemany("""
+        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
+        VALUES (?, ?, ?, NULL, ?, ?)
+    """, [(first_id + index, name, value, price, stock) for index, name, value, price, stock in variants])
+    restore_catalog_triggers(c, deferred, first_id, last_id)
+    return list(range(first_id, last_id + 1))
+
+
+def _reset_staging(c):
+    c.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS import_staging (
+            row_no INTEGER PRIMARY KEY,
+            key TEXT NOT NULL,
+            cost_price REAL,
+            selling_price REAL,
+            stock REAL,
+            product_id INTEGER
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS temp.idx_import_staging_product ON import_staging (product_id)")
+    c.execute("DELETE FROM import_staging")
+
+
+def merge_products(c, products, variants, key="Barcode", fields=tuple(UPSERT_FIELDS), updated_by=None):
+    """Upsert a prepared chunk on `key` inside the caller's transaction.
+
+    Rows without a key cannot match anything and are inserted, as in insert
+    mode. Returns (inserted ids, updated ids, unchanged, skipped).
+    """
+    column, key_pos = KEYS[key]
+    latest, keyless = {}, []
+    for index, product in enumerate(products):
+        if product[key_pos]:
+            latest[product[key_pos]] = index
+        else:
+            keyless.append(index)
+    # Earlier rows repeating a key are superseded by the last one
+    skipped = len(products) - len(latest) - len(keyless)
+
+    _reset_staging(c)
+    c.executemany("""
+        INSERT INTO import_staging (row_no, key, cost_price, selling_price, stock) VALUES (?, ?, ?, ?, ?)
+    """, [(index, value, products[index][8], products[index][9], products[index][10])
+          for value, index in latest.items()])
+    # Oldest product wins if the catalogue already holds duplicates of a key
+    c.execute(f"""
+        UPDATE import_staging
+        SET product_id = (SELECT MIN(p.id) FROM products p WHERE p.{column} = import_staging.key)
+    """)
+    matched = c.execute("SELECT COUNT(*) FROM import_staging WHERE product_id IS NOT NULL").fetchone()[0]
+
+    updated_ids = []
+    columns = [UPSERT_FIELDS[field][0] for field in fields]
+    if columns and matched:
+        differs = " OR ".join(f"p.{col} IS NOT s.{col}" for col in columns)
+        updated_ids = [row[0] for row in c.execute(f"""
+            SELECT p.id FROM import_staging s JOIN products p ON p.id = s.product_id WHERE {differs}
+        """)]
+        if "selling_price" in columns:
+            c.execute("""
+                INSERT INTO price_history (product_id, selling_price, updated_by)
+                SELECT p.id, s.selling_price, ?
+                FROM import_staging s JOIN products p ON p.id = s.product_id
+                WHERE p.selling_price IS NOT s.selling_price
+            """, (updated_by,))
+        names = ", ".join(columns)
+        c.execute(f"""
+            UPDATE products
+            SET ({names}) = (SELECT {", ".join("s." + col for col in columns)}
+                             FROM import_staging s WHERE s.product_id = products.id)
+            WHERE id IN (SELECT p.id FROM import_staging s JOIN products p ON p.id = s.product_id WHERE {differs})
+        """)
+
+    new_rows = sorted(keyless + [row[0] for row in c.execute(
+        "SELECT row_no FROM import_staging WHERE product_id IS NULL")])
+    renumber = {old: new for new, old in enumerate(new_rows)}
+    inserted_ids = write_products(c, [products[index] for index in new_rows],
+                                  [(renumber[index], *rest) for index, *rest in variants if index in renumber])
+    return inserted_ids, updated_ids, matched - len(updated_ids), skipped
+
+
+def summary_text(stats):
+    """One-line diff summary of an import run."""
+    return (f"{stats['imported']:,} inserted, {stats.get('updated', 0):,} updated, "
+            f"{stats.get('unchanged', 0):,} unchanged, {stats['skipped']:,} skipped")
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process, where the platform reports it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def import_rows(rows, positions, chunk_size=5000, on_progress=None, mode="insert", key="Barcode",
+                updated_by=None, validator=None, job=None):
+    """Import data rows (tuples; `positions` maps FIELDS to tuple indexes); returns run statistics.
+
+    `on_progress(stats)` is called after every committed chunk. With a
+    `validator` (import_validation.ChunkValidator) only the rows it passes
+    are written; the rest count as skipped. With a `job`
+    (import_jobs.ImportJob) the chunks it already committed are read past
+    without being imported again, every chunk's counts are checkpointed in
+    the chunk's own transaction, and a cancel stops before the next chunk.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    if key not in KEYS:
+        raise ValueError(f"Unknown import key: {key}")
+    started = time.perf_counter()
+    stats = {"rows": 0, "imported": 0, "updated": 0, "unchanged": 0, "variants": 0, "skipped": 0, "chunks": 0}
+    lookups = load_lookups()
+    # Only mapped price/stock columns overwrite what is in the catalogue
+    fields = [field for field in UPSERT_FIELDS if field in positions]
+
+    chunks = chunked(rows, chunk_size)
+    if job and job.chunks_done:
+        stats.update(job.counts, chunks=job.chunks_done)
+        for _ in itertools.islice(chunks, job.chunks_done):
+            pass
+    resumed_rows = stats["resumed_rows"] = stats["rows"]
+    batches = (validator.validated(chunks, first_row=resumed_rows + 1) if validator
+               else ((len(chunk), chunk) for chunk in chunks))
+    for count, chunk in batches:
+        if job and job.cancel_requested():
+            stats["cancelled"] = True
+            break
+        products, variants, skipped = prepare_chunk(chunk, positions, lookups)
+        skipped += count - len(chunk)
+        updated_ids, unchanged = [], 0
+        with database.connection_manager.connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                if mode == "upsert":
+                    product_ids, updated_ids, unchanged, unkeyed = merge_products(
+                        c, products, variants, key, fields, updated_by)
+                    skipped += unkeyed
+                else:
+                    product_ids = write_products(c, products, variants)
+                after = dict(stats, rows=stats["rows"] + count, imported=stats["imported"] + len(product_ids),
+                             updated=stats["updated"] + len(updated_ids), unchanged=stats["unchanged"] + unchanged,
+                             variants=stats["variants"] + len(variants), skipped=stats["skipped"] + skipped,
+                             chunks=stats["chunks"] + 1)
+                if job:
+                    job.checkpoint(c, after)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        catalog_index.refresh(product_ids + updated_ids)
+
+        stats = after
+        stats["seconds"] = time.perf_counter() - started
+        stats["rows_per_sec"] = (stats["rows"] - resumed_rows) / stats["seconds"] if stats["seconds"] else 0.0
+        if on_progress:
+            on_progress(dict(stats))
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_sec"] = (stats["rows"] - resumed_rows) / stats["seconds"] if stats["seconds"] else 0.0
+    stats["peak_memory_mb"] = peak_memory_mb()
+    return stats
+
+
+def import_catalog(path, mapping, chunk_size=5000, on_progress=None, mode="insert", key="Barcode",
+                   updated_by=None, validate=True, workers=None, rejected_path=None, job=None):
+    """Import the file's rows as new products (or upsert them); returns run statistics.
+
+    With `validate`, rows are checked on a process pool first (see
+    import_validation); rejected rows and their reasons go to
+    `rejected_path` (default: <file>_rejected.xlsx), named in
+    stats["rejected_file"] when there were any.
+    """
+    rows = iter_rows(path)
+    validator = None
+    try:
+        columns = column_names(next(rows, ()))
+        positions = {field: columns.index(column) for field, column in mapping.items() if column in columns}
+        if validate:
+            # pandas is only loaded for validated imports
+            from import_validation import ChunkValidator, rejected_path_for
+            validator = ChunkValidator(positions, columns, check_database=mode == "insert", workers=workers,
+                                       rejected_path=rejected_path or rejected_path_for(path))
+        stats = import_rows(rows, positions, chunk_size, on_progress, mode, key, updated_by, validator, job)
+    finally:
+        rows.close()
+        rejected_file = validator.close() if validator else None
+    if validator:
+        stats["rejected_file"] = rejected_file
+        stats["reasons"] = dict(validator.reasons)
+    return stats
@@ -0,0 +1,210 @@
+# catalog_index.py
+"""In-memory barcode -> product index for POS scans.
+
+The index is loaded once (one pass over products and product_variants) and
+then answers scans from dicts, without touching SQLite. Writers that change
+a product's barcode, name, price or stock call refresh() with the affected
+ids; sales adjust stock in place with adjust_stock().
+"""
+import os
+import threading
+import database
+
+
+class ProductEntry:
+    __slots__ = ("name", "price", "stock", "barcode", "sizes", "variant_barcodes")
+
+    def __init__(self, name, price, stock, barcode):
+        self.name = name
+        self.price = price
+        self.stock = stock
+        self.barcode = barcode
+        self.sizes = None             # tuple of 'Size' variant values
+        self.variant_barcodes = None  # tuple of barcodes from product_variants
+
+
+class CatalogIndex:
+    def __init__(self):
+        self._products = {}
+        self._by_barcode = {}  # barcode -> product id, or tuple of ids for duplicates
+        self._lock = threading.RLock()
+        self._db_path = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """callback(product_ids) runs on every refresh(), loaded or not."""
+        self._listeners.append(callback)
+
+    # ---------- loading ----------
+    @property
+    def loaded(self):
+        return self._db_path is not None and self._db_path == os.path.abspath(database.DB_FILE)
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def load(self):
+        """(Re)build the whole index from the database."""
+        products = {}
+        with database.connection_manager.connection() as conn:
+            for pid, name, price, stock, barcode in conn.execute(
+                    "SELECT id, name, selling_price, stock, barcode FROM products"):
+                products[pid] = ProductEntry(name, price, stock, barcode)
+            variants = conn.execute("""
+                SELECT product_id, variant_name, variant_value, barcode
+                FROM product_variants
+                WHERE variant_name = 'Size' OR (barcode IS NOT NULL AND barcode != '')
+                ORDER BY id
+            """).fetchall()
+        self._attach_variants(products, variants)
+
+        by_barcode = {}
+        for pid, entry in products.items():
+            for code in self._barcodes_of(entry):
+                self._add_code(by_barcode, code, pid)
+
+        with self._lock:
+            self._products = products
+            self._by_barcode = by_barcode
+            self._db_path = os.path.abspath(database.DB_FILE)
+
+    def invalidate(self):
+        with self._lock:
+            self._products = {}
+            self._by_barcode = {}
+            self._db_path = None
+
+    # ---------- lookups ----------
+    def lookup(self, barcode):
+        """Rows shaped like the POS barcode query: (id, name, price, stock, barcode, size).
+
+        A product with several Size variants yields one row per size, and a
+        barcode shared by several products yields rows for each of them.
+        """
+        ids = self._by_barcode.get(barcode)
+        if ids is None:
+            return []
+        if not isinstance(ids, tuple):
+            ids = (ids,)
+        rows = []
+        for pid in ids:
+            entry = self._products.get(pid)
+            if entry is None:
+                continue
+            for size in entry.sizes or (None,):
+                rows.append((pid, entry.name, entry.price, entry.stock, entry.barcode, size))
+        return rows
+
+    def get(self, product_id):
+        return self._products.get(product_id)
+
+    def __len__(self):
+        return len(self._products)
+
+    @property
+    def barcode_count(self):
+        return len(self._by_barcode)
+
+    # ---------- incremental maintenance ----------
+    def refresh(self, product_ids):
+        """Reload the given products from the database (deleted ones are dropped)."""
+        product_ids = list(product_ids)
+        for callback in self._listeners:
+            callback(product_ids)
+        if not self.loaded:
+            return
+        ids = sorted({int(pid) for pid in product_ids if pid is not None})
+        if not ids:
+            return
+
+        fresh = {}
+        variants = []
+        with database.connection_manager.connection() as conn:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                for pid, name, price, stock, barcode in conn.execute(
+                        f"SELECT id, name, selling_price, stock, barcode FROM products WHERE id IN ({marks})", chunk):
+                    fresh[pid] = ProductEntry(name, price, stock, barcode)
+                variants.extend(conn.execute(f"""
+                    SELECT product_id, variant_name, variant_value, barcode
+                    FROM product_variants
+                    WHERE product_id IN ({marks})
+                      AND (variant_name = 'Size' OR (barcode IS NOT NULL AND barcode != ''))
+                    ORDER BY id
+                """, chunk).fetchall())
+        self._attach_variants(fresh, variants)
+
+        with self._lock:
+            for pid in ids:
+                old = self._products.pop(pid, None)
+                if old is not None:
+                    for code in self._barcodes_of(old):
+                        self._remove_code(self._by_barcode, code, pid)
+                entry = fresh.get(pid)
+                if entry is not None:
+                    self._products[pid] = entry
+                    for code in self._barcodes_of(entry):
+                        self._add_code(self._by_barcode, code, pid)
+
+    def adjust_stock(self, deltas):
+        """Apply {product_id: delta} stock changes already committed to the database."""
+        with self._lock:
+            for pid, delta in deltas.items():
+                entry = self._products.get(pid)
+                if entry is not None:
+                    entry.stock = (entry.stock or 0) + delta
+
+    # ---------- helpers ----------
+    @staticmethod
+    def _attach_variants(products, variants):
+        sizes, codes = {}, {}
+        for pid, variant_name, value, barcode in variants:
+            if pid not in products:
+                continue
+            if variant_name == "Size":
+                sizes.setdefault(pid, []).append(value)
+            if barcode:
+                codes.setdefault(pid, []).append(barcode)
+        for pid, values in sizes.items():
+            products[pid].sizes = tuple(values)
+        for pid, values in codes.items():
+            products[pid].variant_barcodes = tuple(values)
+
+    @staticmethod
+    def _barcodes_of(entry):
+        codes = set(entry.variant_barcodes or ())
+        if entry.barcode:
+            codes.add(entry.barcode)
+        return codes
+
+    @staticmethod
+    def _add_code(by_barcode, code, pid):
+        current = by_barcode.get(code)
+        if current is None:
+            by_barcode[code] = pid
+        elif isinstance(current, tuple):
+            if pid not in current:
+                by_barcode[code] = current + (pid,)
+        elif current != pid:
+            by_barcode[code] = (current, pid)
+
+    @staticmethod
+    def _remove_code(by_barcode, code, pid):
+        current = by_barcode.get(code)
+        if current is None:
+            return
+        if isinstance(current, tuple):
+            remaining = tuple(p for p in current if p != pid)
+            if len(remaining) == 1:
+                by_barcode[code] = remaining[0]
+            elif remaining:
+                by_barcode[code] = remaining
+            else:
+                del by_barcode[code]
+        elif current == pid:
+            del by_barcode[code]
+
+
+catalog_index = CatalogIndex()
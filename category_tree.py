@@ -0,0 +1,99 @@
+# category_tree.py
+"""Category hierarchy: an in-memory adjacency map and closure-table queries.
+
+load_tree() reads the categories once and builds parent -> children lists
+in one pass, so the Categories screen can insert a node's children when
+it is opened instead of walking the whole list per node.
+
+Subtree questions ("all products under Beverages") go to the
+category_closure table the migrations keep in step with categories.parent_id:
+
+    ids = subtree_ids(beverages_id)                      # Beverages and every descendant
+    sql = f"SELECT COUNT(*) FROM products p WHERE {SUBTREE_FILTER}"
+    fetch_one(sql, (beverages_id,))
+"""
+import database
+
+# Products whose category is the bound category or any category below it
+SUBTREE_FILTER = "p.category_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = ?)"
+
+
+class CategoryTree:
+    def __init__(self, rows):
+        """rows: (id, name, parent_id, location_tag), ordered by name."""
+        self.nodes = {}
+        self.children = {}
+        for row in rows:
+            self.nodes[row[0]] = row
+            self.children.setdefault(row[2], []).append(row[0])
+        # A parent that no longer exists leaves its children at the top level
+        orphans = [cid for parent, ids in self.children.items()
+                   if parent is not None and parent not in self.nodes for cid in ids]
+        self.roots = sorted(self.children.get(None, []) + orphans, key=lambda cid: self.nodes[cid][1])
+
+    def children_of(self, category_id):
+        return self.roots if category_id is None else self.children.get(category_id, [])
+
+    def has_children(self, category_id):
+        return bool(self.children.get(category_id))
+
+    def add(self, row):
+        self.nodes[row[0]] = row
+        (self.children.setdefault(row[2], []) if row[2] is not None else self.roots).append(row[0])
+
+    def _detach(self, category_id):
+        row = self.nodes.pop(category_id)
+        # An orphan promoted to the top level is in roots, not under its stale parent
+        for siblings in (self.children.get(row[2], []), self.roots):
+            if category_id in siblings:
+                siblings.remove(category_id)
+        return row
+
+    def remove(self, category_id):
+        """Drop a category; its children move up to its parent, as the delete trigger does."""
+        row = self._detach(category_id)
+        parent_id = row[2] if row[2] in self.nodes else None
+        for child_id in self.children.pop(category_id, []):
+            child = self.nodes[child_id]
+            self.nodes[child_id] = (child[0], child[1], parent_id, child[3])
+            (self.children.setdefault(parent_id, []) if parent_id is not None else self.roots).append(child_id)
+
+    def move(self, category_id, parent_id):
+        row = self._detach(category_id)
+        self.add((row[0], row[1], parent_id, row[3]))
+
+    def rename(self, category_id, name=None, location_tag=None):
+        row = self.nodes[category_id]
+        self.nodes[category_id] = (row[0], row[1] if name is None else name, row[2],
+                                   row[3] if location_tag is None else location_tag)
+
+
+def load_tree():
+    return CategoryTree(database.fetch_all("SELECT id, name, parent_id, location_tag FROM categories ORDER BY name"))
+
+
+def subtree_ids(category_id):
+    """The category and all its descendants."""
+    return [row[0] for row in database.fetch_all(
+        "SELECT descendant_id FROM category_closure WHERE ancestor_id = ? ORDER BY depth, descendant_id",
+        (category_id,))]
+
+
+def ancestor_ids(category_id):
+    """The category's ancestors, nearest first (the category itself excluded)."""
+    return [row[0] for row in database.fetch_all(
+        "SELECT ancestor_id FROM category_closure WHERE descendant_id = ? AND depth > 0 ORDER BY depth",
+        (category_id,))]
+
+
+def product_count(category_id):
+    """Products in the category or anywhere below it."""
+    return database.fetch_one(f"SELECT COUNT(*) FROM products p WHERE {SUBTREE_FILTER}", (category_id,))[0]
+
+
+def move_category(category_id, parent_id):
+    """Re-parent a category (None for top level); the closure table follows by trigger."""
+    if parent_id is not None and int(parent_id) in subtree_ids(category_id):
+        raise ValueError("A category cannot be moved under itself or one of its sub-categories")
+    database.execute_query("UPDATE categories SET parent_id = ? WHERE id = ?",
+                           (int(parent_id) if parent_id is not None else None, int(category_id)))
@@ -0,0 +1,11 @@
+# config.py
+import os
+
+# Identifies this till in document numbers (INV-<terminal>-0000001); must be
+# unique per machine that shares a store.db.
+TERMINAL_ID = os.environ.get("POS_TERMINAL_ID", "T1")
+
+# Per-machine files (the sale journal) live on this till's own disk, never
+# next to a store.db that other tills may share.
+LOCAL_DATA_DIR = os.environ.get("POS_LOCAL_DATA_DIR") or os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".local", "share"), "store_pos")
@@ -0,0 +1,178 @@
+# forecasting.py
+"""Vectorized demand forecasts for Smart Order.
+
+The daily_product_sales rollup for the analysis window is loaded into one
+products x days NumPy matrix and every forecast is computed for all
+products at once:
+
+    moving_average  mean daily demand over the last `window` days
+    exp_smoothing   simple exponential smoothing (one matrix-vector product)
+    seasonal        moving average over whole weeks, spread over the coming
+                    days with each product's weekday profile
+
+Forecast methods order enough to cover the supplier's lead time plus the
+days needed, plus safety stock z * sigma * sqrt(lead_time_days) for the
+chosen service level. "simple" is the reorder engine's average over sale
+days, unchanged.
+"""
+from statistics import NormalDist
+
+import numpy as np
+
+import database
+from reorder_engine import reorder_candidates, suggest_orders
+
+METHODS = {
+    "simple": "Simple Average",
+    "moving_average": "Moving Average",
+    "exp_smoothing": "Exponential Smoothing",
+    "seasonal": "Weekday Seasonal",
+}
+
+
+def demand_matrix(start_date, end_date, product_ids, supplier_id=None):
+    """Daily quantities, one row per id in the sorted `product_ids` array and one column per day."""
+    days = (end_date - start_date).days + 1
+    matrix = np.zeros((len(product_ids), max(days, 0)))
+    query = """
+        SELECT product_id, CAST(julianday(sale_date) - julianday(?) AS INTEGER), qty
+        FROM daily_product_sales
+        WHERE sale_date BETWEEN ? AND ?
+    """
+    params = [str(start_date), str(start_date), str(end_date)]
+    if supplier_id:
+        query += " AND product_id IN (SELECT product_id FROM supplier_prices WHERE supplier_id = ? AND is_active = 1)"
+        params.append(supplier_id)
+    with database.connection_manager.connection() as conn:
+        # Straight from the cursor into typed columns, no list of row tuples in between
+        rows = np.fromiter(conn.execute(query, params), dtype=[("pid", np.int64), ("day", np.intp), ("qty", float)])
+    if len(product_ids) and len(rows):
+        idx = np.searchsorted(product_ids, rows["pid"]).clip(max=len(product_ids) - 1)
+        known = product_ids[idx] == rows["pid"]
+        matrix[idx[known], rows["day"][known]] = rows["qty"][known]
+    # Days where returns outweighed sales are no demand, not negative demand
+    return np.maximum(matrix, 0, out=matrix)
+
+
+def moving_average(matrix, window=28):
+    days = min(window, matrix.shape[1])
+    if days == 0:
+        return np.zeros(matrix.shape[0])
+    return matrix[:, -days:].mean(axis=1)
+
+
+def exp_smoothing(matrix, alpha=0.3):
+    """Last level of l[t] = alpha * x[t] + (1 - alpha) * l[t-1], with l[0] = x[0]."""
+    days = matrix.shape[1]
+    if days == 0:
+        return np.zeros(matrix.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return matrix @ weights
+
+
+def weekday_profile(matrix, start_date):
+    """(products x 7) mean demand on each weekday over the overall mean; 1 where unknown.
+
+    Needs two full weeks of history, otherwise every weekday counts the same.
+    """
+    days = matrix.shape[1]
+    if days < 14:
+        return np.ones((matrix.shape[0], 7))
+    weekdays = (start_date.weekday() + np.arange(days)) % 7
+    means = np.column_stack([matrix[:, weekdays == day].mean(axis=1) for day in range(7)])
+    overall = matrix.mean(axis=1)[:, None]
+    return np.divide(means, overall, out=np.ones_like(means), where=overall > 0)
+
+
+def expected_demand(matrix, start_date, method, rows, horizons, window=28, alpha=0.3):
+    """Demand over the `horizons[i]` days after the history, for product row `rows[i]`."""
+    if method == "moving_average":
+        return moving_average(matrix, window)[rows] * horizons
+    if method == "exp_smoothing":
+        return exp_smoothing(matrix, alpha)[rows] * horizons
+    if method != "seasonal":
+        raise ValueError(f"Unknown forecast method: {method}")
+
+    # Whole weeks, so the level is not biased towards the busier weekdays
+    level = moving_average(matrix, max(7, window - window % 7))
+    profile = weekday_profile(matrix, start_date)
+    first = (start_date.weekday() + matrix.shape[1]) % 7
+    steps = (first + np.arange(int(horizons.max(initial=0)))) % 7
+    cumulative = np.zeros((len(profile), len(steps) + 1))
+    np.cumsum(profile[:, steps], axis=1, out=cumulative[:, 1:])
+    return level[rows] * cumulative[rows, horizons]
+
+
+def safety_stock(matrix, rows, lead_times, service_level=0.95):
+    """z * (std of daily demand) * sqrt(lead time) per candidate row."""
+    if matrix.shape[1] < 2:
+        return np.zeros(len(rows))
+    sigma = matrix.std(axis=1, ddof=1)
+    z = NormalDist().inv_cdf(service_level)
+    return z * sigma[rows] * np.sqrt(lead_times)
+
+
+def demand_products(supplier_id=None):
+    """Sorted ids of the products with an active supplier price (optionally one supplier's)."""
+    query = "SELECT DISTINCT product_id FROM supplier_prices WHERE is_active = 1"
+    params = []
+    if supplier_id:
+        query += " AND supplier_id = ?"
+        params.append(supplier_id)
+    with database.connection_manager.connection() as conn:
+        return np.sort(np.fromiter((row[0] for row in conn.execute(query, params)), dtype=np.int64))
+
+
+def forecast_orders(start_date, end_date, days_needed, method="seasonal", supplier_id=None,
+                    window=28, alpha=0.3, service_level=0.95):
+    """Items to order, in the same shape as reorder_engine.suggest_orders()."""
+    if method == "simple":
+        return suggest_orders(start_date, end_date, days_needed, supplier_id)
+    product_ids = demand_products(supplier_id)
+    matrix = demand_matrix(start_date, end_date, product_ids, supplier_id)
+    return forecast_items(reorder_candidates(supplier_id), product_ids, matrix, start_date,
+                          days_needed, method, window, alpha, service_level)
+
+
+def forecast_items(candidates, product_ids, matrix, start_date, days_needed, method="seasonal",
+                   window=28, alpha=0.3, service_level=0.95):
+    """forecast_orders() for given candidate rows and a demand_matrix() covering their products."""
+    if not candidates:
+        return []
+    candidate_pids = np.array([c[0] for c in candidates], dtype=np.int64)
+    pids, rows = np.unique(candidate_pids, return_inverse=True)
+    # Only the candidates' rows, so a per-supplier call costs its share of the matrix;
+    # a candidate the matrix does not cover gets a zero-demand row
+    candidate_matrix = np.zeros((len(pids), matrix.shape[1]))
+    if len(product_ids):
+        idx = np.searchsorted(product_ids, pids).clip(max=len(product_ids) - 1)
+        known = product_ids[idx] == pids
+        candidate_matrix[known] = matrix[idx[known]]
+    matrix = candidate_matrix
+    stock = np.array([c[2] or 0 for c in candidates], dtype=float)
+    lead_times = np.array([c[7] or 0 for c in candidates], dtype=np.intp)
+    horizons = lead_times + days_needed
+
+    demand = expected_demand(matrix, start_date, method, rows, horizons, window, alpha)
+    safety = safety_stock(matrix, rows, lead_times, service_level)
+    suggested = np.maximum(0, np.round(demand + safety - stock, 2))
+
+    items = []
+    for i in np.flatnonzero(suggested > 0):
+        product_id, name, current_stock, category_id, sup_id, sup_name, cost_price, lead_time = candidates[i]
+        items.append({
+            'product_id': product_id,
+            'name': name,
+            'current_stock': current_stock,
+            'daily_consumption': float(demand[i] / horizons[i]) if horizons[i] else 0.0,
+            'days_needed': days_needed,
+            'suggested_qty': float(suggested[i]),
+            'supplier_id': sup_id,
+            'supplier_name': sup_name,
+            'cost_price': cost_price or 0.0,
+            'lead_time_days': lead_time,
+            'forecast_qty': float(demand[i]),
+            'safety_stock': float(safety[i]),
+        })
+    return items
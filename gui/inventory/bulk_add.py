@@ -1,7 +1,8 @@
 # gui/inventory/bulk_add.py
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from database import fetch_all, execute_query, fetch_one
+from database import fetch_all
+from catalog_import import FIELDS, import_rows, summary_text
 
 class BulkAddWindow:
     def __init__(self, parent, user):
@@ -36,6 +37,11 @@ class BulkAddWindow:
         tk.Button(btn_frame, text="❌ Cancel", font=("Arial", 12, "bold"), bg="#A9A9A9", fg="white",
                   command=self.window.destroy).pack(side=tk.LEFT, padx=5)
 
+        self.upsert_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(btn_frame, text="Update existing items with the same barcode", variable=self.upsert_var,
+                       font=("Arial", 10), fg="white", bg="#0d1b2a", selectcolor="#1b263b",
+                       activebackground="#0d1b2a").pack(side=tk.LEFT, padx=15)
+
         # Main container with scrollbars
         main_frame = tk.Frame(self.window, bg="white", relief=tk.RAISED, borderwidth=1)
         main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -205,73 +211,35 @@ class BulkAddWindow:
             messagebox.showwarning("No Data", "No items to save.")
             return
 
-        saved_count = 0
+        rows = []
         for row_entries in self.entries:
-            try:
-                values = []
-                for entry in row_entries:
-                    if hasattr(entry, 'get'):
-                        values.append(entry.get().strip())
-                    else:
-                        values.append("")
-                
-                if not any(values):
-                    continue
-
-                barcode, company, name, variant, size, unit, category, supplier, cost, sale, stock = values + [""] * (11 - len(values))
-
-                if not name:
-                    messagebox.showwarning("Missing Data", "Product name is required.")
-                    return
-
-                try:
-                    cost_val = float(cost) if cost else 0.0
-                    sale_val = float(sale) if sale else 0.0
-                    stock_val = float(stock) if stock else 0.0
-                except ValueError:
-                    messagebox.showerror("Invalid Input", "Cost, Sale, and Stock must be numbers.")
-                    return
-
-                category_id = None
-                if category:
-                    cat = fetch_one("SELECT id FROM categories WHERE name = ?", (category,))
-                    if cat:
-                        category_id = cat[0]
-
-                supplier_id = None
-                if supplier:
-                    sup = fetch_one("SELECT id FROM suppliers WHERE name = ?", (supplier,))
-                    if sup:
-                        supplier_id = sup[0]
-
-                unit_id = 1
-                if unit:
-                    uom = fetch_one("SELECT id FROM uoms WHERE name = ?", (unit,))
-                    if uom:
-                        unit_id = uom[0]
-
-                product_id = execute_query("""
-                    INSERT INTO products (name, barcode, company, category_id, supplier_id, tax_id, base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (name, barcode or None, company or None, category_id, supplier_id, 1, unit_id, unit_id, cost_val, sale_val, stock_val))
+            values = [entry.get().strip() if hasattr(entry, 'get') else "" for entry in row_entries]
+            values += [""] * (len(FIELDS) - len(values))
+            if not any(values):
+                continue
 
-                if variant:
-                    execute_query("""
-                        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (product_id, "Variant", variant, None, sale_val, stock_val))
-
-                if size:
-                    execute_query("""
-                        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (product_id, "Size", size, None, sale_val, stock_val))
-
-                saved_count += 1
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save item '{name}': {str(e)}")
+            if not values[FIELDS.index("Name")]:
+                messagebox.showwarning("Missing Data", "Product name is required.")
+                return
+            try:
+                for field in ("Cost", "Sale", "Stock"):
+                    float(values[FIELDS.index(field)] or 0)
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Cost, Sale, and Stock must be numbers.")
                 return
+            rows.append(tuple(values))
+
+        # One transaction for the whole grid; matched barcodes update in place when asked
+        mode = "upsert" if self.upsert_var.get() else "insert"
+        try:
+            stats = import_rows(rows, {field: i for i, field in enumerate(FIELDS)}, mode=mode,
+                                updated_by=self.user['id'])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save items: {str(e)}")
+            return
 
-        messagebox.showinfo("Success", f"✅ {saved_count} items saved successfully!")
-        self.window.destroy()
\ No newline at end of file
+        if mode == "upsert":
+            messagebox.showinfo("Success", f"✅ Items saved: {summary_text(stats)}")
+        else:
+            messagebox.showinfo("Success", f"✅ {stats['imported']} items saved successfully!")
+        self.window.destroy()
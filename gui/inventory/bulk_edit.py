@@ -0,0 +1,121 @@
+# gui/inventory/bulk_edit.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+from database import fetch_all
+from catalog_bulk import reprice, reassign, set_tax_type
+from catalog_grid import TAX_METHODS
+
+OPERATIONS = ["Change sale price by %", "Change sale price by amount", "Change cost price by %",
+              "Change cost price by amount", "Move to category", "Change supplier", "Change tax method"]
+
+
+class BulkEditWindow:
+    def __init__(self, parent, user, query, selected_ids, on_done=None):
+        self.parent = parent
+        self.user = user
+        self.query = query                  # CatalogQuery for the grid's current filter
+        self.selected_ids = [int(pid) for pid in selected_ids]
+        self.on_done = on_done
+        self.window = tk.Toplevel(parent)
+        self.window.title("✏️ Bulk Edit Items - Crown Supermarket")
+        self.window.geometry("520x360")
+        self.window.configure(bg="#0d1b2a")
+        self.window.transient(parent)
+        self.window.grab_set()
+        self.categories = {row[1]: row[0] for row in fetch_all("SELECT id, name FROM categories ORDER BY name")}
+        self.suppliers = {row[1]: row[0] for row in fetch_all("SELECT id, name FROM suppliers ORDER BY name")}
+        self.setup_ui()
+
+    def setup_ui(self):
+        header = tk.Frame(self.window, bg="#1b263b", height=60)
+        header.pack(fill=tk.X)
+        tk.Label(header, text="✏️ Bulk Edit Items", font=("Arial", 16, "bold"), fg="gold", bg="#1b263b").pack(pady=15)
+
+        body = tk.Frame(self.window, bg="#0d1b2a")
+        body.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+
+        # Target
+        tk.Label(body, text="Apply to:", font=("Arial", 11, "bold"), fg="white", bg="#0d1b2a").grid(
+            row=0, column=0, sticky="w", pady=5)
+        self.target_var = tk.StringVar(value="selection" if self.selected_ids else "filter")
+        selection = tk.Radiobutton(body, text=f"Selected items ({len(self.selected_ids)})", variable=self.target_var,
+                                   value="selection", fg="white", bg="#0d1b2a", selectcolor="#1b263b",
+                                   activebackground="#0d1b2a")
+        selection.grid(row=0, column=1, sticky="w")
+        if not self.selected_ids:
+            selection.config(state=tk.DISABLED)
+        tk.Radiobutton(body, text=f"All items matching the filter ({self.query.count():,})", variable=self.target_var,
+                       value="filter", fg="white", bg="#0d1b2a", selectcolor="#1b263b",
+                       activebackground="#0d1b2a").grid(row=1, column=1, sticky="w")
+
+        # Operation
+        tk.Label(body, text="Change:", font=("Arial", 11, "bold"), fg="white", bg="#0d1b2a").grid(
+            row=2, column=0, sticky="w", pady=(15, 5))
+        self.operation_var = tk.StringVar(value=OPERATIONS[0])
+        operation = ttk.Combobox(body, textvariable=self.operation_var, values=OPERATIONS, state="readonly", width=32)
+        operation.grid(row=2, column=1, sticky="w", pady=(15, 5))
+        operation.bind("<<ComboboxSelected>>", lambda e: self.show_value_input())
+
+        tk.Label(body, text="Value:", font=("Arial", 11, "bold"), fg="white", bg="#0d1b2a").grid(
+            row=3, column=0, sticky="w", pady=5)
+        self.value_var = tk.StringVar()
+        self.value_entry = tk.Entry(body, textvariable=self.value_var, font=("Arial", 11), width=20)
+        self.value_combo = ttk.Combobox(body, textvariable=self.value_var, state="readonly", width=32)
+        self.show_value_input()
+
+        btn_frame = tk.Frame(self.window, bg="#0d1b2a")
+        btn_frame.pack(fill=tk.X, padx=20, pady=15)
+        tk.Button(btn_frame, text="✅ Apply", font=("Arial", 12, "bold"), bg="#2E8B57", fg="white",
+                  command=self.apply).pack(side=tk.LEFT, padx=5)
+        tk.Button(btn_frame, text="❌ Cancel", font=("Arial", 12, "bold"), bg="#A9A9A9", fg="white",
+                  command=self.window.destroy).pack(side=tk.LEFT, padx=5)
+
+    def show_value_input(self):
+        operation = self.operation_var.get()
+        choices = {"Move to category": list(self.categories), "Change supplier": list(self.suppliers),
+                   "Change tax method": list(TAX_METHODS)}.get(operation)
+        self.value_var.set("")
+        if choices is None:
+            self.value_combo.grid_forget()
+            self.value_entry.grid(row=3, column=1, sticky="w", pady=5)
+        else:
+            self.value_entry.grid_forget()
+            self.value_combo['values'] = choices
+            self.value_combo.grid(row=3, column=1, sticky="w", pady=5)
+
+    def apply(self):
+        operation = self.operation_var.get()
+        value = self.value_var.get().strip()
+        if not value:
+            messagebox.showwarning("Missing Value", "Enter or choose a value.", parent=self.window)
+            return
+        target = self.selected_ids if self.target_var.get() == "selection" else self.query
+        count = len(self.selected_ids) if target is self.selected_ids else self.query.count()
+        if not messagebox.askyesno("Confirm", f"{operation} '{value}' for {count:,} item(s)?", parent=self.window):
+            return
+        try:
+            if operation.startswith("Change sale price") or operation.startswith("Change cost price"):
+                try:
+                    number = float(value)
+                except ValueError:
+                    messagebox.showerror("Invalid Input", "Please enter a valid number.", parent=self.window)
+                    return
+                field = "selling_price" if "sale" in operation else "cost_price"
+                if operation.endswith("%"):
+                    result = reprice(target, percent=number, field=field, updated_by=self.user['id'])
+                else:
+                    result = reprice(target, amount=number, field=field, updated_by=self.user['id'])
+            elif operation == "Move to category":
+                result = reassign(target, category_id=self.categories[value])
+            elif operation == "Change supplier":
+                result = reassign(target, supplier_id=self.suppliers[value])
+            else:
+                result = set_tax_type(target, TAX_METHODS[value])
+        except Exception as e:
+            messagebox.showerror("Error", f"Bulk edit failed: {str(e)}", parent=self.window)
+            return
+        messagebox.showinfo("Success", f"{result['changed']:,} of {result['matched']:,} item(s) changed "
+                                       f"in {result['seconds']:.1f}s.", parent=self.window)
+        self.window.destroy()
+        if self.on_done:
+            self.on_done(result)
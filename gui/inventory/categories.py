@@ -2,6 +2,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu
 from database import get_db_connection
+from category_tree import load_tree, move_category
+
+PLACEHOLDER = "placeholder-"
 
 class CategoriesManager:
     def __init__(self, parent, user):
@@ -87,6 +90,7 @@ class CategoriesManager:
 
         self.tree.bind("<Double-1>", self.on_double_click)
         self.tree.bind("<Button-3>", self.show_context_menu)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
 
         self.context_menu = Menu(self.tree, tearoff=0)
         self.context_menu.add_command(label="✏️ Edit", command=self.start_edit)
@@ -95,64 +99,74 @@ class CategoriesManager:
         self.editing_item = None
         self.editing_column = None
         self.entry = None
+        self.hierarchy = None
+        self.expanded_nodes = set()
 
     def save_expanded_state(self):
         """Save which nodes are expanded"""
-        self.expanded_nodes = []
+        self.expanded_nodes = set()
+
         def traverse(item):
             if self.tree.item(item, "open"):
-                self.expanded_nodes.append(item)
+                self.expanded_nodes.add(item)
             for child in self.tree.get_children(item):
                 traverse(child)
         for child in self.tree.get_children():
             traverse(child)
 
     def restore_expanded_state(self):
-        """Re-expand nodes that were expanded before reload"""
-        def traverse(item):
-            if item in self.expanded_nodes:
-                self.tree.item(item, open=True)
-            for child in self.tree.get_children(item):
-                traverse(child)
-        for child in self.tree.get_children():
-            traverse(child)
+        """Re-expand nodes that were expanded before reload, loading their children on the way"""
+        pending = [item for item in self.tree.get_children() if item in self.expanded_nodes]
+        while pending:
+            item = pending.pop()
+            self.expand(item)
+            pending.extend(child for child in self.tree.get_children(item) if child in self.expanded_nodes)
 
     def load_categories(self):
         # Save expanded state before reload
         self.save_expanded_state()
-        
-        for item in self.tree.get_children():
-            self.tree.delete(item)
 
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT id, name, parent_id, location_tag FROM categories ORDER BY name")
-        categories = c.fetchall()
-        conn.close()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+
+        self.hierarchy = load_tree()
+        self.category_map = self.hierarchy.nodes
+
+        # Only the top level goes in now; children are inserted when a node is opened
+        for category_id in self.hierarchy.roots:
+            self.insert_node("", category_id)
 
-        self.category_map = {cat[0]: cat for cat in categories}
-
-        # Insert root categories
-        for cat in categories:
-            if cat[2] is None:
-                loc = cat[3] if cat[3] is not None else ""
-                self.tree.insert("", "end", iid=cat[0], text=cat[1], values=(cat[0], cat[1], loc))
-
-        # Insert child categories recursively
-        def insert_children(parent_id, parent_iid):
-            for cat in categories:
-                if cat[2] == parent_id:
-                    loc = cat[3] if cat[3] is not None else ""
-                    child_iid = self.tree.insert(parent_iid, "end", iid=cat[0], text=cat[1], values=(cat[0], cat[1], loc))
-                    insert_children(cat[0], child_iid)
-
-        for cat in categories:
-            if cat[2] is None:
-                insert_children(cat[0], str(cat[0]))
-        
         # Restore expanded state
         self.restore_expanded_state()
 
+    def insert_node(self, parent_iid, category_id, index="end"):
+        cat = self.hierarchy.nodes[category_id]
+        loc = cat[3] if cat[3] is not None else ""
+        iid = self.tree.insert(parent_iid, index, iid=cat[0], text=cat[1], values=(cat[0], cat[1], loc))
+        if self.hierarchy.has_children(category_id):
+            # Gives the node an expand arrow until its real children are loaded
+            self.tree.insert(iid, "end", iid=f"{PLACEHOLDER}{cat[0]}", text="")
+        return iid
+
+    def load_children(self, iid):
+        """Replace a node's placeholder with its children; no-op once loaded."""
+        placeholder = f"{PLACEHOLDER}{iid}"
+        if not self.tree.exists(placeholder):
+            return
+        self.tree.delete(placeholder)
+        for category_id in self.hierarchy.children_of(int(iid)):
+            self.insert_node(iid, category_id)
+
+    def expand(self, iid):
+        self.load_children(iid)
+        self.tree.item(iid, open=True)
+
+    def on_open(self, event=None):
+        item = self.tree.focus()
+        if item:
+            self.load_children(item)
+
     def add_empty_row(self):
         conn = get_db_connection()
         c = conn.cursor()
@@ -161,6 +175,7 @@ class CategoriesManager:
         conn.commit()
         conn.close()
 
+        self.hierarchy.add((new_id, "", None, ""))
         self.tree.insert("", "end", iid=new_id, text="", values=(new_id, "", ""))
         self.tree.selection_set(new_id)
         self.tree.focus(new_id)
@@ -220,9 +235,11 @@ class CategoriesManager:
         c = conn.cursor()
         if self.editing_column == "Name":
             c.execute("UPDATE categories SET name = ? WHERE id = ?", (new_value, int(self.editing_item)))
+            self.hierarchy.rename(int(self.editing_item), name=new_value)
         else:
             loc_val = new_value if new_value != "" else None
             c.execute("UPDATE categories SET location_tag = ? WHERE id = ?", (loc_val, int(self.editing_item)))
+            self.hierarchy.rename(int(self.editing_item), location_tag=new_value)
         conn.commit()
         conn.close()
 
@@ -271,6 +288,7 @@ class CategoriesManager:
             try:
                 c.execute("DELETE FROM categories WHERE id = ?", (category_id,))
                 conn.commit()
+                self.hierarchy.remove(category_id)
                 self.tree.delete(selection[0])
                 messagebox.showinfo("Success", "Category deleted!")
             except Exception as e:
@@ -330,15 +348,21 @@ class CategoriesManager:
             self.tree.selection_set(item_id)
 
     def _change_parent(self, item_id, new_parent_id):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
             parent_id = int(new_parent_id) if new_parent_id else None
-            c.execute("UPDATE categories SET parent_id = ? WHERE id = ?", (parent_id, int(item_id)))
-            conn.commit()
-            self.load_categories()  # This now preserves expanded state!
-            self.tree.selection_set(item_id)
+            move_category(int(item_id), parent_id)
         except Exception as e:
             messagebox.showerror("Error", f"Move failed: {str(e)}")
-        finally:
-            conn.close()
\ No newline at end of file
+            return
+
+        # Move the node (and whatever of its subtree is loaded) instead of reloading the tree.
+        # The new parent's existing children are loaded before the map lists the moved node under it.
+        if new_parent_id:
+            self.expand(new_parent_id)
+        self.hierarchy.move(int(item_id), parent_id)
+        if self.tree.parent(item_id) != new_parent_id:
+            names = [self.tree.item(sibling, "text").lower() for sibling in self.tree.get_children(new_parent_id)]
+            index = sum(1 for name in names if name < self.tree.item(item_id, "text").lower())
+            self.tree.move(item_id, new_parent_id, index)
+        self.tree.selection_set(item_id)
+        self.tree.see(item_id)
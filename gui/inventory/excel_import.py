@@ -1,8 +1,9 @@
 # gui/inventory/excel_import.py
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import pandas as pd
-from database import fetch_all, execute_query, fetch_one
+from database import fetch_all
+from catalog_import import FIELDS, FILE_TYPES, KEYS, read_header, summary_text
+from import_jobs import ImportWorker, progress_text, resumable_job
 
 class ExcelImportWindow:
     def __init__(self, parent, user):
@@ -13,25 +14,42 @@ class ExcelImportWindow:
         self.window.geometry("1000x700")
         self.window.configure(bg="#0d1b2a")
         self.setup_ui()
-        self.data = None
+        self.worker = ImportWorker(self.window, on_progress=self.show_progress, on_done=self.import_finished,
+                                   on_inspected=self.file_inspected)
+        self.window.bind("<Destroy>", lambda e: self.worker.shutdown() if e.widget is self.window else None)
+        self.total_rows = None
+        self.file_digest = None
+        self.file_path = None
+        self.columns = []
+        self.sample = []
         self.column_mapping = {}
 
     def setup_ui(self):
         # Header
         header = tk.Frame(self.window, bg="#1b263b", height=60)
         header.pack(fill=tk.X)
-        tk.Label(header, text="📥 Import Excel File", font=("Arial", 16, "bold"), fg="gold", bg="#1b263b").pack(pady=15)
+        tk.Label(header, text="📥 Import Excel / CSV File", font=("Arial", 16, "bold"), fg="gold", bg="#1b263b").pack(pady=15)
 
         # File Selection
         file_frame = tk.Frame(self.window, bg="#0d1b2a")
         file_frame.pack(fill=tk.X, padx=20, pady=10)
 
-        tk.Button(file_frame, text="📁 Select Excel File", font=("Arial", 12, "bold"), bg="#1E90FF", fg="white",
+        tk.Button(file_frame, text="📁 Select Excel / CSV File", font=("Arial", 12, "bold"), bg="#1E90FF", fg="white",
                   command=self.select_file).pack(side=tk.LEFT, padx=5)
 
         self.file_label = tk.Label(file_frame, text="No file selected", font=("Arial", 10), fg="white", bg="#0d1b2a")
         self.file_label.pack(side=tk.LEFT, padx=10)
 
+        # Import mode: always add, or update existing products matched on a key
+        self.key_var = tk.StringVar(value="Barcode")
+        ttk.Combobox(file_frame, textvariable=self.key_var, values=list(KEYS), state="readonly",
+                     width=10).pack(side=tk.RIGHT, padx=5)
+        tk.Label(file_frame, text="Match on:", font=("Arial", 10), fg="white", bg="#0d1b2a").pack(side=tk.RIGHT)
+        self.upsert_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(file_frame, text="Update existing items", variable=self.upsert_var, font=("Arial", 10),
+                       fg="white", bg="#0d1b2a", selectcolor="#1b263b", activebackground="#0d1b2a"
+                       ).pack(side=tk.RIGHT, padx=10)
+
         # Mapping Frame
         self.mapping_frame = tk.Frame(self.window, bg="white", relief=tk.RAISED, borderwidth=1)
         self.mapping_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
@@ -48,29 +66,53 @@ class ExcelImportWindow:
                                     command=self.show_preview, state=tk.DISABLED)
         self.preview_btn.pack(side=tk.RIGHT, padx=5)
 
+        self.cancel_btn = tk.Button(btn_frame, text="⏹ Cancel Import", font=("Arial", 12, "bold"), bg="#B22222",
+                                    fg="white", command=self.cancel_import, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.RIGHT, padx=5)
+
+        self.progress = ttk.Progressbar(btn_frame, mode="determinate", length=200)
+        self.progress.pack(side=tk.LEFT, padx=5)
+        self.progress_label = tk.Label(btn_frame, text="", font=("Arial", 10), fg="white", bg="#0d1b2a")
+        self.progress_label.pack(side=tk.LEFT, padx=5)
+
     def select_file(self):
         file_path = filedialog.askopenfilename(
-            title="Select Excel File",
-            filetypes=[("Excel Files", "*.xlsx *.xls"), ("All Files", "*.*")]
+            title="Select Excel or CSV File",
+            filetypes=FILE_TYPES + [("All Files", "*.*")]
         )
         
         if not file_path:
             return
 
         try:
-            # Read Excel file
-            if file_path.endswith('.xlsx'):
-                self.data = pd.read_excel(file_path, engine='openpyxl')
-            else:
-                self.data = pd.read_excel(file_path, engine='xlrd')
-            
+            # Only the header and a few rows; the import streams the rest
+            self.columns, self.sample = read_header(file_path)
+            self.file_path = file_path
+            self.file_digest = self.total_rows = None
+
             self.file_label.config(text=f"Selected: {file_path.split('/')[-1]}")
             self.setup_column_mapping()
             self.preview_btn.config(state=tk.NORMAL)
-            self.import_btn.config(state=tk.NORMAL)
+            # Import is enabled once the file is hashed and counted in the background
+            self.import_btn.config(state=tk.DISABLED)
+            self.progress_label.config(text="Reading file...")
+            self.worker.inspect(file_path)
             
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to read Excel file:\n{str(e)}")
+            messagebox.showerror("Error", f"Failed to read file:\n{str(e)}")
+
+    def file_inspected(self, path, digest, total_rows, error):
+        if path != self.file_path:
+            return  # another file was picked meanwhile
+        if error is not None:
+            self.progress_label.config(text="")
+            messagebox.showerror("Error", f"Failed to read file:\n{str(error)}")
+            return
+        self.file_digest = digest
+        self.total_rows = total_rows
+        self.progress_label.config(text=f"About {total_rows:,} rows" if total_rows else "")
+        if not self.worker.running:
+            self.import_btn.config(state=tk.NORMAL)
 
     def setup_column_mapping(self):
         """Create column mapping interface"""
@@ -78,16 +120,16 @@ class ExcelImportWindow:
         for widget in self.mapping_frame.winfo_children():
             widget.destroy()
 
-        if self.data is None or self.data.empty:
+        if not self.sample:
             tk.Label(self.mapping_frame, text="No data to map", font=("Arial", 12), bg="white").pack(pady=20)
             return
 
-        tk.Label(self.mapping_frame, text="Map Excel Columns to Product Fields", 
+        tk.Label(self.mapping_frame, text="Map File Columns to Product Fields", 
                  font=("Arial", 14, "bold"), bg="white", fg="#0d1b2a").pack(pady=10)
 
         # Get Excel columns
-        excel_columns = list(self.data.columns)
-        product_fields = ["Barcode", "Company", "Name", "Variant", "Size", "Unit", "Category", "Supplier", "Cost", "Sale", "Stock"]
+        excel_columns = list(self.columns)
+        product_fields = FIELDS
 
         # Load dropdown options
         categories = [row[0] for row in fetch_all("SELECT name FROM categories ORDER BY name")]
@@ -138,7 +180,7 @@ class ExcelImportWindow:
 
     def show_preview(self):
         """Show data preview"""
-        if self.data is None or self.data.empty:
+        if not self.sample:
             messagebox.showwarning("No Data", "No data to preview.")
             return
 
@@ -154,7 +196,7 @@ class ExcelImportWindow:
         tree_frame = tk.Frame(preview, bg="white")
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        columns = list(self.data.columns)
+        columns = list(self.columns)
         tree = ttk.Treeview(tree_frame, columns=columns, show="headings", height=10)
         
         for col in columns:
@@ -162,8 +204,8 @@ class ExcelImportWindow:
             tree.column(col, width=100)
 
         # Insert first 5 rows
-        for i, row in self.data.head(5).iterrows():
-            tree.insert("", "end", values=list(row))
+        for row in self.sample:
+            tree.insert("", "end", values=["" if value is None else value for value in row])
 
         tree.pack(fill=tk.BOTH, expand=True)
 
@@ -175,9 +217,12 @@ class ExcelImportWindow:
 
     def import_data(self):
         """Import mapped data to database"""
-        if self.data is None or self.data.empty:
+        if not self.sample:
             messagebox.showwarning("No Data", "No data to import.")
             return
+        if self.file_digest is None:
+            messagebox.showinfo("Please Wait", "The file is still being read; try again in a moment.")
+            return
 
         # Get mapping
         mapping = {}
@@ -190,85 +235,59 @@ class ExcelImportWindow:
             messagebox.showwarning("No Mapping", "Please map at least one column.")
             return
 
-        # Confirm import
-        if not messagebox.askyesno("Confirm Import", f"Import {len(self.data)} rows?"):
+        # Resume an interrupted import of the same file, or confirm a new one
+        mode = "upsert" if self.upsert_var.get() else "insert"
+        key = self.key_var.get()
+        resume = True
+        previous = resumable_job(self.file_path, mapping, mode, key, digest=self.file_digest)
+        if previous:
+            answer = messagebox.askyesnocancel(
+                "Resume Import", f"An earlier import of this file stopped after {previous['rows_done']:,} rows "
+                                 f"({previous['status']}, {previous['updated_at']}).\n\n"
+                                 f"Yes resumes from there; No starts again from the first row.")
+            if answer is None:
+                return
+            resume = answer
+        else:
+            rows = self.total_rows
+            prompt = f"Import about {rows:,} rows?" if rows else "Import all rows?"
+            if not messagebox.askyesno("Confirm Import", prompt):
+                return
+
+        self.import_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.progress.config(maximum=self.total_rows or 1, value=previous['rows_done'] if previous and resume else 0)
+        self.progress_label.config(text="Starting import...")
+        self.worker.start(self.file_path, mapping, mode, key, updated_by=self.user['id'], resume=resume,
+                          total_rows=self.total_rows, digest=self.file_digest)
+
+    def cancel_import(self):
+        self.worker.cancel()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.progress_label.config(text="Cancelling after the current chunk...")
+
+    def import_finished(self, stats, error):
+        self.cancel_btn.config(state=tk.DISABLED)
+        if error is not None:
+            self.import_btn.config(state=tk.NORMAL)
+            messagebox.showerror("Error", f"Import failed:\n{str(error)}\n"
+                                          f"Chunks already committed are kept; import the file again to resume.")
+            return
+        if stats.get('cancelled'):
+            self.import_btn.config(state=tk.NORMAL)
+            messagebox.showinfo("Import Cancelled", f"Stopped after {stats['rows']:,} rows: {summary_text(stats)}\n"
+                                                    f"Import the same file again to resume.")
             return
 
-        try:
-            imported_count = 0
-            for _, row in self.data.iterrows():
-                # Extract values based on mapping
-                values = {}
-                for field, excel_col in mapping.items():
-                    values[field] = str(row[excel_col]).strip() if pd.notna(row[excel_col]) else ""
-
-                # Skip if no name
-                if not values.get("Name", "").strip():
-                    continue
-
-                # Get values with defaults
-                barcode = values.get("Barcode", "")
-                company = values.get("Company", "")
-                name = values.get("Name", "")
-                variant = values.get("Variant", "")
-                size = values.get("Size", "")
-                unit = values.get("Unit", "Piece")
-                category = values.get("Category", "")
-                supplier = values.get("Supplier", "")
-                cost = values.get("Cost", "0")
-                sale = values.get("Sale", "0")
-                stock = values.get("Stock", "0")
-
-                # Convert to numbers
-                try:
-                    cost_val = float(cost) if cost else 0.0
-                    sale_val = float(sale) if sale else 0.0
-                    stock_val = float(stock) if stock else 0.0
-                except ValueError:
-                    continue  # Skip invalid rows
-
-                # Get IDs
-                category_id = None
-                if category:
-                    cat = fetch_one("SELECT id FROM categories WHERE name = ?", (category,))
-                    if cat:
-                        category_id = cat[0]
-
-                supplier_id = None
-                if supplier:
-                    sup = fetch_one("SELECT id FROM suppliers WHERE name = ?", (supplier,))
-                    if sup:
-                        supplier_id = sup[0]
-
-                unit_id = 1
-                if unit:
-                    uom = fetch_one("SELECT id FROM uoms WHERE name = ?", (unit,))
-                    if uom:
-                        unit_id = uom[0]
-
-                # Insert product
-                product_id = execute_query("""
-                    INSERT INTO products (name, barcode, company, category_id, supplier_id, tax_id, base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (name, barcode or None, company or None, category_id, supplier_id, 1, unit_id, unit_id, cost_val, sale_val, stock_val))
-
-                # Insert variants
-                if variant:
-                    execute_query("""
-                        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (product_id, "Variant", variant, None, sale_val, stock_val))
-
-                if size:
-                    execute_query("""
-                        INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (product_id, "Size", size, None, sale_val, stock_val))
-
-                imported_count += 1
-
-            messagebox.showinfo("Success", f"✅ {imported_count} items imported successfully!")
-            self.window.destroy()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Import failed:\n{str(e)}")
\ No newline at end of file
+        memory = f", peak memory {stats['peak_memory_mb']:.0f} MB" if stats['peak_memory_mb'] else ""
+        rejected = "".join(f"\n  • {reason}: {count:,}" for reason, count in stats['reasons'].items())
+        if stats['rejected_file']:
+            rejected += f"\nRejected rows saved to:\n{stats['rejected_file']}"
+        messagebox.showinfo("Success", f"✅ Import finished: {summary_text(stats)}\n"
+                                       f"{stats['rows_per_sec']:,.0f} rows/sec{memory}{rejected}")
+        self.window.destroy()
+
+    def show_progress(self, stats):
+        if self.total_rows:
+            self.progress.config(value=min(stats['rows'], self.total_rows))
+        self.progress_label.config(text=f"{progress_text(stats, self.total_rows)} | {summary_text(stats)}")
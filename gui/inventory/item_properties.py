@@ -2,6 +2,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog  # ✅ Added simpledialog
 from database import fetch_all, fetch_one, execute_query
+from catalog_index import catalog_index
 
 class ItemPropertiesWindow:
     def __init__(self, parent, product_id, user):
@@ -193,8 +194,16 @@ class ItemPropertiesWindow:
         self.purchase_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
     def load_data(self):
-        # Basic Info
-        product = fetch_one("SELECT id, name, company, category_id, cost_price, selling_price, gst_rate, tax_type FROM products WHERE id = ?", (self.product_id,))
+        # Basic Info, with category, variant/size and base unit in the same read
+        product = fetch_one("""
+            SELECT p.id, p.name, p.company, c.name, p.cost_price, p.selling_price, p.gst_rate, p.tax_type,
+                   a.variant, a.size, u.name
+            FROM products p
+            LEFT JOIN categories c ON c.id = p.category_id
+            LEFT JOIN product_attributes a ON a.product_id = p.id
+            LEFT JOIN uoms u ON u.id = p.base_uom_id
+            WHERE p.id = ?
+        """, (self.product_id,))
         if product:
             self.basic_vars["id_var"].set(product[0])
             self.basic_vars["name_var"].set(product[1])
@@ -203,29 +212,17 @@ class ItemPropertiesWindow:
             self.selling_price_var.set(product[5] or 0.0)
             self.gst_rate_var.set(product[6] or 17.0)
             self.tax_type_var.set(product[7] or "exclusive")
-            
-            cat = fetch_one("SELECT name FROM categories WHERE id = ?", (product[3],))
-            self.basic_vars["category_var"].set(cat[0] if cat else "")
+            self.basic_vars["category_var"].set(product[3] or "")
 
             # Load Barcodes - MAIN BARCODE + VARIANTS
             self.load_barcodes(product[4])  # product[4] is main barcode
 
         # Variant/Size
-        variant = fetch_one("SELECT variant_value FROM product_variants WHERE product_id = ? AND variant_name = 'Variant' LIMIT 1", (self.product_id,))
-        if variant:
-            self.basic_vars["variant_var"].set(variant[0])
-        else:
-            self.basic_vars["variant_var"].set("")
-
-        size = fetch_one("SELECT variant_value FROM product_variants WHERE product_id = ? AND variant_name = 'Size' LIMIT 1", (self.product_id,))
-        if size:
-            self.basic_vars["size_var"].set(size[0])
-        else:
-            self.basic_vars["size_var"].set("")
+        self.basic_vars["variant_var"].set((product[8] or "") if product else "")
+        self.basic_vars["size_var"].set((product[9] or "") if product else "")
 
         # Base Unit
-        uom = fetch_one("SELECT u.name FROM uoms u JOIN products p ON p.base_uom_id = u.id WHERE p.id = ?", (self.product_id,))
-        self.basic_vars["unit_var"].set(uom[0] if uom else "Piece")
+        self.basic_vars["unit_var"].set(product[10] if product and product[10] else "Piece")
 
         # Suppliers & Cost
         suppliers = fetch_all("""
@@ -300,6 +297,7 @@ class ItemPropertiesWindow:
                 SET cost_price = ?, selling_price = ?, gst_rate = ?, tax_type = ? 
                 WHERE id = ?
             """, (cost_price, selling_price, gst_rate, tax_type, self.product_id))
+            catalog_index.refresh([self.product_id])
             
             messagebox.showinfo("Success", "Price and tax settings updated!")
         except Exception as e:
@@ -310,6 +308,7 @@ class ItemPropertiesWindow:
             name = self.basic_vars["name_var"].get()
             company = self.basic_vars["company_var"].get()
             execute_query("UPDATE products SET name = ?, company = ? WHERE id = ?", (name, company, self.product_id))
+            catalog_index.refresh([self.product_id])
             messagebox.showinfo("Success", "Basic info updated!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save: {str(e)}")
@@ -321,6 +320,7 @@ class ItemPropertiesWindow:
             try:
                 execute_query("INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock) VALUES (?, ?, ?, ?, ?, ?)",
                               (self.product_id, "Barcode", "Additional", barcode, 0.0, 0))
+                catalog_index.refresh([self.product_id])
                 self.barcode_tree.insert("", "end", values=(barcode, "Additional"))
                 messagebox.showinfo("Success", "Barcode added!")
             except Exception as e:
@@ -339,6 +339,7 @@ class ItemPropertiesWindow:
                 product = fetch_one("SELECT barcode FROM products WHERE id = ?", (self.product_id,))
                 if product and product[0] == barcode:
                     execute_query("UPDATE products SET barcode = NULL WHERE id = ?", (self.product_id,))
+                catalog_index.refresh([self.product_id])
                 self.barcode_tree.delete(selection[0])
                 messagebox.showinfo("Success", "Barcode removed!")
             except Exception as e:
@@ -356,6 +357,7 @@ class ItemPropertiesWindow:
                 execute_query("UPDATE products SET selling_price = ? WHERE id = ?", (price_val, self.product_id))
                 execute_query("INSERT INTO price_history (product_id, selling_price, updated_by) VALUES (?, ?, ?)",
                               (self.product_id, price_val, self.user['id']))
+                catalog_index.refresh([self.product_id])
                 messagebox.showinfo("Success", "Sale price updated!")
                 self.load_data()
             except Exception as e:
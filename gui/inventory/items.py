@@ -2,11 +2,26 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, Menu, simpledialog
 from database import fetch_all, fetch_one, execute_query
+from catalog_index import catalog_index
+from catalog_grid import SORTS, TAX_METHODS, CatalogQuery, PagedRows, grid_values
+from catalog_edits import EditBuffer
+
+ROW_HEIGHT = 26
+# Treeview value index -> products column for text/price cells saved from the grid
+CELL_FIELDS = {1: "barcode", 2: "company", 3: "name", 9: "cost_price", 10: "selling_price"}
 
 class ItemsManager:
     def __init__(self, parent, user):
         self.parent = parent
         self.user = user
+        self.category_ids = {}
+        self.supplier_ids = {}
+        self.sort = "Name"
+        self.descending = False
+        self.paged = None
+        self.top = 0
+        self.visible = 20
+        self.edits = EditBuffer(updated_by=user['id'], root=parent, on_flush=self.edits_flushed)
         self.setup_ui()
         self.load_filters()
         self.load_items()
@@ -26,6 +41,9 @@ class ItemsManager:
         self.category_var = tk.StringVar(value="All")
         self.category_combo = ttk.Combobox(filter_frame, textvariable=self.category_var, state="readonly", width=20)
         self.category_combo.pack(side=tk.LEFT, padx=5)
+        self.subcategories_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(filter_frame, text="Incl. sub-categories", variable=self.subcategories_var, bg="white",
+                       command=self.load_items).pack(side=tk.LEFT)
 
         # Supplier Filter
         tk.Label(filter_frame, text="Supplier:", font=("Arial", 10), bg="white").pack(side=tk.LEFT, padx=(20,5))
@@ -69,6 +87,18 @@ class ItemsManager:
         tk.Button(btn_frame, text="📥 Import Excel", font=("Arial", 11, "bold"), bg="#FFA500", fg="white",
                   command=self.import_excel).pack(side=tk.LEFT, padx=5)
 
+        tk.Button(btn_frame, text="✏️ Bulk Edit", font=("Arial", 11, "bold"), bg="#8A2BE2", fg="white",
+                  command=self.bulk_edit).pack(side=tk.LEFT, padx=5)
+
+        tk.Button(btn_frame, text="↶ Undo Last Save", font=("Arial", 11, "bold"), bg="#6c757d", fg="white",
+                  command=self.undo_edits).pack(side=tk.RIGHT, padx=5)
+
+        tk.Button(btn_frame, text="💾 Save Edits", font=("Arial", 11, "bold"), bg="#2E8B57", fg="white",
+                  command=self.save_edits).pack(side=tk.RIGHT, padx=5)
+
+        self.edit_status = tk.Label(btn_frame, text="", font=("Arial", 10), fg="#555", bg="white")
+        self.edit_status.pack(side=tk.RIGHT, padx=10)
+
         # Treeview
         tree_frame = tk.Frame(self.parent, bg="white", relief=tk.RAISED, borderwidth=1)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -95,17 +125,21 @@ class ItemsManager:
         }
         
         for col in self.columns:
-            self.tree.heading(col, text=col)
+            if col in SORTS:
+                self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            else:
+                self.tree.heading(col, text=col)
             width = col_widths.get(col, 100)
             anchor = "e" if col in ("Cost", "Sale", "Stock") else "center" if col == "ID" else "w"
             self.tree.column(col, width=width, anchor=anchor)
 
-        v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        # The tree only ever holds the visible rows; the scrollbar tracks the whole result
+        self.v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.on_scroll)
         h_scroll = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.tree.xview)
-        self.tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        self.tree.configure(xscrollcommand=h_scroll.set)
 
         self.tree.grid(row=0, column=0, sticky="nsew")
-        v_scroll.grid(row=0, column=1, sticky="ns")
+        self.v_scroll.grid(row=0, column=1, sticky="ns")
         h_scroll.grid(row=1, column=0, sticky="ew")
 
         tree_frame.grid_rowconfigure(0, weight=1)
@@ -118,7 +152,7 @@ class ItemsManager:
                         foreground="#0d1b2a", 
                         fieldbackground="white", 
                         font=("Arial", 10),
-                        rowheight=26)
+                        rowheight=ROW_HEIGHT)
         style.configure("Treeview.Heading", 
                         background="#1b263b", 
                         foreground="gold", 
@@ -131,6 +165,15 @@ class ItemsManager:
         self.tree.bind("<Double-1>", self.on_double_click)
         self.tree.bind("<Button-3>", self.show_context_menu)
         self.tree.bind("<Button-1>", self.on_tree_click)
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<Destroy>", self.on_destroy)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.move_selection(-self.visible))
+        self.tree.bind("<Next>", lambda e: self.move_selection(self.visible))
 
         self.context_menu = Menu(self.tree, tearoff=0)
         self.context_menu.add_command(label="✏️ Edit", command=self.start_edit)
@@ -146,111 +189,200 @@ class ItemsManager:
 
     def load_filters(self):
         try:
-            categories = ["All"] + [row[0] for row in fetch_all("SELECT name FROM categories ORDER BY name")]
-            self.category_combo['values'] = categories
+            self.category_ids = {row[1]: row[0] for row in fetch_all("SELECT id, name FROM categories ORDER BY name")}
+            self.category_combo['values'] = ["All"] + list(self.category_ids)
 
-            suppliers = ["All"] + [row[0] for row in fetch_all("SELECT name FROM suppliers ORDER BY name")]
-            self.supplier_combo['values'] = suppliers
+            self.supplier_ids = {row[1]: row[0] for row in fetch_all("SELECT id, name FROM suppliers ORDER BY name")}
+            self.supplier_combo['values'] = ["All"] + list(self.supplier_ids)
 
             companies = ["All"] + [row[0] for row in fetch_all("SELECT DISTINCT company FROM products WHERE company IS NOT NULL AND company != '' ORDER BY company")]
             self.company_combo['values'] = companies
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load filters: {str(e)}")
 
-    def load_items(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
+    def current_query(self):
+        def chosen(var, ids=None):
+            value = var.get()
+            if value == "All":
+                return None
+            return ids.get(value, -1) if ids is not None else value
+
+        return CatalogQuery(category_id=chosen(self.category_var, self.category_ids),
+                            supplier_id=chosen(self.supplier_var, self.supplier_ids),
+                            company=chosen(self.company_var),
+                            tax_type=chosen(self.tax_method_var, TAX_METHODS),
+                            sort=self.sort, descending=self.descending,
+                            subcategories=self.subcategories_var.get())
+
+    def load_items(self, top=0):
         try:
-            base_query = """
-                SELECT 
-                    p.id, 
-                    p.barcode, 
-                    p.company, 
-                    p.name,
-                    (SELECT pv1.variant_value FROM product_variants pv1 WHERE pv1.product_id = p.id AND pv1.variant_name = 'Variant' LIMIT 1) AS variant,
-                    (SELECT pv2.variant_value FROM product_variants pv2 WHERE pv2.product_id = p.id AND pv2.variant_name = 'Size' LIMIT 1) AS size,
-                    u.name AS unit,
-                    c.name AS category, 
-                    s.name AS supplier,
-                    p.cost_price, 
-                    p.selling_price, 
-                    p.stock,
-                    c.location_tag,
-                    p.tax_type
-                FROM products p
-                LEFT JOIN uoms u ON p.base_uom_id = u.id
-                LEFT JOIN categories c ON p.category_id = c.id
-                LEFT JOIN suppliers s ON p.supplier_id = s.id
-                WHERE 1=1
-            """
-            conditions = []
-            params = []
-
-            if self.category_var.get() != "All":
-                conditions.append("c.name = ?")
-                params.append(self.category_var.get())
-            if self.supplier_var.get() != "All":
-                conditions.append("s.name = ?")
-                params.append(self.supplier_var.get())
-            if self.company_var.get() != "All":
-                conditions.append("p.company = ?")
-                params.append(self.company_var.get())
-            if self.tax_method_var.get() != "All":
-                if self.tax_method_var.get() == "Applicable on Trade Price":
-                    conditions.append("p.tax_type = 'exclusive'")
-                elif self.tax_method_var.get() == "Included in Retail Price":
-                    conditions.append("p.tax_type = 'inclusive'")
-
-            if conditions:
-                base_query += " AND " + " AND ".join(conditions)
-            base_query += " ORDER BY p.name"
-
-            items = fetch_all(base_query, params)
-
-            for item in items:
-                # Safe numeric conversion
-                try:
-                    cost_val = float(item[9]) if item[9] not in (None, "") else 0.0
-                    cost = f"Rs. {cost_val:.2f}"
-                except (ValueError, TypeError):
-                    cost = "Rs. 0.00"
-                    
-                try:
-                    sale_val = float(item[10]) if item[10] not in (None, "") else 0.0
-                    sale = f"Rs. {sale_val:.2f}"
-                except (ValueError, TypeError):
-                    sale = "Rs. 0.00"
-                    
-                try:
-                    stock_val = float(item[11]) if item[11] not in (None, "") else 0.0
-                    stock = f"{stock_val:.2f}"
-                except (ValueError, TypeError):
-                    stock = "0.00"
-                    
-                location = item[12] if item[12] is not None else ""
-                tax_method = "Applicable on Trade Price" if item[13] == "exclusive" else "Included in Retail Price" if item[13] == "inclusive" else "Applicable on Trade Price"
-                self.tree.insert("", "end", iid=item[0], values=(
-                    item[0], item[1], item[2], item[3], 
-                    item[4] or "", item[5] or "", item[6] or "Piece",
-                    item[7], item[8], cost, sale, stock, tax_method, location, "PropertyParams"
-                ))
+            self.paged = PagedRows(self.current_query(), prefetch=max(100, self.visible * 2))
+            self.show_window(top)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load items: {str(e)}")
 
+    def show_window(self, top):
+        """Put rows [top, top + visible) in the tree and move the scrollbar to match."""
+        if self.paged is None:
+            return
+        # Staged edits are only in the tree; write them before its rows are replaced
+        if self.edits.pending:
+            self.save_edits()
+        selected = self.tree.selection()
+        self.top, rows = self.paged.window(top, self.visible)
+        # Editors are placed over rows that are about to be replaced
+        self.cleanup_edit()
+        self.cancel_category_edit()
+        self.cancel_supplier_edit()
+        self.cancel_tax_method_edit()
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for row in rows:
+            self.tree.insert("", "end", iid=row[0], values=grid_values(row))
+        keep = [iid for iid in selected if self.tree.exists(iid)]
+        if keep:
+            self.tree.selection_set(keep)
+        total = self.paged.total
+        if total:
+            self.v_scroll.set(self.top / total, (self.top + len(rows)) / total)
+        else:
+            self.v_scroll.set(0, 1)
+
+    def on_scroll(self, action, amount, unit=None):
+        if self.paged is None:
+            return
+        if action == "moveto":
+            self.show_window(int(float(amount) * self.paged.total))
+        else:
+            self.scroll_rows(int(amount) * (self.visible if unit == "pages" else 1))
+
+    def scroll_rows(self, rows):
+        self.show_window(self.top + rows)
+        return "break"
+
+    def on_resize(self, event):
+        # Less one row for the heading
+        visible = max(1, event.height // ROW_HEIGHT - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.tree.configure(height=visible)
+            self.show_window(self.top)
+
+    def move_selection(self, step):
+        """Up/Down/PageUp/PageDown that scroll the window when they leave it."""
+        children = self.tree.get_children()
+        if not children:
+            return "break"
+        selection = self.tree.selection()
+        index = children.index(selection[0]) if selection and selection[0] in children else 0
+        target = index + step
+        if target < 0 or target >= len(children):
+            self.show_window(self.top + (target if target < 0 else target - len(children) + 1))
+            children = self.tree.get_children()
+            target = 0 if step < 0 else len(children) - 1
+        if children:
+            item = children[max(0, min(target, len(children) - 1))]
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+        return "break"
+
+    def sort_by(self, column):
+        if self.sort == column:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = column, False
+        for col in SORTS:
+            arrow = (" ▼" if self.descending else " ▲") if col == self.sort else ""
+            self.tree.heading(col, text=col + arrow)
+        self.load_items()
+
+    def show_item(self, product_id):
+        """Reload and scroll so the product is in view, selected."""
+        self.load_items(self.top)
+        offset = self.paged.locate(product_id) if self.paged else None
+        if offset is None:
+            return False
+        if not self.top <= offset < self.top + self.visible:
+            self.show_window(offset)
+        if self.tree.exists(product_id):
+            self.tree.selection_set(product_id)
+            self.tree.focus(product_id)
+            return True
+        return False
+
+    # ---------- edit buffer ----------
+    def stage_edit(self, item_id, field, value, col_index, shown):
+        """Show the edit in the tree now; the database gets it on the next flush."""
+        values = list(self.tree.item(item_id, "values"))
+        values[col_index] = shown
+        self.tree.item(item_id, values=values)
+        self.edits.stage(item_id, field, value)
+        self.update_edit_status()
+
+    def save_edits(self):
+        try:
+            result = self.edits.flush()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save edits: {str(e)}")
+            return
+        self.edits_flushed(result, None)
+
+    def edits_flushed(self, result, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to save edits: {str(error)}")
+        elif result["products"]:
+            self.refresh_rows(result["products"])
+        self.update_edit_status()
+
+    def undo_edits(self):
+        if self.edits.pending:
+            self.save_edits()
+        if not self.edits.last_batch:
+            messagebox.showinfo("Undo", "Nothing to undo.")
+            return
+        try:
+            ids = self.edits.undo()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to undo: {str(e)}")
+            return
+        self.refresh_rows(ids)
+        self.edit_status.config(text=f"Undid last save ({len(ids)} item(s))")
+
+    def refresh_rows(self, product_ids):
+        """Redraw just these products from the database, where they are on screen."""
+        if self.paged is None:
+            return
+        for pid, row in self.paged.refresh_rows(product_ids).items():
+            if self.tree.exists(pid):
+                self.tree.item(pid, values=grid_values(row))
+
+    def update_edit_status(self):
+        count = len(self.edits)
+        self.edit_status.config(text=f"{count} unsaved edit(s)" if count else "All edits saved")
+
+    def on_destroy(self, event):
+        if event.widget is self.tree and self.edits.pending:
+            try:
+                self.edits.flush()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save edits: {str(e)}")
+
     def add_item(self):
         try:
             new_id = execute_query("""
                 INSERT INTO products (name, barcode, company, category_id, supplier_id, tax_id, base_uom_id, purchase_uom_id, cost_price, selling_price, stock)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, ("", "", "", None, None, 1, 1, 1, 0.0, 0.0, 0.0))
-            
-            self.tree.insert("", "end", iid=new_id, values=(
-                new_id, "", "", "", "", "", "Piece", "", "", 
-                "Rs. 0.00", "Rs. 0.00", "0.00", "Applicable on Trade Price", "", "PropertyParams"
-            ))
-            self.tree.selection_set(new_id)
-            self.tree.focus(new_id)
+
+            # Under a filter the blank product may not be in the result; show it anyway
+            if not self.show_item(new_id):
+                self.tree.insert("", 0, iid=new_id, values=(
+                    new_id, "", "", "", "", "", "Piece", "", "",
+                    "Rs. 0.00", "Rs. 0.00", "0.00", "Applicable on Trade Price", "", "PropertyParams"
+                ))
+                self.tree.selection_set(new_id)
+                self.tree.focus(new_id)
             self.start_edit(column="#2")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add item: {str(e)}")
@@ -263,6 +395,14 @@ class ItemsManager:
         from .excel_import import ExcelImportWindow
         ExcelImportWindow(self.parent, self.user)
 
+    def bulk_edit(self):
+        # Staged cell edits go in first so the bulk change applies on top of them
+        if self.edits.pending:
+            self.save_edits()
+        from .bulk_edit import BulkEditWindow
+        BulkEditWindow(self.parent, self.user, self.current_query(), self.tree.selection(),
+                       on_done=lambda result: self.load_items(self.top))
+
     def on_double_click(self, event):
         region = self.tree.identify("region", event.x, event.y)
         if region == "cell":
@@ -357,15 +497,8 @@ class ItemsManager:
             cat = fetch_one("SELECT id FROM categories WHERE name = ?", (selected_cat,))
             if cat:
                 cat_id = cat[0]
-        try:
-            execute_query("UPDATE products SET category_id = ? WHERE id = ?", (cat_id, int(item_id)))
-            values = list(self.tree.item(item_id, "values"))
-            values[7] = selected_cat
-            self.tree.item(item_id, values=values)
-            self.cancel_category_edit()
-            messagebox.showinfo("Success", "Category updated!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update category: {str(e)}")
+        self.stage_edit(item_id, "category_id", cat_id, 7, selected_cat)
+        self.cancel_category_edit()
 
     def cancel_category_edit(self):
         if self.category_edit_combo:
@@ -399,15 +532,8 @@ class ItemsManager:
             sup = fetch_one("SELECT id FROM suppliers WHERE name = ?", (selected_sup,))
             if sup:
                 sup_id = sup[0]
-        try:
-            execute_query("UPDATE products SET supplier_id = ? WHERE id = ?", (sup_id, int(item_id)))
-            values = list(self.tree.item(item_id, "values"))
-            values[8] = selected_sup
-            self.tree.item(item_id, values=values)
-            self.cancel_supplier_edit()
-            messagebox.showinfo("Success", "Supplier updated!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update supplier: {str(e)}")
+        self.stage_edit(item_id, "supplier_id", sup_id, 8, selected_sup)
+        self.cancel_supplier_edit()
 
     def cancel_supplier_edit(self):
         if self.supplier_edit_combo:
@@ -440,16 +566,8 @@ class ItemsManager:
     def save_tax_method_edit(self, item_id):
         selected_method = self.tax_method_edit_combo.get()
         tax_type = "exclusive" if selected_method == "Applicable on Trade Price" else "inclusive"
-        
-        try:
-            execute_query("UPDATE products SET tax_type = ? WHERE id = ?", (tax_type, int(item_id)))
-            values = list(self.tree.item(item_id, "values"))
-            values[12] = selected_method
-            self.tree.item(item_id, values=values)
-            self.cancel_tax_method_edit()
-            messagebox.showinfo("Success", "Tax method updated!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update tax method: {str(e)}")
+        self.stage_edit(item_id, "tax_type", tax_type, 12, selected_method)
+        self.cancel_tax_method_edit()
 
     def cancel_tax_method_edit(self):
         if hasattr(self, 'tax_method_edit_combo') and self.tax_method_edit_combo:
@@ -463,34 +581,21 @@ class ItemsManager:
         new_value = self.entry.get().strip()
         col_index = int(self.editing_column[1:]) - 1
 
-        values = list(self.tree.item(self.editing_item, "values"))
+        shown, db_value = new_value, new_value
         if col_index in (9, 10):
             try:
-                num_val = float(new_value) if new_value else 0.0
-                values[col_index] = f"Rs. {num_val:.2f}"
-                db_value = num_val
+                db_value = float(new_value) if new_value else 0.0
+                shown = f"Rs. {db_value:.2f}"
             except ValueError:
                 messagebox.showerror("Invalid Input", "Please enter a valid number.")
                 return
-        else:
-            values[col_index] = new_value
-            db_value = new_value
 
-        self.tree.item(self.editing_item, values=values)
-
-        col_to_field = {
-            1: "barcode",
-            2: "company",
-            3: "name",
-            8: "cost_price",
-            9: "selling_price"
-        }
-        if col_index in col_to_field:
-            try:
-                execute_query(f"UPDATE products SET {col_to_field[col_index]} = ? WHERE id = ?", (db_value, int(self.editing_item)))
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to save: {str(e)}")
-                return
+        if col_index in CELL_FIELDS:
+            self.stage_edit(self.editing_item, CELL_FIELDS[col_index], db_value, col_index, shown)
+        else:
+            values = list(self.tree.item(self.editing_item, "values"))
+            values[col_index] = shown
+            self.tree.item(self.editing_item, values=values)
 
         current_item = self.editing_item
         
@@ -503,8 +608,9 @@ class ItemsManager:
                 self.tree.focus(current_item)
                 self.start_edit(column=next_column)
             else:
+                # Enter on the last cell finishes the row: write its edits now
                 self.cleanup_edit()
-                messagebox.showinfo("Success", "Item saved successfully!")
+                self.save_edits()
         except ValueError:
             self.cleanup_edit()
 
@@ -532,9 +638,11 @@ class ItemsManager:
 
         item_id = int(selection[0])
         if messagebox.askyesno("Confirm", "Delete this item?"):
+            self.edits.discard(item_id)
             try:
                 execute_query("DELETE FROM products WHERE id = ?", (item_id,))
-                self.tree.delete(selection[0])
+                catalog_index.refresh([item_id])
+                self.load_items(self.top)
                 messagebox.showinfo("Success", "Item deleted!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to delete item: {str(e)}")
\ No newline at end of file
@@ -1,15 +1,16 @@
 # gui/ordering/purchase_orders.py
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-from datetime import datetime
-from database import fetch_all, fetch_one, execute_query
+from database import fetch_all, fetch_one
+from sequences import next_number
+from purchase_order_service import save_purchase_orders
 from utils import clear_window
 
 class PurchaseOrderWindow:
     def __init__(self, root, user):
         self.root = root
         self.user = user
-        self.po_number = f"PO{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        self.po_number = next_number("PO")
         self.items = []
         self.setup_ui()
         self.load_suppliers()
@@ -188,18 +189,9 @@ class PurchaseOrderWindow:
             return
 
         try:
-            # Create PO
-            po_id = execute_query("""
-                INSERT INTO purchase_orders (po_number, supplier_id, total_amount, created_by, status)
-                VALUES (?, ?, ?, ?, 'draft')
-            """, (self.po_number, supplier[0], float(self.total_var.get().split()[-1].replace(',', '')), self.user['id']))
-
-            # Add items
-            for item in self.items:
-                execute_query("""
-                    INSERT INTO po_items (po_id, product_id, quantity_ordered, cost_price)
-                    VALUES (?, ?, ?, ?)
-                """, (po_id, item['product_id'], item['qty'], item['cost_price']))
+            # Header and lines in one transaction
+            save_purchase_orders([{'po_number': self.po_number, 'supplier_id': supplier[0], 'lines': self.items}],
+                                 self.user['id'])
 
             messagebox.showinfo("Success", f"Draft PO {self.po_number} saved!")
             self.go_back()
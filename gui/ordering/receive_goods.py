@@ -4,6 +4,8 @@ from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime
 from utils import clear_window
 from database import fetch_all, fetch_one, execute_query
+from catalog_index import catalog_index
+from sequences import next_number
 
 
 class ReceiveGoodsWindow:
@@ -454,7 +456,7 @@ class ReceiveGoodsWindow:
             return
 
         is_direct = self.direct_var.get()
-        receipt_number = f"GR{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        receipt_number = next_number("GR")
 
         try:
             if is_direct:
@@ -516,6 +518,7 @@ class ReceiveGoodsWindow:
                         WHERE id = ?
                     """, (base_uom_qty, item_data['cost_price'], item_data['retail_price'], item_data['product_id']))
 
+            catalog_index.refresh(item['product_id'] for item in self.po_items)
             messagebox.showinfo("Success", f"✅ Goods receipt {receipt_number} saved!")
             if self.is_frame:
                 self.go_back()
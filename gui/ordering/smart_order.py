@@ -4,7 +4,10 @@ from tkinter import ttk, messagebox, simpledialog
 from datetime import datetime, timedelta
 import calendar
 from utils import clear_window
-from database import fetch_all, fetch_one, execute_query
+from database import fetch_all, fetch_one
+from purchase_order_service import create_purchase_orders
+from forecasting import METHODS
+from order_analysis import OrderAnalysis
 
 class SmartOrderTab:
     def __init__(self, parent, user):
@@ -32,18 +35,35 @@ class SmartOrderTab:
         # Analysis Period
         tk.Label(control_frame, text="Analysis Period:", font=("Arial", 10), bg="white").pack(side=tk.LEFT, padx=(15,5))
         self.period_var = tk.StringVar(value="Last 30 Days")
-        period_options = ["Last 15 Days", "Last 30 Days", "Same Period Last Month", "Same Period Last Year"]
+        period_options = ["Last 15 Days", "Last 30 Days", "Last 90 Days", "Last 365 Days",
+                          "Same Period Last Month", "Same Period Last Year"]
         self.period_combo = ttk.Combobox(control_frame, textvariable=self.period_var, values=period_options, state="readonly", width=20)
         self.period_combo.pack(side=tk.LEFT, padx=5)
 
+        # Forecast Method
+        tk.Label(control_frame, text="Method:", font=("Arial", 10), bg="white").pack(side=tk.LEFT, padx=(15,5))
+        self.method_var = tk.StringVar(value=METHODS["simple"])
+        self.method_combo = ttk.Combobox(control_frame, textvariable=self.method_var, values=list(METHODS.values()), state="readonly", width=20)
+        self.method_combo.pack(side=tk.LEFT, padx=5)
+
         # Supplier Filter
         tk.Label(control_frame, text="Supplier:", font=("Arial", 10), bg="white").pack(side=tk.LEFT, padx=(15,5))
         self.supplier_var = tk.StringVar(value="All Suppliers")
         self.supplier_combo = ttk.Combobox(control_frame, textvariable=self.supplier_var, state="readonly", width=18)
         self.supplier_combo.pack(side=tk.LEFT, padx=5)
 
-        # Analyze Button
+        # Analyze / Cancel Buttons
         tk.Button(control_frame, text="🔍 Analyze & Suggest", font=("Arial", 10, "bold"), bg="#1E90FF", fg="white", command=self.analyze_orders).pack(side=tk.LEFT, padx=10)
+        self.cancel_btn = tk.Button(control_frame, text="⏹ Cancel", font=("Arial", 10, "bold"), bg="#B22222", fg="white", command=self.cancel_analysis, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT)
+
+        # Progress
+        progress_frame = tk.Frame(self.parent, bg="white")
+        progress_frame.pack(fill=tk.X, padx=10)
+        self.progress = ttk.Progressbar(progress_frame, mode="determinate", length=300)
+        self.progress.pack(side=tk.LEFT)
+        self.status_label = tk.Label(progress_frame, text="", font=("Arial", 9), bg="white", fg="#415a77")
+        self.status_label.pack(side=tk.LEFT, padx=10)
 
         # Items Table
         tree_frame = tk.Frame(self.parent, bg="white", relief=tk.RAISED, borderwidth=1)
@@ -79,6 +99,9 @@ class SmartOrderTab:
         tree_frame.grid_rowconfigure(0, weight=1)
         tree_frame.grid_columnconfigure(0, weight=1)
 
+        self.analysis = OrderAnalysis(self.tree, self.show_rows, self.show_progress, self.analysis_done)
+        self.tree.bind("<Destroy>", lambda e: self.analysis.shutdown())
+
         # Style
         style = ttk.Style()
         style.theme_use("clam")
@@ -108,6 +131,12 @@ class SmartOrderTab:
         elif period_label == "Last 30 Days":
             start_date = today - timedelta(days=30)
             end_date = today
+        elif period_label == "Last 90 Days":
+            start_date = today - timedelta(days=90)
+            end_date = today
+        elif period_label == "Last 365 Days":
+            start_date = today - timedelta(days=365)
+            end_date = today
         elif period_label == "Same Period Last Month":
             if today.day == 1:
                 last_month = today.replace(day=1) - timedelta(days=1)
@@ -133,10 +162,11 @@ class SmartOrderTab:
         return start_date, end_date
 
     def analyze_orders(self):
-        """Analyze sales and suggest items to order"""
+        """Analyze sales and suggest items to order (in the background)"""
         for item in self.tree.get_children():
             self.tree.delete(item)
-        
+        self.items_to_order = []
+
         start_date, end_date = self.get_analysis_dates()
         if start_date is None:
             return
@@ -148,106 +178,68 @@ class SmartOrderTab:
             if sup:
                 supplier_id = sup[0]
 
-        products_query = """
-            SELECT p.id, p.name, p.stock, p.category_id,
-                   sp.supplier_id, s.name as supplier_name, sp.cost_price,
-                   s.lead_time_days
-            FROM products p
-            JOIN supplier_prices sp ON p.id = sp.product_id
-            JOIN suppliers s ON sp.supplier_id = s.id
-            WHERE sp.is_active = 1
-        """
-        params = []
-        if supplier_id:
-            products_query += " AND s.id = ?"
-            params.append(supplier_id)
-        
-        products = fetch_all(products_query, params)
-        self.items_to_order = []
-        days_needed = self.days_var.get()
-        
-        for prod in products:
-            product_id, name, current_stock, category_id, sup_id, sup_name, cost_price, lead_time = prod
-            
-            sales_query = """
-                SELECT SUM(si.quantity) as total_qty, COUNT(DISTINCT DATE(s.created_at)) as sale_days
-                FROM sales s
-                JOIN sale_items si ON s.id = si.sale_id
-                WHERE si.product_id = ?
-                AND DATE(s.created_at) BETWEEN ? AND ?
-                AND s.is_return = 0
-            """
-            sales_data = fetch_one(sales_query, (product_id, start_date, end_date))
-            
-            total_sales = sales_data[0] if sales_data and sales_data[0] else 0
-            sale_days = sales_data[1] if sales_data and sales_data[1] else 1
-            daily_consumption = total_sales / sale_days if sale_days > 0 else 0
-            
-            suggested_qty = (daily_consumption * days_needed) - current_stock
-            suggested_qty = max(0, round(suggested_qty, 2))
-            
-            if suggested_qty > 0:
-                item_data = {
-                    'product_id': product_id,
-                    'name': name,
-                    'current_stock': current_stock,
-                    'daily_consumption': daily_consumption,
-                    'days_needed': days_needed,
-                    'suggested_qty': suggested_qty,
-                    'supplier_id': sup_id,
-                    'supplier_name': sup_name,
-                    'cost_price': cost_price or 0.0
-                }
-                self.items_to_order.append(item_data)
-                
-                self.tree.insert("", "end", values=(
-                    item_data['name'],
-                    f"{item_data['current_stock']:.2f}",
-                    f"{item_data['daily_consumption']:.2f}",
-                    item_data['days_needed'],
-                    f"{item_data['suggested_qty']:.2f}",
-                    item_data['supplier_name'],
-                    f"Rs. {item_data['cost_price']:.2f}",
-                    "✏️ Edit"
-                ))
+        method = next(key for key, label in METHODS.items() if label == self.method_var.get())
+        self.progress['value'] = 0
+        self.status_label.config(text="Loading sales history...")
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.analysis.start(start_date, end_date, self.days_var.get(), method, supplier_id)
+
+    def cancel_analysis(self):
+        self.analysis.cancel()
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Cancelled - {len(self.items_to_order)} items so far")
+
+    def show_rows(self, items):
+        self.items_to_order.extend(items)
+        for item_data in items:
+            self.tree.insert("", "end", values=(
+                item_data['name'],
+                f"{item_data['current_stock']:.2f}",
+                f"{item_data['daily_consumption']:.2f}",
+                item_data['days_needed'],
+                f"{item_data['suggested_qty']:.2f}",
+                item_data['supplier_name'],
+                f"Rs. {item_data['cost_price']:.2f}",
+                "✏️ Edit"
+            ))
+
+    def show_progress(self, done, total):
+        self.progress['maximum'] = max(total, 1)
+        self.progress['value'] = done
+        self.status_label.config(text=f"Suppliers analyzed: {done}/{total} - {len(self.items_to_order)} items")
+
+    def analysis_done(self, stats, error):
+        self.cancel_btn.config(state=tk.DISABLED)
+        if error is not None:
+            self.status_label.config(text="Analysis failed")
+            messagebox.showerror("Error", f"Analysis failed: {error}")
+            return
+        self.status_label.config(text=f"✅ {len(self.items_to_order)} items from {stats['suppliers']} suppliers "
+                                      f"in {stats['total_s']:.1f}s")
 
     def generate_pos(self):
         """Generate POs grouped by supplier"""
+        if self.analysis.running:
+            messagebox.showwarning("Analysis Running", "Wait for the analysis to finish or cancel it first.")
+            return
         if not self.items_to_order:
             messagebox.showwarning("No Items", "No items to order.")
             return
 
-        po_groups = {}
-        for item in self.items_to_order:
-            sup_id = item['supplier_id']
-            if sup_id not in po_groups:
-                po_groups[sup_id] = []
-            po_groups[sup_id].append(item)
+        lines = [{'supplier_id': item['supplier_id'], 'product_id': item['product_id'],
+                  'qty': item['suggested_qty'], 'cost_price': item['cost_price']}
+                 for item in self.items_to_order]
+        try:
+            summary = create_purchase_orders(lines, self.user['id'])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to create POs, nothing was saved: {str(e)}")
+            return
 
-        created_pos = []
-        for sup_id, items in po_groups.items():
-            try:
-                po_number = f"PO{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                total_amount = sum(item['suggested_qty'] * item['cost_price'] for item in items)
-                
-                po_id = execute_query("""
-                    INSERT INTO purchase_orders (po_number, supplier_id, total_amount, created_by, status)
-                    VALUES (?, ?, ?, ?, 'draft')
-                """, (po_number, sup_id, total_amount, self.user['id']))
-
-                for item in items:
-                    execute_query("""
-                        INSERT INTO po_items (po_id, product_id, quantity_ordered, cost_price)
-                        VALUES (?, ?, ?, ?)
-                    """, (po_id, item['product_id'], item['suggested_qty'], item['cost_price']))
-
-                created_pos.append((po_number, sup_id))
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to create PO: {str(e)}")
-                return
-
-        messagebox.showinfo("Success", f"✅ {len(created_pos)} POs created successfully!")
+        numbers = ", ".join(order['po_number'] for order in summary['orders'][:5])
+        if summary['po_count'] > 5:
+            numbers += ", ..."
+        messagebox.showinfo("Success", f"✅ {summary['po_count']} POs created successfully!\n"
+                                       f"{summary['line_count']} lines, Rs. {summary['total_amount']:,.2f}\n{numbers}")
 
     def go_back(self):
         from .ordering_main import OrderingDashboard
@@ -3,6 +3,12 @@ import tkinter as tk
 from tkinter import ttk, simpledialog, messagebox
 from datetime import datetime
 from database import get_db_connection
+from catalog_index import catalog_index
+from product_search import search_products
+from search_executor import SearchExecutor
+from sale_journal import sale_journal
+from cart import Cart
+from sequences import next_number
 from utils import clear_window, show_error, show_info, show_warning
 
 class POSWindow:
@@ -11,9 +17,13 @@ class POSWindow:
         self.user = user
         self.return_mode = return_mode
         self.original_invoice_no = invoice_no
-        self.cart = []
-        self.invoice_no = invoice_no or f"INV{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        self.cart = Cart()
+        # A return is saved as a new sale, so it needs its own number too
+        self.invoice_no = next_number("RET" if return_mode else "INV")
+        catalog_index.ensure_loaded()
+        sale_journal.start()
         self.setup_ui()
+        self.check_journal()
         if return_mode and invoice_no:
             self.load_return_invoice(invoice_no)
 
@@ -95,6 +105,9 @@ class POSWindow:
         self.dropdown_listbox = tk.Listbox(self.dropdown_frame, font=("Arial", 12), height=5, bg="white", fg="#0d1b2a")
         self.dropdown_listbox.pack(fill=tk.BOTH, expand=True)
         self.dropdown_listbox.bind("<Double-Button-1>", self.on_dropdown_select)
+        self.search_results = []
+        self.search_executor = SearchExecutor(self.root, lambda q: search_products(q, limit=5), self.show_search_results)
+        self.dropdown_listbox.bind("<Destroy>", lambda e: self.search_executor.shutdown())
 
         # === CART DISPLAY ===
         cart_frame = tk.Frame(self.root, bg="#0d1b2a", padx=30, pady=10)
@@ -121,6 +134,7 @@ class POSWindow:
         scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.cart_tree.yview)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.cart_tree.configure(yscrollcommand=scrollbar.set)
+        self.cart.subscribe(self.on_cart_change)
 
         # Style Treeview for dark theme
         style = ttk.Style()
@@ -159,7 +173,7 @@ class POSWindow:
         disc_frame.pack(anchor="w", pady=(5,5))
         tk.Label(disc_frame, text="Discount (Rs.):", font=("Arial", 11), fg="white", bg="#1b263b").pack(side=tk.LEFT)
         tk.Entry(disc_frame, textvariable=self.discount_var, font=("Arial", 11), width=8, bg="#0d1b2a", fg="white").pack(side=tk.LEFT, padx=5)
-        self.discount_var.trace("w", lambda *args: self.update_cart_display())
+        self.discount_var.trace("w", lambda *args: self.update_totals())
 
         tk.Label(totals_frame, text="TOTAL:", font=("Arial", 14, "bold"), fg="white", bg="#1b263b").pack(anchor="w", pady=(10,5))
         tk.Label(totals_frame, textvariable=self.total_var, font=("Arial", 18, "bold"), fg="gold", bg="#1b263b").pack(anchor="w")
@@ -184,6 +198,18 @@ class POSWindow:
         self.datetime_label.config(text=now)
         self.root.after(1000, self.update_datetime)  # Update every second
 
+    def check_journal(self):
+        if not self.datetime_label.winfo_exists():
+            return  # this screen was closed
+        # Sales the database rejected on replay are set aside, not retried
+        rejected = sale_journal.take_quarantined()
+        if rejected:
+            details = "\n".join(f"{invoice_no}: {error}" for invoice_no, error in rejected)
+            show_warning("Sales Not Saved",
+                         f"⚠️ {len(rejected)} sale(s) could not be written to the database:\n{details}\n\n"
+                         f"They were kept in {sale_journal.quarantine_path}. Please inform the manager.")
+        self.root.after(5000, self.check_journal)
+
     def on_loyalty_scan(self, event=None):
         card_no = self.loyalty_var.get().strip()
         if not card_no:
@@ -208,9 +234,17 @@ class POSWindow:
     def on_search_change(self, event=None):
         query = self.search_var.get().strip()
         if len(query) < 2:
+            self.search_executor.cancel()
             self.dropdown_frame.place_forget()
             return
 
+        # Runs on a worker thread once typing pauses; results come back via show_search_results
+        self.search_executor.submit(query)
+
+    def show_search_results(self, query, rows):
+        if query != self.search_var.get().strip():
+            return  # entry was cleared or changed by a scan
+
         # Show dropdown
         x = self.search_entry.winfo_rootx() - self.root.winfo_rootx()
         y = self.search_entry.winfo_rooty() - self.root.winfo_rooty() + self.search_entry.winfo_height()
@@ -218,12 +252,7 @@ class POSWindow:
 
         # Clear & populate
         self.dropdown_listbox.delete(0, tk.END)
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute("SELECT id, name, price, barcode FROM products WHERE name LIKE ? OR barcode LIKE ? LIMIT 5",
-                  (f"%{query}%", f"%{query}%"))
-        self.search_results = c.fetchall()
-        conn.close()
+        self.search_results = rows
 
         for row in self.search_results:
             display = f"{row[1]} - Rs. {row[2]:.2f} (Barcode: {row[3]})"
@@ -279,22 +308,8 @@ class POSWindow:
         if not query:
             return
 
-        conn = get_db_connection()
-        c = conn.cursor()
-        
-        # Check if barcode matches multiple products
-        c.execute("""
-            SELECT p.id, p.name, p.selling_price, p.stock, p.barcode,
-                   pv.variant_value as size
-            FROM products p
-            LEFT JOIN product_variants pv ON p.id = pv.product_id AND pv.variant_name = 'Size'
-            WHERE p.barcode = ? OR p.id IN (
-                SELECT product_id FROM product_variants WHERE barcode = ?
-            )
-        """, (query, query))
-        
-        products = c.fetchall()
-        conn.close()
+        # Resolved from the in-memory index; may return several products per barcode
+        products = catalog_index.lookup(query)
 
         if not products:
             show_warning("Not Found", "Product not found.")
@@ -374,67 +389,40 @@ class POSWindow:
 
     def add_product_to_cart_from_db(self, product):
         """Add product from database query result"""
-        # Check if product already in cart
-        existing_item = None
-        for item in self.cart:
-            if item['id'] == product[0]:
-                existing_item = item
-                break
-
-        if existing_item:
-            existing_item['qty'] += 1.0
-            existing_item['total'] = existing_item['qty'] * existing_item['price']
-        else:
-            item = {
-                'id': product[0],
-                'name': product[1],
-                'price': product[2] if product[2] is not None else 0.0,
-                'qty': 1.0
-            }
-            item['total'] = item['price'] * item['qty']
-            self.cart.append(item)
-
-        self.update_cart_display()
+        self.cart.add(product[0], product[1], product[2])
 
     def add_product_to_cart(self, product):
         """Add product from manual selection (legacy method)"""
-        # Check if product already in cart
-        existing_item = None
-        for item in self.cart:
-            if item['id'] == product[0]:
-                existing_item = item
-                break
-
-        if existing_item:
-            existing_item['qty'] += 1.0
-            existing_item['total'] = existing_item['qty'] * existing_item['price']
-        else:
-            item = {
-                'id': product[0],
-                'name': product[1],
-                'price': product[2],
-                'qty': 1.0
-            }
-            item['total'] = item['price'] * item['qty']
-            self.cart.append(item)
-
-        self.update_cart_display()
-
-    def update_cart_display(self):
-        for item in self.cart_tree.get_children():
-            self.cart_tree.delete(item)
-
-        subtotal = 0
-        for item in self.cart:
-            self.cart_tree.insert("", "end", values=(
-                item['name'],
-                f"{item['qty']:.2f}",
-                f"Rs. {item['price']:.2f}",
-                f"Rs. {item['total']:.2f}"
-            ))
-            subtotal += item['total']
+        self.cart.add(product[0], product[1], product[2])
 
-        discount = self.discount_var.get() or 0.0
+    def on_cart_change(self, event, key, line):
+        """Apply one cart change to the Treeview instead of redrawing every row"""
+        if event == 'clear':
+            self.cart_tree.delete(*self.cart_tree.get_children())
+        else:
+            iid = f"{key[0]}:{key[1] if key[1] is not None else ''}"
+            if event == 'remove':
+                self.cart_tree.delete(iid)
+            else:
+                values = (
+                    line['name'],
+                    f"{line['qty']:.2f}",
+                    f"Rs. {line['price']:.2f}",
+                    f"Rs. {line['total']:.2f}"
+                )
+                if event == 'add':
+                    self.cart_tree.insert("", "end", iid=iid, values=values)
+                else:
+                    self.cart_tree.item(iid, values=values)
+                self.cart_tree.see(iid)
+        self.update_totals()
+
+    def update_totals(self):
+        try:
+            discount = self.discount_var.get() or 0.0
+        except tk.TclError:
+            discount = 0.0  # discount entry is empty or mid-edit
+        subtotal = self.cart.subtotal
         total = subtotal - discount
 
         self.subtotal_var.set(f"Rs. {subtotal:,.2f}")
@@ -448,40 +436,18 @@ class POSWindow:
         customer = self.customer_var.get().strip() or "Walk-in Customer"
         phone = self.phone_var.get().strip()
         discount = self.discount_var.get() or 0.0
-        subtotal = sum(item['total'] for item in self.cart)
-        total = subtotal - discount
+        total = self.cart.subtotal - discount
         payment_method = self.payment_var.get()
 
-        conn = get_db_connection()
-        c = conn.cursor()
-
         try:
-            c.execute("""
-                INSERT INTO sales (invoice_no, customer_name, total, discount, payment_method, is_held, cashier_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (self.invoice_no, f"{customer} | {phone}" if phone else customer, total, discount, payment_method, 0, self.user['id']))
-
-            sale_id = c.lastrowid
-
-            for item in self.cart:
-                c.execute("""
-                    INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (sale_id, item['id'], item['qty'], item['price'], item['total']))
-
-                # Reduce stock
-                c.execute("UPDATE products SET stock = stock - ? WHERE id = ?",
-                          (item['qty'], item['id']))
-
-            conn.commit()
+            # fsync'd to the local journal; the background writer puts it in store.db
+            sale_journal.record_sale(self.invoice_no, f"{customer} | {phone}" if phone else customer, self.cart,
+                                     self.user['id'], discount=discount, payment_method=payment_method)
             show_info("Success", f"✅ Sale completed!\nInvoice: {self.invoice_no}\nTotal: Rs. {total:,.2f}")
             self.go_back()
 
         except Exception as e:
-            conn.rollback()
             show_error("Error", f"Sale failed: {str(e)}")
-        finally:
-            conn.close()
 
     def hold_invoice(self):
         if not self.cart:
@@ -491,35 +457,15 @@ class POSWindow:
         customer = self.customer_var.get().strip() or "Walk-in Customer"
         phone = self.phone_var.get().strip()
         discount = self.discount_var.get() or 0.0
-        subtotal = sum(item['total'] for item in self.cart)
-        total = subtotal - discount
-
-        conn = get_db_connection()
-        c = conn.cursor()
 
         try:
-            c.execute("""
-                INSERT INTO sales (invoice_no, customer_name, total, discount, payment_method, is_held, cashier_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (self.invoice_no, f"{customer} | {phone}" if phone else customer, total, discount, "cash", 1, self.user['id']))
-
-            sale_id = c.lastrowid
-
-            for item in self.cart:
-                c.execute("""
-                    INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (sale_id, item['id'], item['qty'], item['price'], item['total']))
-
-            conn.commit()
+            sale_journal.record_sale(self.invoice_no, f"{customer} | {phone}" if phone else customer, self.cart,
+                                     self.user['id'], discount=discount, is_held=True)
             show_info("Held", f"📌 Invoice {self.invoice_no} held for {customer}")
             self.go_back()
 
         except Exception as e:
-            conn.rollback()
             show_error("Error", f"Hold failed: {str(e)}")
-        finally:
-            conn.close()
 
     def start_return_from_pos(self):
         invoice_no = simpledialog.askstring("Sale Return", "Enter Invoice Number to return:")
@@ -559,15 +505,9 @@ class POSWindow:
         if sale[2]:
             self.discount_var.set(sale[2])
 
-        self.cart = []
+        self.cart.clear()
         for item in items:
-            self.cart.append({
-                'id': item[0],
-                'name': item[1],
-                'price': item[3],
-                'qty': -item[2]  # Negative for return
-            })
-        self.update_cart_display()
+            self.cart.add(item[0], item[1], item[3], qty=-item[2])  # Negative for return
 
     def go_back(self):
         from .main_menu import MainMenu
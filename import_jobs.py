@@ -0,0 +1,252 @@
+# import_jobs.py
+"""Checkpointed, resumable catalogue imports, run off the Tk thread.
+
+Every import is a row in import_jobs keyed by the file's SHA-256 and the
+import settings (mapping, mode, key, chunk size). Each chunk's writes and
+the job's updated counts commit in the same transaction, so after a crash
+or a cancel the job row says exactly which chunks are in the database.
+Starting the same file with the same settings again resumes the job: the
+committed chunks are read past without being imported again.
+
+    job = open_job(path, mapping, mode="upsert")
+    stats = run_job(job, path, mapping)
+
+ImportWorker runs a job on a background thread and reports progress,
+throughput and ETA to the Tk thread through root.after(). Its inspect()
+hashes and counts a file on the same thread as soon as it is picked, so
+the window has the digest for the resume lookup and open_job(digest=...)
+without reading the file on the Tk thread or twice.
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from catalog_import import import_catalog, row_count_hint
+
+RESUMABLE = ("running", "cancelled", "failed")
+COUNTS = ("rows", "imported", "updated", "unchanged", "variants", "skipped")
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def job_settings(mapping, mode, key, chunk_size):
+    return json.dumps({"mapping": mapping, "mode": mode, "key": key, "chunk_size": chunk_size}, sort_keys=True)
+
+
+class ImportJob:
+    def __init__(self, job_id, chunk_size, chunks_done=0, counts=None, cancel_event=None):
+        self.id = job_id
+        self.chunk_size = chunk_size
+        self.chunks_done = chunks_done
+        self.counts = counts or {}
+        self._cancel = cancel_event or threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def checkpoint(self, c, stats):
+        """Record a chunk's counts inside the transaction that wrote it."""
+        c.execute("""
+            UPDATE import_jobs
+            SET chunks_done = ?, rows_done = ?, imported = ?, updated = ?, unchanged = ?, variants = ?,
+                skipped = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (stats["chunks"], stats["rows"], stats["imported"], stats["updated"], stats["unchanged"],
+              stats["variants"], stats["skipped"], self.id))
+
+
+def resumable_job(path, mapping, mode="insert", key="Barcode", chunk_size=5000, digest=None):
+    """The unfinished job for this file and settings as a dict, or None."""
+    row = database.fetch_one(f"""
+        SELECT id, chunks_done, rows_done, status, updated_at FROM import_jobs
+        WHERE file_hash = ? AND settings = ? AND status IN ({','.join('?' * len(RESUMABLE))})
+        ORDER BY id DESC LIMIT 1
+    """, (digest or file_hash(path), job_settings(mapping, mode, key, chunk_size)) + RESUMABLE)
+    if row is None:
+        return None
+    return {"id": row[0], "chunks_done": row[1], "rows_done": row[2], "status": row[3], "updated_at": row[4]}
+
+
+def open_job(path, mapping, mode="insert", key="Barcode", chunk_size=5000, started_by=None, resume=True,
+             total_rows=None, cancel_event=None, digest=None):
+    """Resume the unfinished job for this file and settings, or start a new one.
+
+    With resume=False unfinished jobs for the file are marked abandoned.
+    """
+    digest = digest or file_hash(path)
+    settings = job_settings(mapping, mode, key, chunk_size)
+    previous = resumable_job(path, mapping, mode, key, chunk_size, digest)
+    with database.connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            if previous and resume:
+                c.execute("UPDATE import_jobs SET status = 'running', error = NULL, finished_at = NULL, "
+                          "updated_at = CURRENT_TIMESTAMP WHERE id = ?", (previous["id"],))
+                row = c.execute("SELECT chunks_done, rows_done, imported, updated, unchanged, variants, skipped "
+                                "FROM import_jobs WHERE id = ?", (previous["id"],)).fetchone()
+                job = ImportJob(previous["id"], chunk_size, row[0], dict(zip(COUNTS, row[1:])), cancel_event)
+            else:
+                c.execute(f"UPDATE import_jobs SET status = 'abandoned' WHERE file_hash = ? AND settings = ? "
+                          f"AND status IN ({','.join('?' * len(RESUMABLE))})", (digest, settings) + RESUMABLE)
+                c.execute("""
+                    INSERT INTO import_jobs (file_name, file_hash, settings, chunk_size, total_rows, started_by)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (os.path.basename(path), digest, settings, chunk_size, total_rows, started_by))
+                job = ImportJob(c.lastrowid, chunk_size, cancel_event=cancel_event)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return job
+
+
+def finish_job(job, status, error=None):
+    database.execute_query("""
+        UPDATE import_jobs SET status = ?, error = ?, finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, (status, error, job.id))
+
+
+def run_job(job, path, mapping, mode="insert", key="Barcode", updated_by=None, on_progress=None, **options):
+    """import_catalog under `job`; the job ends completed, cancelled or failed."""
+    try:
+        stats = import_catalog(path, mapping, job.chunk_size, on_progress, mode, key, updated_by, job=job, **options)
+    except Exception as e:
+        finish_job(job, "failed", str(e))
+        raise
+    finish_job(job, "cancelled" if stats.get("cancelled") else "completed")
+    stats["job_id"] = job.id
+    return stats
+
+
+def eta_seconds(stats, total_rows):
+    """Seconds left at this session's throughput, or None if unknown."""
+    if not total_rows or not stats.get("rows_per_sec"):
+        return None
+    return max(total_rows - stats["rows"], 0) / stats["rows_per_sec"]
+
+
+def progress_text(stats, total_rows=None):
+    eta = eta_seconds(stats, total_rows)
+    done = f"{stats['rows']:,} of ~{total_rows:,} rows" if total_rows else f"{stats['rows']:,} rows"
+    left = f", ETA {int(eta // 60)}:{int(eta % 60):02d}" if eta is not None else ""
+    return f"{done}, {stats.get('rows_per_sec', 0):,.0f} rows/sec{left}"
+
+
+class ImportWorker:
+    """Runs one import job at a time on a background thread.
+
+    The thread lives as long as the worker, so it keeps its one pooled
+    connection across imports.
+    """
+
+    def __init__(self, root, on_progress=None, on_done=None, on_inspected=None, poll_ms=100):
+        self.root = root
+        self.on_progress = on_progress    # (stats)
+        self.on_done = on_done            # (stats or None, error or None)
+        self.on_inspected = on_inspected  # (path, digest, total_rows, error or None)
+        self.poll_ms = poll_ms
+        self._results = queue.Queue()
+        self._cancel = threading.Event()
+        self._executor = None
+        self._future = None
+        self._inspecting = 0
+        self._poll_timer = None
+
+    @property
+    def running(self):
+        return self._future is not None and not self._future.done()
+
+    def inspect(self, path):
+        """Hash the file and estimate its rows in the background; on_inspected() gets the result."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="catalog-import")
+        self._inspecting += 1
+        self._executor.submit(self._inspect, path)
+        self._schedule_poll()
+
+    def start(self, path, mapping, mode="insert", key="Barcode", chunk_size=5000, updated_by=None,
+              resume=True, total_rows=None, digest=None, **options):
+        if self.running:
+            raise RuntimeError("An import is already running")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="catalog-import")
+        self._cancel = threading.Event()
+        self._future = self._executor.submit(self._run, path, mapping, mode, key, chunk_size, updated_by,
+                                             resume, total_rows, digest, options)
+        self._schedule_poll()
+
+    def cancel(self):
+        """Stop after the chunk being written; the job can be resumed later."""
+        self._cancel.set()
+
+    def shutdown(self):
+        self.cancel()
+        if self._poll_timer is not None:
+            self.root.after_cancel(self._poll_timer)
+            self._poll_timer = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _schedule_poll(self):
+        if self._poll_timer is None:
+            self._poll_timer = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_timer = None
+        # Read before draining: the worker queues "done" before its future finishes
+        busy = self.running or self._inspecting
+        latest = None
+        while True:
+            try:
+                kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                latest = payload    # only the newest progress is worth drawing
+                continue
+            if kind == "inspected":
+                self._inspecting -= 1
+                if self.on_inspected:
+                    self.on_inspected(*payload)
+                continue
+            if latest is not None and self.on_progress:
+                self.on_progress(latest)
+            latest = None
+            if self.on_done:
+                self.on_done(*payload)
+        if latest is not None and self.on_progress:
+            self.on_progress(latest)
+        if busy or not self._results.empty():
+            self._schedule_poll()
+
+    def _inspect(self, path):
+        try:
+            self._results.put(("inspected", (path, file_hash(path), row_count_hint(path), None)))
+        except Exception as e:
+            self._results.put(("inspected", (path, None, None, e)))
+
+    def _run(self, path, mapping, mode, key, chunk_size, updated_by, resume, total_rows, digest, options):
+        try:
+            job = open_job(path, mapping, mode, key, chunk_size, updated_by, resume, total_rows, self._cancel,
+                           digest)
+            stats = run_job(job, path, mapping, mode, key, updated_by,
+                            on_progress=lambda stats: self._results.put(("progress", stats)), **options)
+            self._results.put(("done", (stats, None)))
+        except Exception as e:
+            self._results.put(("done", (None, e)))
@@ -0,0 +1,159 @@
+# import_validation.py
+"""Validation stage for catalogue imports.
+
+Each chunk is checked with vectorised pandas operations (check_chunk):
+name present, Cost/Sale/Stock coercible to numbers, barcode format. The
+checks run on a process pool, a bounded number of chunks ahead of the
+writer, so a large file validates on every core while earlier chunks are
+being written. Duplicate barcodes need the whole run's state, so they are
+checked in the importing process: against earlier rows of the file, and
+(for inserts) against product and variant barcodes already in the DB.
+
+Rejected rows are written, with their data row number and reason, to a
+rejected-rows workbook next to the imported file:
+
+    validator = ChunkValidator(positions, columns, rejected_path="price_list_rejected.xlsx")
+    for count, valid_rows in validator.validated(chunked(rows, 5000)):
+        ...
+    validator.close()   # saves the workbook; returns its path, or None if nothing was rejected
+"""
+import multiprocessing
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import database
+from catalog_import import NUMERIC_FIELDS, chunk_columns, text_column
+
+# Shop and supplier codes as well as EAN/UPC; no spaces, at most 32 characters
+BARCODE_PATTERN = r"[0-9A-Za-z][0-9A-Za-z._/-]{0,31}"
+SCIENTIFIC_PATTERN = r"\d(\.\d+)?[eE][+-]?\d+"
+
+
+def rejected_path_for(path):
+    return f"{os.path.splitext(path)[0]}_rejected.xlsx"
+
+
+def check_chunk(rows, positions):
+    """[(offset in chunk, reason)] for rows that fail the per-row checks; first failure wins."""
+    columns = chunk_columns(rows, positions)
+    reasons = pd.Series("", index=range(len(rows)), dtype=object)
+
+    def flag(bad, reason):
+        reasons.mask((reasons == "") & bad, reason, inplace=True)
+
+    def text(field):
+        return pd.Series(text_column(columns[field]) if field in columns else [""] * len(rows), dtype=object)
+
+    flag(text("Name") == "", "Name is required")
+    for field in NUMERIC_FIELDS:
+        if field in columns:
+            values = text(field)
+            numbers = pd.to_numeric(values.str.replace(",", "", regex=False), errors="coerce")
+            flag((values != "") & (numbers.isna() | numbers.abs().eq(float("inf"))), f"{field} is not a number")
+    if "Barcode" in columns:
+        barcodes = text("Barcode")
+        present = barcodes != ""
+        flag(present & barcodes.str.fullmatch(SCIENTIFIC_PATTERN),
+             "Barcode in scientific notation (format the column as text)")
+        flag(present & ~barcodes.str.fullmatch(BARCODE_PATTERN), "Barcode format is invalid")
+
+    bad = reasons[reasons != ""]
+    return list(zip(bad.index.tolist(), bad.tolist()))
+
+
+def existing_barcodes(barcodes):
+    """The given barcodes already used by a product or variant."""
+    found = set()
+    barcodes = list(barcodes)
+    with database.connection_manager.connection() as conn:
+        for start in range(0, len(barcodes), 500):
+            chunk = barcodes[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(row[0] for row in conn.execute(
+                f"SELECT barcode FROM products WHERE barcode IN ({marks}) "
+                f"UNION SELECT barcode FROM product_variants WHERE barcode IN ({marks})", chunk + chunk))
+    return found
+
+
+class ChunkValidator:
+    def __init__(self, positions, columns, check_database=True, workers=None, rejected_path=None,
+                 read_ahead=2):
+        self.positions = positions
+        self.columns = list(columns)
+        self.check_database = check_database    # off for upserts, where a known barcode is a match
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.rejected_path = rejected_path
+        self.read_ahead = read_ahead            # chunks in flight per worker
+        self.reasons = Counter()
+        self.rejected = 0
+        self._seen = {}                         # barcode -> data row number of its first row
+        self._workbook = None
+        self._sheet = None
+
+    def validated(self, chunks, first_row=1):
+        """Yield (rows in chunk, valid rows) for each chunk, in file order."""
+        for chunk, problems in self._checked(chunks):
+            bad = dict(problems)
+            if "Barcode" in self.positions:
+                barcodes = text_column(chunk_columns(chunk, {"Barcode": self.positions["Barcode"]})["Barcode"])
+                bad.update(self._duplicates(barcodes, bad, first_row))
+            for offset in sorted(bad):
+                self._reject(first_row + offset, chunk[offset], bad[offset])
+            yield len(chunk), [row for offset, row in enumerate(chunk) if offset not in bad]
+            first_row += len(chunk)
+
+    def close(self):
+        """Save the rejected-rows workbook; returns its path, or None if nothing was rejected."""
+        if self._workbook is None:
+            return None
+        self._workbook.save(self.rejected_path)
+        self._workbook = self._sheet = None
+        return self.rejected_path
+
+    def _checked(self, chunks):
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield chunk, check_chunk(chunk, self.positions)
+            return
+        # spawn, not fork: the importing process may be a Tk app with live threads and connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.workers, mp_context=context) as pool:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, pool.submit(check_chunk, chunk, self.positions)))
+                if len(pending) >= self.workers * self.read_ahead:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+    def _duplicates(self, barcodes, bad, first_row):
+        candidates = {barcode for offset, barcode in enumerate(barcodes) if barcode and offset not in bad}
+        in_db = existing_barcodes(candidates - self._seen.keys()) if self.check_database else set()
+        found = {}
+        for offset, barcode in enumerate(barcodes):
+            if not barcode or offset in bad:
+                continue
+            if barcode in self._seen:
+                found[offset] = f"Duplicate barcode in file (row {self._seen[barcode]})"
+            elif barcode in in_db:
+                found[offset] = "Barcode already in catalogue"
+            else:
+                self._seen[barcode] = first_row + offset
+        return found
+
+    def _reject(self, row_number, row, reason):
+        if self._workbook is None and self.rejected_path:
+            from openpyxl import Workbook
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet("Rejected")
+            self._sheet.append(["Row", "Reason"] + self.columns)
+        if self._sheet is not None:
+            self._sheet.append([row_number, reason] + list(row))
+        # Reasons for duplicates name the first row; count them under one heading
+        self.reasons[reason.split(" (row")[0]] += 1
+        self.rejected += 1
@@ -1,11 +1,14 @@
 # main.py
 import tkinter as tk
 from database import init_db
+from sale_journal import sale_journal
 from gui.login import LoginWindow
 
 if __name__ == "__main__":
     # Initialize database (creates tables + sample data)
     init_db()
+    # Replay sales journaled before a crash or while the database was locked
+    sale_journal.start()
 
     # Create main window
     root = tk.Tk()
@@ -0,0 +1,798 @@
+# migrations.py
+"""Numbered schema migrations keyed on PRAGMA user_version.
+
+Each migration runs once, in its own transaction, and bumps user_version to
+its number. When a database is already current, migrate() costs a single
+PRAGMA read.
+"""
+import json
+import sqlite3
+
+
+def _create_base_tables(c):
+    """Core tables (the original init_db schema)."""
+    # ========================
+    #    USERS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL CHECK(role IN ('admin', 'cashier', 'manager')),
+            full_name TEXT
+        )
+    """)
+
+    # ========================
+    #    CATEGORIES TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            parent_id INTEGER,
+            location_tag TEXT,
+            FOREIGN KEY (parent_id) REFERENCES categories(id)
+        )
+    """)
+
+    # ========================
+    #    SUPPLIERS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS suppliers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            ntn TEXT,
+            gst TEXT,
+            address TEXT,
+            payment_terms TEXT,
+            order_days TEXT,
+            lead_time_days INTEGER DEFAULT 3
+        )
+    """)
+
+    # ========================
+    #    TAXES TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS taxes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            rate REAL NOT NULL,
+            is_default BOOLEAN DEFAULT 0
+        )
+    """)
+
+    # ========================
+    #    UOM TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS uoms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            symbol TEXT NOT NULL UNIQUE
+        )
+    """)
+
+    # ========================
+    #    PRODUCTS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            barcode TEXT,
+            company TEXT,
+            category_id INTEGER,
+            supplier_id INTEGER,
+            tax_id INTEGER,
+            base_uom_id INTEGER,
+            purchase_uom_id INTEGER,
+            cost_price REAL,
+            selling_price REAL,
+            stock REAL DEFAULT 0,
+            tax_type TEXT DEFAULT 'exclusive',
+            gst_rate REAL DEFAULT 17.0,
+            FOREIGN KEY (category_id) REFERENCES categories(id),
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id),
+            FOREIGN KEY (tax_id) REFERENCES taxes(id),
+            FOREIGN KEY (base_uom_id) REFERENCES uoms(id),
+            FOREIGN KEY (purchase_uom_id) REFERENCES uoms(id)
+        )
+    """)
+
+    # ========================
+    #    PRODUCT VARIANTS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS product_variants (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER,
+            variant_name TEXT,
+            variant_value TEXT,
+            barcode TEXT,
+            price REAL,
+            stock REAL DEFAULT 0,
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+
+    # ========================
+    #    UOM CONVERSIONS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS uom_conversions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER,
+            from_uom_id INTEGER,
+            to_uom_id INTEGER,
+            factor REAL,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (from_uom_id) REFERENCES uoms(id),
+            FOREIGN KEY (to_uom_id) REFERENCES uoms(id)
+        )
+    """)
+
+    # ========================
+    #    SALES TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sales (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            invoice_no TEXT UNIQUE,
+            customer_name TEXT,
+            total REAL,
+            discount REAL DEFAULT 0,
+            payment_method TEXT CHECK(payment_method IN ('cash', 'credit_card', 'return')),
+            is_held BOOLEAN DEFAULT 0,
+            is_return BOOLEAN DEFAULT 0,
+            original_invoice TEXT,
+            cashier_id INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cashier_id) REFERENCES users(id)
+        )
+    """)
+
+    # ========================
+    #    SALE ITEMS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sale_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sale_id INTEGER,
+            product_id INTEGER,
+            variant_id INTEGER,
+            quantity REAL,
+            unit_price REAL,
+            total_price REAL,
+            FOREIGN KEY (sale_id) REFERENCES sales(id),
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (variant_id) REFERENCES product_variants(id)
+        )
+    """)
+
+    # ========================
+    #    PURCHASE ORDERS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS purchase_orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_number TEXT UNIQUE,
+            supplier_id INTEGER,
+            status TEXT CHECK(status IN ('draft', 'sent', 'received', 'partial', 'cancelled')) DEFAULT 'draft',
+            total_amount REAL,
+            created_by INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            sent_at TEXT,
+            received_at TEXT,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id),
+            FOREIGN KEY (created_by) REFERENCES users(id)
+        )
+    """)
+
+    # ========================
+    #    PO ITEMS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS po_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_id INTEGER,
+            product_id INTEGER,
+            quantity_ordered REAL,
+            quantity_received REAL DEFAULT 0,
+            cost_price REAL,
+            FOREIGN KEY (po_id) REFERENCES purchase_orders(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+
+    # ========================
+    #    GOODS RECEIPT TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS goods_receipts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receipt_number TEXT UNIQUE,
+            po_id INTEGER,
+            supplier_id INTEGER,
+            total_amount REAL,
+            net_payable REAL,
+            withholding_tax_rate REAL DEFAULT 0,
+            withholding_tax_amount REAL DEFAULT 0,
+            received_by INTEGER,
+            received_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            is_direct_receipt BOOLEAN DEFAULT 0,
+            FOREIGN KEY (po_id) REFERENCES purchase_orders(id),
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id),
+            FOREIGN KEY (received_by) REFERENCES users(id)
+        )
+    """)
+
+    # ========================
+    #    GOODS RECEIPT ITEMS TABLE
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS goods_receipt_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receipt_id INTEGER,
+            product_id INTEGER,
+            quantity_received REAL,
+            foc_quantity REAL DEFAULT 0,
+            quantity_in_base_uom REAL,
+            trade_price REAL,
+            retail_price REAL,
+            cost_price REAL,
+            FOREIGN KEY (receipt_id) REFERENCES goods_receipts(id),
+            FOREIGN KEY (product_id) REFERENCES products(id)
+        )
+    """)
+
+    # ========================
+    #    WITHHOLDING TAX RECORDS
+    # ========================
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS withholding_tax_records (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receipt_id INTEGER,
+            tax_amount REAL,
+            tax_date TEXT,
+            status TEXT DEFAULT 'pending',
+            paid_date TEXT,
+            FOREIGN KEY (receipt_id) REFERENCES goods_receipts(id)
+        )
+    """)
+
+
+def _insert_seed_data(c):
+    """Default users, tax, UOMs and sample catalog rows for a fresh database."""
+    # Default Users
+    c.execute("INSERT OR IGNORE INTO users (username, password, role, full_name) VALUES (?, ?, ?, ?)",
+              ("admin", "admin123", "admin", "System Admin"))
+    c.execute("INSERT OR IGNORE INTO users (username, password, role, full_name) VALUES (?, ?, ?, ?)",
+              ("cashier1", "cash123", "cashier", "Cashier One"))
+
+    # Default Taxes
+    c.execute("INSERT OR IGNORE INTO taxes (name, rate, is_default) VALUES (?, ?, ?)", ("GST 17%", 17.0, 1))
+
+    # Default UOMs
+    c.execute("INSERT OR IGNORE INTO uoms (name, symbol) VALUES (?, ?)", ("Piece", "pcs"))
+    c.execute("INSERT OR IGNORE INTO uoms (name, symbol) VALUES (?, ?)", ("Box", "box"))
+
+    # Sample Categories
+    c.execute("INSERT OR IGNORE INTO categories (id, name, parent_id, location_tag) VALUES (1, 'Grocery', NULL, 'A1')")
+    c.execute("INSERT OR IGNORE INTO categories (id, name, parent_id, location_tag) VALUES (2, 'Beverages', 1, 'A2')")
+
+    # Sample Suppliers
+    c.execute("""
+        INSERT OR IGNORE INTO suppliers (name, ntn, gst, address, payment_terms, order_days, lead_time_days)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        "Procter & Gamble",
+        "NTN-12345",
+        "GST-67890",
+        "Industrial Zone, Lahore",
+        "Net 30 Days",
+        json.dumps(["Monday", "Thursday"]),
+        3
+    ))
+
+    # Sample Products
+    c.execute("""
+        INSERT OR IGNORE INTO products (name, company, barcode, category_id, supplier_id, tax_id, 
+                                      base_uom_id, purchase_uom_id, cost_price, selling_price, stock, tax_type, gst_rate)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        "Oral-B Toothbrush",
+        "Procter & Gamble",
+        "1234567890123",
+        1,  # Grocery
+        1,  # P&G
+        1,  # GST 17%
+        1,  # Piece
+        2,  # Box
+        200.0,
+        250.0,
+        120.0,
+        "exclusive",  # tax_type
+        17.0          # gst_rate
+    ))
+
+    # Sample UOM Conversion: 1 Box = 12 Pieces
+    c.execute("""
+        INSERT OR IGNORE INTO uom_conversions (product_id, from_uom_id, to_uom_id, factor)
+        VALUES (?, ?, ?, ?)
+    """, (1, 2, 1, 12.0))  # Box → Piece
+
+
+def _m001_base_schema(c):
+    # Databases created before migrations existed already have these tables
+    # (and their seed rows); only seed a brand-new file.
+    fresh = c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='users'").fetchone() is None
+    _create_base_tables(c)
+    if fresh:
+        _insert_seed_data(c)
+
+
+# ========================
+#    SECONDARY INDEXES
+# ========================
+INDEXES = [
+    # POS barcode scans
+    ("idx_products_barcode", "products (barcode)"),
+    ("idx_product_variants_barcode", "product_variants (barcode)"),
+    ("idx_product_variants_product", "product_variants (product_id, variant_name)"),
+    # Sales history / smart order; (product_id, sale_id, quantity) covers the
+    # per-product quantity sums without touching the sale_items table
+    ("idx_sale_items_sale", "sale_items (sale_id)"),
+    ("idx_sale_items_product_sale", "sale_items (product_id, sale_id, quantity)"),
+    ("idx_sales_created_at", "sales (created_at)"),
+    # Purchase orders
+    ("idx_po_items_po", "po_items (po_id)"),
+    ("idx_po_items_product", "po_items (product_id)"),
+]
+
+
+def create_indexes(c, indexes=INDEXES):
+    for name, target in indexes:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _m002_secondary_indexes(c):
+    create_indexes(c)
+    c.execute("ANALYZE")
+
+
+# ========================
+#    TABLES USED BY THE GUI BUT NEVER CREATED
+# ========================
+def _m003_supplier_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS supplier_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            supplier_id INTEGER NOT NULL,
+            cost_price REAL,
+            effective_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            is_active BOOLEAN DEFAULT 1,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_supplier_prices_product ON supplier_prices (product_id, effective_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_supplier_prices_supplier ON supplier_prices (supplier_id, is_active)")
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            selling_price REAL,
+            updated_by INTEGER,
+            effective_date TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (product_id) REFERENCES products(id),
+            FOREIGN KEY (updated_by) REFERENCES users(id)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_price_history_product ON price_history (product_id, effective_date)")
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS supplier_reps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER NOT NULL,
+            name TEXT,
+            designation TEXT,
+            contact TEXT,
+            FOREIGN KEY (supplier_id) REFERENCES suppliers(id)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_supplier_reps_supplier ON supplier_reps (supplier_id)")
+
+
+# ========================
+#    FULL-TEXT PRODUCT SEARCH
+# ========================
+# One row per product (rowid = products.id); the variants column holds every
+# variant value and variant barcode so "red" or a variant code finds the product.
+SEARCH_ROW_SQL = """
+    INSERT INTO product_search (rowid, name, company, barcode, variants)
+    SELECT p.id, p.name, p.company, p.barcode,
+           (SELECT group_concat(trim(coalesce(v.variant_value, '') || ' ' || coalesce(v.barcode, '')), ' ')
+            FROM product_variants v WHERE v.product_id = p.id)
+    FROM products p
+"""
+
+
+def fts5_available(c):
+    try:
+        c.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        c.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _search_triggers():
+    def rebuild(ref):
+        return (f"DELETE FROM product_search WHERE rowid = {ref}; "
+                f"{SEARCH_ROW_SQL} WHERE p.id = {ref};")
+
+    return {
+        "trg_products_search_ins": f"AFTER INSERT ON products BEGIN {rebuild('NEW.id')} END",
+        "trg_products_search_upd": f"AFTER UPDATE OF name, company, barcode ON products BEGIN {rebuild('NEW.id')} END",
+        "trg_products_search_del": "AFTER DELETE ON products BEGIN DELETE FROM product_search WHERE rowid = OLD.id; END",
+        "trg_variants_search_ins": f"AFTER INSERT ON product_variants BEGIN {rebuild('NEW.product_id')} END",
+        "trg_variants_search_upd": (f"AFTER UPDATE ON product_variants BEGIN {rebuild('OLD.product_id')} "
+                                    f"{rebuild('NEW.product_id')} END"),
+        "trg_variants_search_del": f"AFTER DELETE ON product_variants BEGIN {rebuild('OLD.product_id')} END",
+    }
+
+
+# Row-at-a-time triggers that bulk writers swap for one INSERT ... SELECT
+_BULK_TRIGGERS = ("trg_products_search_ins", "trg_variants_search_ins", "trg_variants_attributes_ins")
+
+
+def defer_catalog_triggers(c):
+    """Drop the insert triggers inside the caller's transaction; returns what was dropped."""
+    names = [row[0] for row in c.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN "
+        f"({','.join('?' * len(_BULK_TRIGGERS))})", _BULK_TRIGGERS)]
+    for name in names:
+        c.execute(f"DROP TRIGGER {name}")
+    return names
+
+
+def restore_catalog_triggers(c, names, first_id, last_id):
+    """Build search and attribute rows for products first_id..last_id in one statement each and
+    recreate the dropped triggers."""
+    if not names:
+        return
+    if "trg_products_search_ins" in names or "trg_variants_search_ins" in names:
+        c.execute(f"{SEARCH_ROW_SQL} WHERE p.id BETWEEN ? AND ?", (first_id, last_id))
+    if "trg_variants_attributes_ins" in names:
+        c.execute(f"{ATTRIBUTES_ROW_SQL} WHERE p.id BETWEEN ? AND ? AND {HAS_ATTRIBUTES}", (first_id, last_id))
+    triggers = {**_search_triggers(), **_attribute_triggers()}
+    for name in names:
+        c.execute(f"CREATE TRIGGER {name} {triggers[name]}")
+
+
+def _m004_product_search(c):
+    # Builds without FTS5 fall back to the in-process trigram index in product_search.py
+    if not fts5_available(c):
+        return
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+            name, company, barcode, variants,
+            tokenize = "unicode61 remove_diacritics 2",
+            prefix = '1 2 3'
+        )
+    """)
+    for name, body in _search_triggers().items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    c.execute("DELETE FROM product_search")
+    c.execute(SEARCH_ROW_SQL)
+
+
+# ========================
+#    DOCUMENT NUMBER SEQUENCES
+# ========================
+def _m005_document_sequences(c):
+    # High-water mark per terminal and document type; numbers up to it are taken
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS document_sequences (
+            terminal_id TEXT NOT NULL,
+            doc_type TEXT NOT NULL,
+            high_water INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (terminal_id, doc_type)
+        ) WITHOUT ROWID
+    """)
+
+
+# ========================
+#    DAILY SALES ROLLUP
+# ========================
+# qty/revenue/txn_count cover completed (non-held) sales; return_qty counts
+# negative lines and is_return sales. Append a WHERE on s.created_at to
+# rebuild a date range.
+DAILY_ROLLUP_SQL = """
+    INSERT INTO daily_product_sales (sale_date, product_id, qty, revenue, return_qty, txn_count)
+    SELECT substr(s.created_at, 1, 10), si.product_id,
+           SUM(CASE WHEN s.is_return = 0 THEN si.quantity ELSE 0 END),
+           SUM(CASE WHEN s.is_return = 0 THEN si.total_price ELSE 0 END),
+           SUM(CASE WHEN s.is_return = 1 THEN abs(si.quantity)
+                    WHEN si.quantity < 0 THEN -si.quantity ELSE 0 END),
+           COUNT(DISTINCT CASE WHEN s.is_return = 0 THEN s.id END)
+    FROM sales s
+    JOIN sale_items si ON si.sale_id = s.id
+    WHERE s.is_held = 0 AND si.product_id IS NOT NULL {where}
+    GROUP BY 1, 2
+"""
+
+
+def _m006_daily_product_sales(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS daily_product_sales (
+            sale_date TEXT NOT NULL,
+            product_id INTEGER NOT NULL,
+            qty REAL NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            return_qty REAL NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (sale_date, product_id)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_daily_product_sales_product ON daily_product_sales (product_id, sale_date)")
+    c.execute("DELETE FROM daily_product_sales")
+    c.execute(DAILY_ROLLUP_SQL.format(where=""))
+
+
+def _m007_product_name_index(c):
+    # Import upserts matched on name, and the items grid's ORDER BY name, id
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_name_id ON products (name, id)")
+
+
+def _m008_import_jobs(c):
+    # One row per catalogue import; counts are checkpointed with every committed chunk
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name TEXT NOT NULL,
+            file_hash TEXT NOT NULL,
+            settings TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            chunk_size INTEGER NOT NULL,
+            chunks_done INTEGER NOT NULL DEFAULT 0,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            imported INTEGER NOT NULL DEFAULT 0,
+            updated INTEGER NOT NULL DEFAULT 0,
+            unchanged INTEGER NOT NULL DEFAULT 0,
+            variants INTEGER NOT NULL DEFAULT 0,
+            skipped INTEGER NOT NULL DEFAULT 0,
+            total_rows INTEGER,
+            error TEXT,
+            started_by INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            finished_at TEXT,
+            FOREIGN KEY (started_by) REFERENCES users(id)
+        )
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_file ON import_jobs (file_hash, status)")
+
+
+def _m009_items_grid_indexes(c):
+    # Keyset pages of the items grid under a category / supplier / company filter
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_category_name ON products (category_id, name, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_supplier_name ON products (supplier_id, name, id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_company_name ON products (company, name, id)")
+
+
+# ========================
+#    PRODUCT ATTRIBUTES
+# ========================
+# Variant and Size pivoted into one row per product, so catalogue readers
+# join one row by primary key instead of probing product_variants twice.
+# Each value is the product's first variant row of that name (lowest id),
+# the row the old "... LIMIT 1" subqueries returned.
+ATTRIBUTES_ROW_SQL = """
+    INSERT OR REPLACE INTO product_attributes (product_id, variant, size)
+    SELECT p.id,
+           (SELECT v.variant_value FROM product_variants v
+            WHERE v.product_id = p.id AND v.variant_name = 'Variant' ORDER BY v.id LIMIT 1),
+           (SELECT v.variant_value FROM product_variants v
+            WHERE v.product_id = p.id AND v.variant_name = 'Size' ORDER BY v.id LIMIT 1)
+    FROM products p
+"""
+HAS_ATTRIBUTES = ("EXISTS (SELECT 1 FROM product_variants v "
+                  "WHERE v.product_id = p.id AND v.variant_name IN ('Variant', 'Size'))")
+
+
+def _attribute_triggers():
+    def rebuild(ref):
+        return (f"DELETE FROM product_attributes WHERE product_id = {ref}; "
+                f"{ATTRIBUTES_ROW_SQL} WHERE p.id = {ref} AND {HAS_ATTRIBUTES};")
+
+    return {
+        "trg_variants_attributes_ins": f"AFTER INSERT ON product_variants BEGIN {rebuild('NEW.product_id')} END",
+        "trg_variants_attributes_upd": (f"AFTER UPDATE OF product_id, variant_name, variant_value ON product_variants "
+                                        f"BEGIN {rebuild('OLD.product_id')} {rebuild('NEW.product_id')} END"),
+        "trg_variants_attributes_del": f"AFTER DELETE ON product_variants BEGIN {rebuild('OLD.product_id')} END",
+        "trg_products_attributes_del": ("AFTER DELETE ON products "
+                                        "BEGIN DELETE FROM product_attributes WHERE product_id = OLD.id; END"),
+    }
+
+
+def _m010_product_attributes(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS product_attributes (
+            product_id INTEGER PRIMARY KEY,
+            variant TEXT,
+            size TEXT
+        )
+    """)
+    for name, body in _attribute_triggers().items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    c.execute("DELETE FROM product_attributes")
+    c.execute(f"{ATTRIBUTES_ROW_SQL} WHERE {HAS_ATTRIBUTES}")
+
+
+# ========================
+#    CATEGORY CLOSURE
+# ========================
+# One row per (ancestor, descendant) pair, each category its own ancestor at
+# depth 0, so "everything under X" is an index range instead of a recursive walk.
+def _closure_triggers():
+    return {
+        "trg_categories_closure_ins": """AFTER INSERT ON categories BEGIN
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth) VALUES (NEW.id, NEW.id, 0);
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, NEW.id, depth + 1 FROM category_closure WHERE descendant_id = NEW.parent_id;
+        END""",
+        "trg_categories_closure_cycle": """BEFORE UPDATE OF parent_id ON categories
+        WHEN NEW.parent_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = NEW.id) BEGIN
+            SELECT RAISE(ABORT, 'A category cannot be moved under itself');
+        END""",
+        "trg_categories_closure_move": """AFTER UPDATE OF parent_id ON categories
+        WHEN OLD.parent_id IS NOT NEW.parent_id BEGIN
+            DELETE FROM category_closure
+            WHERE descendant_id IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = NEW.id)
+              AND ancestor_id NOT IN (SELECT descendant_id FROM category_closure WHERE ancestor_id = NEW.id);
+            INSERT INTO category_closure (ancestor_id, descendant_id, depth)
+            SELECT above.ancestor_id, below.descendant_id, above.depth + below.depth + 1
+            FROM category_closure above, category_closure below
+            WHERE above.descendant_id = NEW.parent_id AND below.ancestor_id = NEW.id;
+        END""",
+        "trg_categories_closure_del": """AFTER DELETE ON categories BEGIN
+            DELETE FROM category_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id;
+        END""",
+    }
+
+
+def _m011_category_closure(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS category_closure (
+            ancestor_id INTEGER NOT NULL,
+            descendant_id INTEGER NOT NULL,
+            depth INTEGER NOT NULL,
+            PRIMARY KEY (ancestor_id, descendant_id)
+        ) WITHOUT ROWID
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_category_closure_descendant ON category_closure (descendant_id, depth)")
+    c.execute("DELETE FROM category_closure")
+    # UNION (not UNION ALL) and the depth cap stop on a parent_id cycle already in the data
+    c.execute("""
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM categories
+            UNION
+            SELECT tree.ancestor_id, child.id, tree.depth + 1
+            FROM tree JOIN categories child ON child.parent_id = tree.descendant_id
+            WHERE tree.depth < 64
+        )
+        INSERT OR IGNORE INTO category_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id
+    """)
+    for name, body in _closure_triggers().items():
+        c.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+
+def _m012_category_delete_reparents(c):
+    # Deleting a category moves its children up to its parent; the move
+    # trigger rewrites their closure rows, so subtree queries match the tree
+    c.execute("DROP TRIGGER IF EXISTS trg_categories_closure_del")
+    c.execute("""
+        CREATE TRIGGER trg_categories_closure_del AFTER DELETE ON categories BEGIN
+            UPDATE categories SET parent_id = OLD.parent_id WHERE parent_id = OLD.id;
+            DELETE FROM category_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id;
+        END
+    """)
+    # Children left behind by earlier deletes go to their nearest surviving ancestor (or the top level)
+    c.execute("""
+        UPDATE categories
+        SET parent_id = (SELECT cc.ancestor_id FROM category_closure cc
+                         WHERE cc.descendant_id = categories.id AND cc.depth > 0
+                           AND cc.ancestor_id IN (SELECT id FROM categories)
+                         ORDER BY cc.depth LIMIT 1)
+        WHERE parent_id IS NOT NULL AND parent_id NOT IN (SELECT id FROM categories)
+    """)
+
+
+# Below this many products the catalogue is still (close to) the seed data
+REAL_CATALOG_ROWS = 100
+
+
+def _m013_planner_stats(c):
+    # Migration 2's ANALYZE ran on whatever the file held then; on a fresh,
+    # seed-only file that says every table has one row and steers the planner
+    # away from the indexes. Drop such stats (pooled connections run PRAGMA
+    # optimize on close once there is real data) and re-gather stale ones.
+    if not c.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+        return
+    products = c.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM products LIMIT {REAL_CATALOG_ROWS})").fetchone()[0]
+    if products < REAL_CATALOG_ROWS:
+        c.execute("DELETE FROM sqlite_stat1")
+        c.execute("ANALYZE sqlite_schema")  # reload, so this connection forgets them too
+    else:
+        c.execute("PRAGMA analysis_limit = 1000")  # sampled: seconds, not minutes, on a large catalogue
+        c.execute("ANALYZE")
+
+
+def _m014_items_grid_sort_indexes(c):
+    # The items grid's other sort keys, so its OFFSET jumps and keyset pages walk
+    # an index instead of sorting the catalogue. Expressions match catalog_grid.SORTS.
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_barcode_sort ON products (COALESCE(barcode, ''), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_company_sort ON products (COALESCE(company, ''), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_cost_sort ON products (COALESCE(cost_price, 0), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_sale_sort ON products (COALESCE(selling_price, 0), id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_products_stock_sort ON products (COALESCE(stock, 0), id)")
+
+
+# ========================
+#    RUNNER
+# ========================
+# Append new migrations to the end; never renumber or edit a shipped one.
+MIGRATIONS = [
+    (1, "base schema", _m001_base_schema),
+    (2, "secondary indexes", _m002_secondary_indexes),
+    (3, "supplier prices, price history, supplier reps", _m003_supplier_tables),
+    (4, "FTS5 product search", _m004_product_search),
+    (5, "document number sequences", _m005_document_sequences),
+    (6, "daily product sales rollup", _m006_daily_product_sales),
+    (7, "products name index", _m007_product_name_index),
+    (8, "import jobs", _m008_import_jobs),
+    (9, "items grid indexes", _m009_items_grid_indexes),
+    (10, "product attributes projection", _m010_product_attributes),
+    (11, "category closure table", _m011_category_closure),
+    (12, "category delete re-parents children", _m012_category_delete_reparents),
+    (13, "planner statistics", _m013_planner_stats),
+    (14, "items grid sort indexes", _m014_items_grid_sort_indexes),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations; returns the list of versions applied."""
+    current = schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if version <= current:
+            continue
+        c = conn.cursor()
+        try:
+            c.execute("BEGIN IMMEDIATE")
+            func(c)
+            c.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
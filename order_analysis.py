@@ -0,0 +1,206 @@
+# order_analysis.py
+"""Smart Order analysis off the Tk thread, streamed back in chunks.
+
+start() reads the sales history for the window once (rollup totals, or the
+demand matrix for the forecast methods) on a coordinator thread and hands
+each supplier, with only its products' slice of the history, to a process
+pool: supplier_suggestions() reads the supplier's candidates and computes
+its suggestions in a separate process, so suppliers run in parallel across
+cores. Rows reach
+the Tk thread through root.after() in chunks of `chunk_size`, with progress
+after every supplier. cancel() or a new start() skips the suppliers not yet
+started and drops anything still queued for the old run.
+
+Both executors live as long as the OrderAnalysis, so the worker processes
+are spawned once (each keeping its pooled connection) rather than per run.
+With workers=1 the suppliers run one by one on the coordinator thread.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+import database
+from reorder_engine import product_sales, reorder_candidates, suggestions
+from forecasting import METHODS, demand_products, demand_matrix, forecast_items
+
+
+def analysis_suppliers(supplier_id=None):
+    """Suppliers with active prices, i.e. the units of work handed to the pool."""
+    if supplier_id:
+        return [supplier_id]
+    rows = database.fetch_all(
+        "SELECT DISTINCT supplier_id FROM supplier_prices WHERE is_active = 1 ORDER BY supplier_id")
+    return [row[0] for row in rows]
+
+
+def supplier_products(supplier_id=None):
+    """{supplier_id: ids of its actively priced products}."""
+    query = "SELECT supplier_id, product_id FROM supplier_prices WHERE is_active = 1"
+    params = []
+    if supplier_id:
+        query += " AND supplier_id = ?"
+        params.append(supplier_id)
+    products = {}
+    for sup_id, product_id in database.fetch_all(query, params):
+        products.setdefault(sup_id, []).append(product_id)
+    return products
+
+
+def supplier_suggestions(db_file, supplier_id, history, start_date, days_needed, method):
+    """One supplier's order items; runs in a pool process.
+
+    history is the product_sales() totals of the supplier's products
+    ("simple"), or (product_ids, demand matrix rows) covering them.
+    """
+    if os.path.abspath(database.DB_FILE) != db_file:
+        database.DB_FILE = db_file  # a fresh worker process starts on the default database
+    candidates = reorder_candidates(supplier_id)
+    if method == "simple":
+        return suggestions(candidates, history, days_needed)
+    product_ids, matrix = history
+    return forecast_items(candidates, product_ids, matrix, start_date, days_needed, method)
+
+
+class OrderAnalysis:
+    def __init__(self, root, on_rows, on_progress=None, on_done=None, workers=None,
+                 chunk_size=200, poll_ms=30):
+        self.root = root
+        self.on_rows = on_rows            # (items) for each chunk
+        self.on_progress = on_progress    # (suppliers_done, suppliers_total)
+        self.on_done = on_done            # (stats dict, error or None)
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.poll_ms = poll_ms
+
+        self._generation = 0
+        self._cancelled = threading.Event()
+        self._results = queue.Queue()
+        self._poll_timer = None
+        self._running = False
+        self._coordinator = None
+        self._pool = None
+
+    # ---------- Tk thread ----------
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, start_date, end_date, days_needed, method="simple", supplier_id=None):
+        """Begin a new analysis; a run still in progress is cancelled first."""
+        self.cancel()
+        if self._coordinator is None:
+            if self.workers > 1:
+                # spawn, not fork: this is a Tk app with live threads and connections
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            self._coordinator = ThreadPoolExecutor(1, thread_name_prefix="order-analysis-run")
+        self._generation += 1
+        self._cancelled = threading.Event()
+        self._running = True
+        self._coordinator.submit(self._run, self._generation, self._cancelled,
+                                 start_date, end_date, days_needed, method, supplier_id)
+        self._schedule_poll()
+
+    def cancel(self):
+        """Stop the current run; rows already shown stay, nothing more arrives."""
+        self._cancelled.set()
+        if self._running:
+            self._running = False
+            self._generation += 1
+
+    def shutdown(self):
+        self.cancel()
+        if self._poll_timer is not None:
+            self.root.after_cancel(self._poll_timer)
+            self._poll_timer = None
+        for executor in (self._coordinator, self._pool):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._coordinator = self._pool = None
+
+    def _schedule_poll(self):
+        if self._poll_timer is None:
+            self._poll_timer = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_timer = None
+        # One chunk of rows per tick keeps the window responsive while rows pour in
+        while True:
+            try:
+                generation, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self._generation:
+                continue
+            if kind == "rows":
+                self.on_rows(payload)
+                break
+            if kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*payload)
+            else:
+                self._running = False
+                if self.on_done:
+                    self.on_done(*payload)
+                return
+        if self._running or not self._results.empty():
+            self._schedule_poll()
+
+    # ---------- worker threads ----------
+    def _run(self, generation, cancelled, start_date, end_date, days_needed, method, supplier_id):
+        started = time.perf_counter()
+        stats = {"suppliers": 0, "rows": 0}
+        try:
+            suppliers = analysis_suppliers(supplier_id)
+            if method not in METHODS:
+                raise ValueError(f"Unknown forecast method: {method}")
+            db_file = os.path.abspath(database.DB_FILE)
+            products = supplier_products(supplier_id)
+            if method == "simple":
+                sales = product_sales(start_date, end_date, supplier_id)
+
+                def history(sup_id):
+                    return {pid: sales[pid] for pid in products.get(sup_id, ()) if pid in sales}
+            else:
+                product_ids = demand_products(supplier_id)
+                matrix = demand_matrix(start_date, end_date, product_ids, supplier_id)
+
+                def history(sup_id):
+                    # Only the supplier's rows are pickled to the worker process
+                    rows = np.isin(product_ids, products.get(sup_id, []))
+                    return product_ids[rows], matrix[rows]
+            stats["load_s"] = time.perf_counter() - started
+            self._results.put((generation, "progress", (0, len(suppliers))))
+
+            def deliver(items):
+                for i in range(0, len(items), self.chunk_size):
+                    self._results.put((generation, "rows", items[i:i + self.chunk_size]))
+                stats["suppliers"] += 1
+                stats["rows"] += len(items)
+                self._results.put((generation, "progress", (stats["suppliers"], len(suppliers))))
+
+            futures = []
+            for sup_id in suppliers:
+                if cancelled.is_set():
+                    break
+                args = (db_file, sup_id, history(sup_id), start_date, days_needed, method)
+                if self._pool is None:
+                    deliver(supplier_suggestions(*args))
+                else:
+                    futures.append(self._pool.submit(supplier_suggestions, *args))
+            for future in as_completed(futures):
+                if cancelled.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+                deliver(future.result())
+            stats["cancelled"] = cancelled.is_set()
+            stats["total_s"] = time.perf_counter() - started
+            self._results.put((generation, "done", (stats, None)))
+        except Exception as e:
+            stats["total_s"] = time.perf_counter() - started
+            self._results.put((generation, "done", (stats, e)))
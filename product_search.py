@@ -0,0 +1,260 @@
+# product_search.py
+"""Product search for the POS dropdown.
+
+FTS5Search runs ranked prefix queries against the product_search FTS5 table
+(created and kept in sync by migration 4). Builds of SQLite without FTS5 get
+TrigramSearch, an in-process trigram index over the same fields. Both return
+rows shaped (id, name, price, barcode).
+"""
+import os
+import re
+import threading
+import database
+from catalog_index import catalog_index
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _tokens(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def _is_barcode(query):
+    return query.isdigit() and len(query) >= 4
+
+
+def barcode_prefix_search(prefix, limit=5):
+    """Digit-only queries are barcode prefixes: a range scan on the barcode indexes."""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    with database.connection_manager.connection() as conn:
+        return conn.execute("""
+            SELECT id, name, selling_price, barcode FROM products WHERE id IN (
+                SELECT id FROM (SELECT id FROM products WHERE barcode >= ?1 AND barcode < ?2 LIMIT ?3)
+                UNION
+                SELECT product_id FROM (SELECT product_id FROM product_variants
+                                        WHERE barcode >= ?1 AND barcode < ?2 LIMIT ?3))
+            ORDER BY barcode >= ?1 AND barcode < ?2 DESC, barcode
+            LIMIT ?3
+        """, (prefix, upper, limit)).fetchall()
+
+
+class FTS5Search:
+    name = "fts5"
+    # bm25 weights for name, company, barcode, variants
+    WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+    # Scoring every hit of a one- or two-letter prefix costs more than it is
+    # worth; above this many matches return name hits in rowid order instead.
+    RANK_LIMIT = 1000
+
+    @staticmethod
+    def available(conn):
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'").fetchone() is not None
+
+    @staticmethod
+    def match_expression(query):
+        """Every token must match as a prefix: 'coca 1.5' -> '"coca"* "1"* "5"*'."""
+        return " ".join(f'"{token}"*' for token in _tokens(query))
+
+    def search(self, query, limit=5):
+        query = (query or "").strip()
+        if _is_barcode(query):
+            return barcode_prefix_search(query, limit)
+        expr = self.match_expression(query)
+        if not expr:
+            return []
+        with database.connection_manager.connection() as conn:
+            hits = conn.execute("""
+                SELECT COUNT(*) FROM (SELECT 1 FROM product_search WHERE product_search MATCH ? LIMIT ?)
+            """, (expr, self.RANK_LIMIT + 1)).fetchone()[0]
+            if hits > self.RANK_LIMIT:
+                rows = conn.execute("""
+                    SELECT p.id, p.name, p.selling_price, p.barcode
+                    FROM (SELECT rowid AS id FROM product_search WHERE product_search MATCH ? LIMIT ?) AS hits
+                    JOIN products p ON p.id = hits.id
+                """, ("name : (" + expr + ")", limit)).fetchall()
+                if rows:
+                    return rows
+            # Rank and limit inside FTS5, then join only the winners to products
+            weights = ", ".join(str(w) for w in self.WEIGHTS)
+            return conn.execute(f"""
+                SELECT p.id, p.name, p.selling_price, p.barcode
+                FROM (SELECT rowid AS id, rank FROM product_search
+                      WHERE product_search MATCH ? AND rank MATCH 'bm25({weights})'
+                      ORDER BY rank LIMIT ?) AS hits
+                JOIN products p ON p.id = hits.id
+                ORDER BY hits.rank, p.name
+            """, (expr, limit)).fetchall()
+
+    def refresh(self, product_ids):
+        pass  # triggers keep the FTS table current
+
+
+class TrigramSearch:
+    """In-memory fallback: trigram postings over each product's search text.
+
+    Query tokens of three or more characters match anywhere in a word; shorter
+    tokens match word prefixes (via the padded leading trigram).
+    """
+    name = "trigram"
+
+    def __init__(self):
+        self._docs = {}      # product id -> (name, price, barcode, words)
+        self._postings = {}  # trigram -> set of product ids
+        self._lock = threading.RLock()
+        self._db_path = None
+
+    @staticmethod
+    def _grams(word):
+        padded = f" {word}"
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    @staticmethod
+    def _query_grams(token):
+        if len(token) >= 3:
+            return {token[i:i + 3] for i in range(len(token) - 2)}
+        return {f" {token}"} if len(token) == 2 else set()
+
+    def _fetch(self, conn, ids=None):
+        where, params = "", ()
+        if ids is not None:
+            where, params = f"IN ({','.join('?' * len(ids))})", tuple(ids)
+        docs = {}
+        for pid, name, company, barcode, price in conn.execute(
+                f"SELECT id, name, company, barcode, selling_price FROM products "
+                f"{'WHERE id ' + where if where else ''}", params):
+            docs[pid] = [name, price, barcode, _tokens(name) + _tokens(company) + _tokens(barcode)]
+        for pid, value, barcode in conn.execute(
+                f"SELECT product_id, variant_value, barcode FROM product_variants "
+                f"{'WHERE product_id ' + where if where else ''}", params):
+            if pid in docs:
+                docs[pid][3].extend(_tokens(value) + _tokens(barcode))
+        return {pid: (name, price, barcode, tuple(set(words))) for pid, (name, price, barcode, words) in docs.items()}
+
+    def _index(self, pid, doc):
+        for word in doc[3]:
+            for gram in self._grams(word):
+                self._postings.setdefault(gram, set()).add(pid)
+
+    def _unindex(self, pid, doc):
+        for word in doc[3]:
+            for gram in self._grams(word):
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(pid)
+                    if not ids:
+                        del self._postings[gram]
+
+    def load(self):
+        with database.connection_manager.connection() as conn:
+            docs = self._fetch(conn)
+        with self._lock:
+            self._docs = {}
+            self._postings = {}
+            for pid, doc in docs.items():
+                self._docs[pid] = doc
+                self._index(pid, doc)
+            self._db_path = os.path.abspath(database.DB_FILE)
+
+    def ensure_loaded(self):
+        if self._db_path != os.path.abspath(database.DB_FILE):
+            self.load()
+
+    def refresh(self, product_ids):
+        if self._db_path is None:
+            return
+        ids = sorted({int(pid) for pid in product_ids if pid is not None})
+        fresh = {}
+        with database.connection_manager.connection() as conn:
+            for start in range(0, len(ids), 500):
+                fresh.update(self._fetch(conn, ids[start:start + 500]))
+        with self._lock:
+            for pid in ids:
+                old = self._docs.pop(pid, None)
+                if old is not None:
+                    self._unindex(pid, old)
+                if pid in fresh:
+                    self._docs[pid] = fresh[pid]
+                    self._index(pid, fresh[pid])
+
+    def search(self, query, limit=5):
+        query = (query or "").strip()
+        if _is_barcode(query):
+            return barcode_prefix_search(query, limit)
+        self.ensure_loaded()
+        tokens = [t for t in _tokens(query) if len(t) >= 2]
+        if not tokens:
+            return []
+        with self._lock:
+            candidates = None
+            for token in tokens:
+                grams = self._query_grams(token)
+                for gram in sorted(grams, key=lambda g: len(self._postings.get(g, ()))):
+                    ids = self._postings.get(gram, set())
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        return []
+            if len(candidates) > FTS5Search.RANK_LIMIT:
+                # Broad prefix: first name hits in id order, like the FTS5 path
+                rows = []
+                for pid in sorted(candidates):
+                    name = self._docs[pid][0]
+                    words = _tokens(name)
+                    if all(any(w.startswith(t) for w in words) for t in tokens):
+                        rows.append((pid,) + self._docs[pid][:3])
+                        if len(rows) == limit:
+                            return rows
+                if rows:
+                    return rows
+            scored = []
+            for pid in candidates:
+                name, price, barcode, words = self._docs[pid]
+                score = 0
+                for token in tokens:
+                    if any(w.startswith(token) for w in words):
+                        score += 2
+                    elif any(token in w for w in words):
+                        score += 1
+                    else:
+                        break  # grams matched across different words
+                else:
+                    name_hit = any(w.startswith(tokens[0]) for w in _tokens(name))
+                    scored.append((-score, not name_hit, name or "", pid))
+            scored.sort()
+            return [(pid, self._docs[pid][0], self._docs[pid][1], self._docs[pid][2])
+                    for _, _, _, pid in scored[:limit]]
+
+
+_backend = None
+_backend_db = None
+
+
+def set_search_backend(backend):
+    """Install a search backend (anything with search(query, limit) and refresh(ids))."""
+    global _backend, _backend_db
+    _backend = backend
+    _backend_db = os.path.abspath(database.DB_FILE) if backend is not None else None
+
+
+def get_search_backend():
+    global _backend, _backend_db
+    path = os.path.abspath(database.DB_FILE)
+    if _backend is None or _backend_db != path:
+        with database.connection_manager.connection() as conn:
+            fts = FTS5Search.available(conn)
+        _backend = FTS5Search() if fts else TrigramSearch()
+        _backend_db = path
+    return _backend
+
+
+def search_products(query, limit=5):
+    return get_search_backend().search(query, limit)
+
+
+def refresh_products(product_ids):
+    if _backend is not None:
+        _backend.refresh(product_ids)
+
+
+# Writers already report edited products to the catalog index; reuse that hook
+catalog_index.add_listener(refresh_products)
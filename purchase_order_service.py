@@ -0,0 +1,88 @@
+# purchase_order_service.py
+"""Creates purchase orders and their lines in one transaction.
+
+Lines are grouped by supplier into one draft PO each. PO numbers are
+reserved from the sequence service first, then every header goes in with
+one executemany, their ids come back in one SELECT on the unique po_number,
+and all lines go in with a second executemany, inside a single BEGIN
+IMMEDIATE transaction. Either every PO of the run is written or none is;
+numbers reserved for a run that fails are skipped, never reused.
+"""
+import database
+from sequences import next_number
+
+
+def order_total(lines):
+    return sum(line['qty'] * line['cost_price'] for line in lines)
+
+
+def group_by_supplier(lines):
+    """{supplier_id: [line, ...]} in first-seen supplier order; zero quantities dropped."""
+    groups = {}
+    for line in lines:
+        if line['qty'] > 0:
+            groups.setdefault(line['supplier_id'], []).append(line)
+    return groups
+
+
+def write_purchase_orders(c, orders, created_by, status="draft"):
+    """Insert orders ({po_number, supplier_id, lines}) inside the caller's transaction.
+
+    Returns {po_number: po_id}.
+    """
+    c.executemany("""
+        INSERT INTO purchase_orders (po_number, supplier_id, total_amount, created_by, status)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(order['po_number'], order['supplier_id'], order_total(order['lines']), created_by, status)
+          for order in orders])
+
+    po_ids = {}
+    numbers = [order['po_number'] for order in orders]
+    for start in range(0, len(numbers), 500):
+        chunk = numbers[start:start + 500]
+        po_ids.update(c.execute(
+            f"SELECT po_number, id FROM purchase_orders WHERE po_number IN ({','.join('?' * len(chunk))})", chunk))
+
+    c.executemany("""
+        INSERT INTO po_items (po_id, product_id, quantity_ordered, cost_price)
+        VALUES (?, ?, ?, ?)
+    """, [(po_ids[order['po_number']], line['product_id'], line['qty'], line['cost_price'])
+          for order in orders for line in order['lines']])
+    return po_ids
+
+
+def save_purchase_orders(orders, created_by, status="draft"):
+    """Write orders in one BEGIN IMMEDIATE transaction; returns {po_number: po_id}."""
+    with database.connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            po_ids = write_purchase_orders(c, orders, created_by, status)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return po_ids
+
+
+def create_purchase_orders(lines, created_by, status="draft"):
+    """One PO per supplier for `lines` (supplier_id, product_id, qty, cost_price).
+
+    Returns a summary: {'orders': [{po_id, po_number, supplier_id, lines,
+    total_amount}], 'po_count', 'line_count', 'total_amount'}.
+    """
+    groups = group_by_supplier(lines)
+    # Reserved before BEGIN: the sequence service commits on this thread's connection
+    orders = [{'po_number': next_number("PO"), 'supplier_id': sup_id, 'lines': sup_lines}
+              for sup_id, sup_lines in groups.items()]
+    po_ids = save_purchase_orders(orders, created_by, status)
+
+    summary = {'orders': [], 'po_count': len(orders), 'line_count': 0, 'total_amount': 0.0}
+    for order in orders:
+        total = order_total(order['lines'])
+        summary['orders'].append({'po_id': po_ids[order['po_number']], 'po_number': order['po_number'],
+                                  'supplier_id': order['supplier_id'], 'lines': len(order['lines']),
+                                  'total_amount': total})
+        summary['line_count'] += len(order['lines'])
+        summary['total_amount'] += total
+    return summary
@@ -0,0 +1,68 @@
+# reorder_engine.py
+"""Smart Order suggestions computed set-based.
+
+Sales for the whole analysis window are read per product from the
+daily_product_sales rollup (quantity sold and days with sales) in a single
+grouped query and joined to the active supplier-price rows in memory,
+instead of one aggregate query per product over raw sale lines.
+"""
+import database
+from sales_rollup import product_totals
+
+
+def product_sales(start_date, end_date, supplier_id=None):
+    """{product_id: (total_qty, sale_days)} for completed, non-return sales in the window."""
+    return product_totals(start_date, end_date, supplier_id)
+
+
+def reorder_candidates(supplier_id=None):
+    query = """
+        SELECT p.id, p.name, p.stock, p.category_id,
+               sp.supplier_id, s.name as supplier_name, sp.cost_price,
+               s.lead_time_days
+        FROM products p
+        JOIN supplier_prices sp ON p.id = sp.product_id
+        JOIN suppliers s ON sp.supplier_id = s.id
+        WHERE sp.is_active = 1
+    """
+    params = []
+    if supplier_id:
+        query += " AND s.id = ?"
+        params.append(supplier_id)
+    return database.fetch_all(query, params)
+
+
+def suggest_orders(start_date, end_date, days_needed, supplier_id=None):
+    """Items to order: stock short of `days_needed` days of average daily sales."""
+    sales = product_sales(start_date, end_date, supplier_id)
+    return suggestions(reorder_candidates(supplier_id), sales, days_needed)
+
+
+def suggestions(candidates, sales, days_needed):
+    """suggest_orders() for given candidate rows and product_sales() totals."""
+    items = []
+    for prod in candidates:
+        product_id, name, current_stock, category_id, sup_id, sup_name, cost_price, lead_time = prod
+
+        total_sales, sale_days = sales.get(product_id, (0, 0))
+        total_sales = total_sales or 0
+        sale_days = sale_days or 1
+        daily_consumption = total_sales / sale_days
+
+        suggested_qty = (daily_consumption * days_needed) - current_stock
+        suggested_qty = max(0, round(suggested_qty, 2))
+
+        if suggested_qty > 0:
+            items.append({
+                'product_id': product_id,
+                'name': name,
+                'current_stock': current_stock,
+                'daily_consumption': daily_consumption,
+                'days_needed': days_needed,
+                'suggested_qty': suggested_qty,
+                'supplier_id': sup_id,
+                'supplier_name': sup_name,
+                'cost_price': cost_price or 0.0,
+                'lead_time_days': lead_time
+            })
+    return items
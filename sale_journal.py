@@ -0,0 +1,333 @@
+# sale_journal.py
+"""Append-only local journal for POS sales.
+
+A completed sale is appended (and fsync'd) to a journal on the till's own
+disk (config.LOCAL_DATA_DIR, one journal per database and TERMINAL_ID, as
+several tills may share store.db) before the register moves on; a
+background writer replays the journal into SQLite in batches. Replay is idempotent on invoice_no, so a crash between a batch
+commit and the checkpoint only means that batch is skipped next time.
+
+Each record is one line: 8 hex digits of CRC32, a space, compact JSON. A
+torn or corrupt tail (power loss mid-write) fails the CRC; it is moved to
+<journal>.corrupt when the journal is next opened, or by the recovery tool.
+A locked or busy database is retried; a sale the database rejects (say a
+CHECK constraint) is moved to <journal>.quarantine in the same record
+format and replay carries on past it:
+
+    python sale_journal.py [--db store.db] [--replay] [--repair]
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import config
+import database
+from catalog_index import catalog_index
+from sales_service import make_sale, save_sales, stock_deltas
+
+# New fields go at the end so older records still decode
+_HEADER = ("invoice_no", "customer_name", "cashier_id", "discount", "payment_method", "is_held", "created_at")
+_LINE = ("id", "variant_id", "qty", "price", "total")
+
+
+def encode(sale):
+    payload = json.dumps([[sale.get(k) for k in _HEADER], [[item[k] for k in _LINE] for item in sale['lines']]],
+                         separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode(record):
+    """Decode one journal line; None if it is torn or corrupt."""
+    if len(record) < 10 or not record.endswith(b"\n") or record[8:9] != b" ":
+        return None
+    payload = record[9:-1]
+    try:
+        if int(record[:8], 16) != zlib.crc32(payload):
+            return None
+        header, lines = json.loads(payload)
+    except ValueError:
+        return None
+    sale = dict(zip(_HEADER, header))
+    sale['lines'] = [dict(zip(_LINE, line)) for line in lines]
+    return sale
+
+
+def read_records(path, offset=0):
+    """Yield (end_offset, sale) from `offset`, stopping at the first bad record."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for record in f:
+            sale = decode(record)
+            if sale is None:
+                return
+            offset += len(record)
+            yield offset, sale
+
+
+class SaleJournal:
+    def __init__(self, path=None, batch_size=500, retry_delay=2.0):
+        self._path = path
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._file = None
+        self._file_path = None
+        self._append_lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counts = {"appended": 0, "replayed": 0, "skipped": 0, "batches": 0, "failures": 0, "quarantined": 0}
+        self._unreported = []
+        self.last_error = None
+
+    @property
+    def path(self):
+        if self._path:
+            return self._path
+        name = f"{os.path.basename(database.DB_FILE)}.{config.TERMINAL_ID}.journal"
+        return os.path.join(config.LOCAL_DATA_DIR, name)
+
+    @property
+    def checkpoint_path(self):
+        return self.path + ".offset"
+
+    @property
+    def quarantine_path(self):
+        return self.path + ".quarantine"
+
+    # ---------- register side ----------
+    def append(self, sale):
+        """Durably append one sale record; returns once it is on disk."""
+        data = encode(sale)
+        with self._append_lock:
+            path = self.path
+            if self._file is None or self._file_path != path:
+                if self._file is not None:
+                    self._file.close()
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                # A write torn by a crash would hide every record appended after it
+                self.repair()
+                self._file = open(path, "ab")
+                self._file_path = path
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._counts["appended"] += 1
+        self._wake.set()
+
+    def record_sale(self, invoice_no, customer_name, lines, cashier_id, discount=0.0,
+                    payment_method="cash", is_held=False):
+        """Journal a sale for background replay (same arguments as save_sale)."""
+        sale = make_sale(invoice_no, customer_name, lines, cashier_id, discount, payment_method, is_held)
+        self.append(sale)
+        if not is_held:
+            catalog_index.adjust_stock(stock_deltas(sale['lines']))
+        return sale
+
+    def repair(self):
+        """Move a torn/corrupt tail to <journal>.corrupt; returns the bytes moved."""
+        path = self.path
+        if not os.path.exists(path):
+            return 0
+        good_end = min(self.checkpoint(), os.path.getsize(path))
+        for good_end, _ in read_records(path, good_end):
+            pass
+        size = os.path.getsize(path)
+        if size <= good_end:
+            return 0
+        with open(path, "rb") as f:
+            f.seek(good_end)
+            tail = f.read()
+        with open(path + ".corrupt", "ab") as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+            os.fsync(f.fileno())
+        return size - good_end
+
+    # ---------- checkpoint ----------
+    def checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_checkpoint(self, offset):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def pending(self):
+        """Records written but not yet replayed."""
+        return sum(1 for _ in read_records(self.path, self.checkpoint()))
+
+    # ---------- replay ----------
+    def replay(self):
+        """Replay everything after the checkpoint; returns (replayed, skipped)."""
+        replayed = skipped = 0
+        with self._replay_lock:
+            path = self.path
+            offset = self.checkpoint()
+            if os.path.exists(path) and offset > os.path.getsize(path):
+                offset = 0  # journal was rotated under an old checkpoint
+            batch, end = [], offset
+            for end, sale in read_records(path, offset):
+                batch.append((end, sale))
+                if len(batch) >= self.batch_size:
+                    written, existing = self._replay_batch(batch)
+                    replayed += written
+                    skipped += existing
+                    batch = []
+            if batch:
+                written, existing = self._replay_batch(batch)
+                replayed += written
+                skipped += existing
+            self._compact(end)
+        return replayed, skipped
+
+    def _replay_batch(self, batch):
+        """Write (end_offset, sale) records and checkpoint past them; returns (written, already there)."""
+        try:
+            sale_ids, _ = save_sales([sale for _, sale in batch], skip_existing=True)
+        except sqlite3.OperationalError:
+            raise  # locked or busy: the whole batch is retried later
+        except sqlite3.Error as e:
+            if len(batch) > 1:
+                # Replay one by one so only the sales the database rejects are set aside
+                results = [self._replay_batch([record]) for record in batch]
+                return sum(r[0] for r in results), sum(r[1] for r in results)
+            self._quarantine(batch[0][1], e)
+            self._save_checkpoint(batch[0][0])
+            return 0, 0
+        self._save_checkpoint(batch[-1][0])
+        self._counts["batches"] += 1
+        self._counts["replayed"] += len(sale_ids)
+        self._counts["skipped"] += len(batch) - len(sale_ids)
+        return len(sale_ids), len(batch) - len(sale_ids)
+
+    def _quarantine(self, sale, error):
+        with open(self.quarantine_path, "ab") as f:
+            f.write(encode(sale))
+            f.flush()
+            os.fsync(f.fileno())
+        self._counts["quarantined"] += 1
+        with self._append_lock:
+            self._unreported.append((sale['invoice_no'], str(error)))
+
+    def take_quarantined(self):
+        """(invoice_no, error) for sales quarantined since the last call, for the register to show."""
+        with self._append_lock:
+            reported, self._unreported = self._unreported, []
+        return reported
+
+    def _compact(self, offset):
+        """Start a fresh journal once everything in it has been replayed."""
+        with self._append_lock:
+            path = self.path
+            if offset and os.path.exists(path) and os.path.getsize(path) == offset:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                # Checkpoint first: a crash before the truncate only replays
+                # already-written sales again (skipped on invoice_no), while a
+                # stale checkpoint over a truncated journal would lose sales
+                self._save_checkpoint(0)
+                with open(path, "r+b") as f:
+                    f.truncate(0)
+                    os.fsync(f.fileno())
+
+    # ---------- background writer ----------
+    def start(self):
+        """Start the background writer (replays any backlog left by a crash)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._wake.set()
+        self._thread = threading.Thread(target=self._run, name="sale-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.retry_delay)
+            self._wake.clear()
+            try:
+                self.replay()
+                self.last_error = None
+            except (sqlite3.OperationalError, OSError) as e:
+                # DB locked or disk stalled: sales stay in the journal, try again later
+                self._counts["failures"] += 1
+                self.last_error = str(e)
+                self._stop.wait(self.retry_delay)
+
+    def stats(self):
+        stats = dict(self._counts)
+        stats["last_error"] = self.last_error
+        return stats
+
+
+sale_journal = SaleJournal()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Inspect, replay or repair the POS sale journal.")
+    parser.add_argument("--db", default=database.DB_FILE)
+    parser.add_argument("--journal", help="journal path (default: this terminal's journal under config.LOCAL_DATA_DIR)")
+    parser.add_argument("--replay", action="store_true", help="replay pending sales into the database now")
+    parser.add_argument("--repair", action="store_true",
+                        help="move a torn/corrupt tail to <journal>.corrupt so replay can continue")
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    journal = SaleJournal(args.journal)
+    path = journal.path
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+    checkpoint = journal.checkpoint()
+
+    total = good_end = 0
+    for good_end, _ in read_records(path):
+        total += 1
+    pending = sum(1 for _ in read_records(path, min(checkpoint, good_end)))
+    print(f"Journal:     {path}")
+    print(f"Records:     {total:,} ({good_end:,} bytes)")
+    print(f"Checkpoint:  byte {checkpoint:,}")
+    print(f"Pending:     {pending:,}")
+    if size > good_end:
+        print(f"Bad tail:    {size - good_end:,} bytes after byte {good_end:,}")
+    quarantined = sum(1 for _ in read_records(journal.quarantine_path))
+    if quarantined:
+        print(f"Quarantined: {quarantined:,} in {journal.quarantine_path}")
+
+    if args.repair and size > good_end:
+        print(f"Moved {journal.repair():,} bytes to {path}.corrupt")
+
+    if args.replay:
+        database.init_db()
+        started = time.perf_counter()
+        replayed, skipped = journal.replay()
+        elapsed = time.perf_counter() - started
+        print(f"Replayed {replayed:,} sales ({skipped:,} already in the database) in {elapsed:.2f}s")
+        for invoice_no, error in journal.take_quarantined():
+            print(f"Quarantined {invoice_no}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# sales_rollup.py
+"""daily_product_sales: per (date, product) qty, revenue, return qty and transactions.
+
+sales_service.write_sales() folds every committed sale into the rollup in
+the same transaction, so analytics read days x products rows instead of
+raw sale lines. rebuild() recomputes it from sales/sale_items, for the
+whole history or a date range:
+
+    python sales_rollup.py [--db store.db] [--from 2024-01-01] [--to 2024-12-31]
+"""
+from datetime import timedelta
+
+import database
+from category_tree import SUBTREE_FILTER
+from migrations import DAILY_ROLLUP_SQL
+
+
+def sale_deltas(sales):
+    """{(sale_date, product_id): [qty, revenue, return_qty, txn_count]} for sale records."""
+    deltas = {}
+    for sale in sales:
+        if sale['is_held']:
+            continue
+        sale_date = sale['created_at'][:10]
+        seen = set()
+        for item in sale['lines']:
+            row = deltas.setdefault((sale_date, item['id']), [0.0, 0.0, 0.0, 0])
+            row[0] += item['qty']
+            row[1] += item['total']
+            if item['qty'] < 0:
+                row[2] -= item['qty']
+            if item['id'] not in seen:
+                seen.add(item['id'])
+                row[3] += 1
+    return deltas
+
+
+def apply_deltas(c, deltas):
+    c.executemany("""
+        INSERT INTO daily_product_sales (sale_date, product_id, qty, revenue, return_qty, txn_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (sale_date, product_id) DO UPDATE SET
+            qty = qty + excluded.qty,
+            revenue = revenue + excluded.revenue,
+            return_qty = return_qty + excluded.return_qty,
+            txn_count = txn_count + excluded.txn_count
+    """, [(day, pid, *values) for (day, pid), values in sorted(deltas.items())])
+
+
+def rebuild(start_date=None, end_date=None):
+    """Recompute the rollup from raw sales (all dates, or start..end inclusive)."""
+    where, params = "", []
+    if start_date:
+        where += " AND s.created_at >= ?"
+        params.append(str(start_date))
+    if end_date:
+        where += " AND s.created_at < ?"
+        params.append(str(end_date + timedelta(days=1)))
+    delete = "DELETE FROM daily_product_sales WHERE 1 = 1"
+    if start_date:
+        delete += " AND sale_date >= ?"
+    if end_date:
+        delete += " AND sale_date <= ?"
+    delete_params = [str(d) for d in (start_date, end_date) if d]
+
+    with database.connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            c.execute(delete, delete_params)
+            c.execute(DAILY_ROLLUP_SQL.format(where=where), params)
+            rows = c.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return rows
+
+
+def product_totals(start_date, end_date, supplier_id=None, category_id=None):
+    """{product_id: (net_qty, sale_days)} between two dates (inclusive).
+
+    category_id takes in the category's sub-categories too.
+    """
+    query = """
+        SELECT product_id, SUM(qty), SUM(txn_count > 0)
+        FROM daily_product_sales
+        WHERE sale_date BETWEEN ? AND ?
+    """
+    params = [str(start_date), str(end_date)]
+    if supplier_id:
+        query += " AND product_id IN (SELECT product_id FROM supplier_prices WHERE supplier_id = ? AND is_active = 1)"
+        params.append(supplier_id)
+    if category_id:
+        query += f" AND product_id IN (SELECT p.id FROM products p WHERE {SUBTREE_FILTER})"
+        params.append(category_id)
+    query += " GROUP BY product_id"
+    with database.connection_manager.connection() as conn:
+        return {pid: (qty, days) for pid, qty, days in conn.execute(query, params)}
+
+
+def main():
+    import argparse
+    import time
+    from datetime import date
+    parser = argparse.ArgumentParser(description="Rebuild the daily_product_sales rollup from raw sales.")
+    parser.add_argument("--db", default=database.DB_FILE)
+    parser.add_argument("--from", dest="start", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    database.DB_FILE = args.db
+    database.init_db()
+    started = time.perf_counter()
+    rows = rebuild(args.start, args.end)
+    print(f"Rebuilt {rows:,} rollup rows in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
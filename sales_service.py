@@ -0,0 +1,116 @@
+# sales_service.py
+"""Persists POS sales: header, lines and stock in one transaction.
+
+The cart is written with one INSERT for the header, one executemany for
+all lines and one executemany for the stock decrements (grouped by product,
+so a product scanned on several lines is updated once), plus the
+daily_product_sales rollup upsert, all inside a single BEGIN IMMEDIATE
+transaction. Nothing is written if any statement fails.
+"""
+from datetime import datetime, timezone
+
+import database
+from catalog_index import catalog_index
+from sales_rollup import sale_deltas, apply_deltas
+
+
+def line_total(item):
+    return item.get('total', item['qty'] * item['price'])
+
+
+def stock_deltas(lines):
+    """{product_id: -qty} aggregated over the cart (returns have negative qty)."""
+    deltas = {}
+    for item in lines:
+        deltas[item['id']] = deltas.get(item['id'], 0) - item['qty']
+    return deltas
+
+
+def utc_timestamp():
+    # Same format and clock as the CURRENT_TIMESTAMP column defaults
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_sale(invoice_no, customer_name, lines, cashier_id, discount=0.0,
+              payment_method="cash", is_held=False):
+    """The sale record written by write_sales() (and stored in the sale journal).
+
+    created_at is taken now, so a sale replayed from the journal later keeps
+    the time it was rung up.
+    """
+    lines = [{'id': item['id'], 'variant_id': item.get('variant_id'), 'qty': item['qty'],
+              'price': item['price'], 'total': line_total(item)} for item in lines]
+    return {'invoice_no': invoice_no, 'customer_name': customer_name, 'cashier_id': cashier_id,
+            'discount': discount, 'payment_method': payment_method, 'is_held': bool(is_held),
+            'lines': lines, 'created_at': utc_timestamp()}
+
+
+def write_sales(c, sales, skip_existing=False):
+    """Insert sale records inside the caller's transaction.
+
+    With skip_existing, invoices already in the database are left alone so a
+    batch can be written more than once. Returns (sale ids by invoice_no,
+    grouped stock deltas of the sales actually written).
+    """
+    if skip_existing and sales:
+        invoices = [sale['invoice_no'] for sale in sales]
+        existing = set()
+        for start in range(0, len(invoices), 500):
+            chunk = invoices[start:start + 500]
+            existing.update(row[0] for row in c.execute(
+                f"SELECT invoice_no FROM sales WHERE invoice_no IN ({','.join('?' * len(chunk))})", chunk))
+        sales = [sale for sale in sales if sale['invoice_no'] not in existing]
+
+    sale_ids, deltas, items = {}, {}, []
+    for sale in sales:
+        sale.setdefault('created_at', utc_timestamp())
+        subtotal = sum(item['total'] for item in sale['lines'])
+        c.execute("""
+            INSERT INTO sales (invoice_no, customer_name, total, discount, payment_method, is_held, cashier_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (sale['invoice_no'], sale['customer_name'], subtotal - sale['discount'], sale['discount'],
+              sale['payment_method'], 1 if sale['is_held'] else 0, sale['cashier_id'], sale['created_at']))
+        sale_id = sale_ids[sale['invoice_no']] = c.lastrowid
+        items.extend((sale_id, item['id'], item['variant_id'], item['qty'], item['price'], item['total'])
+                     for item in sale['lines'])
+        if not sale['is_held']:
+            for pid, delta in stock_deltas(sale['lines']).items():
+                deltas[pid] = deltas.get(pid, 0) + delta
+
+    c.executemany("""
+        INSERT INTO sale_items (sale_id, product_id, variant_id, quantity, unit_price, total_price)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, items)
+    # Product order keeps the UPDATEs walking the table in rowid order
+    c.executemany("UPDATE products SET stock = stock + ? WHERE id = ?",
+                  [(delta, pid) for pid, delta in sorted(deltas.items()) if delta])
+    apply_deltas(c, sale_deltas(sales))
+    return sale_ids, deltas
+
+
+def save_sales(sales, skip_existing=False):
+    """Write several sale records in one BEGIN IMMEDIATE transaction."""
+    with database.connection_manager.connection() as conn:
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            result = write_sales(c, sales, skip_existing)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return result
+
+
+def save_sale(invoice_no, customer_name, lines, cashier_id, discount=0.0,
+              payment_method="cash", is_held=False):
+    """Write a sale (or held invoice) and its lines; returns the new sale id.
+
+    `lines` are cart dicts with id, qty, price and optionally variant_id and
+    total. Held invoices record the lines but leave stock untouched.
+    """
+    sale = make_sale(invoice_no, customer_name, lines, cashier_id, discount, payment_method, is_held)
+    sale_ids, deltas = save_sales([sale])
+    if deltas:
+        catalog_index.adjust_stock(deltas)
+    return sale_ids[invoice_no]
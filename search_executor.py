@@ -0,0 +1,144 @@
+# search_executor.py
+"""Debounced, off-UI-thread search for Tk screens.
+
+submit() is called from the Tk thread on every keystroke. The query only
+runs once typing pauses for `delay_ms`, on a single worker thread, and the
+result is handed back to the Tk thread through root.after(). Every submit
+or cancel supersedes what came before it: a query still waiting for its
+debounce is dropped, and a result that arrives for an older query is
+discarded instead of repainting the dropdown.
+"""
+import queue
+import threading
+import time
+
+
+class SearchExecutor:
+    def __init__(self, root, search_fn, on_results, delay_ms=150, poll_ms=15, history=200):
+        self.root = root
+        self.search_fn = search_fn
+        self.on_results = on_results
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+
+        self._generation = 0
+        self._timer = None            # pending debounce root.after id
+        self._poll_timer = None
+        self._job = None              # (generation, query, submitted_at) waiting for the worker
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._results = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="search-executor", daemon=True)
+        self._worker.start()
+
+        self._history = history
+        self._latencies = []          # (query_ms, end_to_end_ms) of delivered queries
+        self._counts = {"submitted": 0, "executed": 0, "delivered": 0,
+                        "debounced": 0, "superseded": 0, "stale": 0, "errors": 0}
+
+    # ---------- Tk thread ----------
+    def submit(self, query):
+        """Schedule `query`; any earlier query that has not been shown yet is cancelled."""
+        self._counts["submitted"] += 1
+        self._generation += 1
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._counts["debounced"] += 1
+        generation = self._generation
+        submitted_at = time.perf_counter()
+        self._timer = self.root.after(self.delay_ms, lambda: self._dispatch(generation, query, submitted_at))
+
+    def cancel(self):
+        """Drop the pending and in-flight queries (e.g. the entry was cleared)."""
+        self._generation += 1
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+            self._counts["debounced"] += 1
+
+    def shutdown(self):
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._poll_timer is not None:
+            self.root.after_cancel(self._poll_timer)
+            self._poll_timer = None
+
+    def _dispatch(self, generation, query, submitted_at):
+        self._timer = None
+        if generation != self._generation:
+            return
+        with self._cond:
+            if self._job is not None:
+                self._counts["superseded"] += 1  # worker was busy; the older query never ran
+            else:
+                self._in_flight += 1
+            self._job = (generation, query, submitted_at)
+            self._cond.notify()
+        self._schedule_poll()
+
+    def _schedule_poll(self):
+        if self._poll_timer is None:
+            self._poll_timer = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_timer = None
+        while True:
+            try:
+                generation, query, rows, error, query_ms, submitted_at = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+            if error is not None:
+                self._counts["errors"] += 1
+                continue
+            if generation != self._generation:
+                self._counts["stale"] += 1
+                continue
+            end_to_end_ms = (time.perf_counter() - submitted_at) * 1000
+            self._counts["delivered"] += 1
+            self._latencies.append((query_ms, end_to_end_ms))
+            del self._latencies[:-self._history]
+            self.on_results(query, rows)
+        if self._in_flight > 0:
+            self._schedule_poll()
+
+    # ---------- worker thread ----------
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._job is None and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                generation, query, submitted_at = self._job
+                self._job = None
+            if generation != self._generation:
+                # Superseded while queued; report it so the poller can count it
+                self._results.put((generation, query, None, None, 0.0, submitted_at))
+                continue
+            started = time.perf_counter()
+            rows, error = None, None
+            try:
+                rows = self.search_fn(query)
+            except Exception as e:
+                error = e
+            self._counts["executed"] += 1
+            self._results.put((generation, query, rows, error,
+                               (time.perf_counter() - started) * 1000, submitted_at))
+
+    # ---------- tuning ----------
+    def stats(self):
+        """Counters plus latency of delivered queries (ms) for tuning delay_ms."""
+        stats = dict(self._counts)
+        stats["cancelled"] = stats["debounced"] + stats["superseded"] + stats["stale"]
+        if self._latencies:
+            query_ms = sorted(q for q, _ in self._latencies)
+            total_ms = sorted(t for _, t in self._latencies)
+            stats["last_query_ms"] = self._latencies[-1][0]
+            stats["avg_query_ms"] = sum(query_ms) / len(query_ms)
+            stats["p95_query_ms"] = query_ms[int(0.95 * (len(query_ms) - 1))]
+            stats["avg_end_to_end_ms"] = sum(total_ms) / len(total_ms)
+        return stats
@@ -0,0 +1,74 @@
+# sequences.py
+"""Collision-free document numbers (INV, PO, GR, ...) handed out in blocks.
+
+Each (terminal, document type) pair has a high-water mark in
+document_sequences. A terminal reserves a block of numbers by bumping the
+mark in one short transaction and then hands numbers out of memory, so
+only one in `block_size` calls touches the database. Numbers left in a
+block when the app exits are skipped, never reused.
+"""
+import os
+import threading
+
+import database
+from config import TERMINAL_ID
+
+
+def format_number(doc_type, terminal_id, n):
+    return f"{doc_type}-{terminal_id}-{n:07d}"
+
+
+class SequenceService:
+    def __init__(self, terminal_id=None, block_size=100):
+        self.terminal_id = terminal_id or TERMINAL_ID
+        self.block_size = block_size
+        self._blocks = {}  # (db path, doc_type) -> [next, end)
+        self._lock = threading.Lock()
+        self.reservations = 0
+
+    def _reserve(self, doc_type, count):
+        with database.connection_manager.connection() as conn:
+            c = conn.cursor()
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                c.execute("""
+                    INSERT INTO document_sequences (terminal_id, doc_type, high_water)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (terminal_id, doc_type)
+                    DO UPDATE SET high_water = high_water + excluded.high_water, updated_at = CURRENT_TIMESTAMP
+                    RETURNING high_water
+                """, (self.terminal_id, doc_type, count))
+                high_water = c.fetchone()[0]
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        self.reservations += 1
+        return high_water - count + 1, high_water + 1
+
+    def next_value(self, doc_type):
+        key = (os.path.abspath(database.DB_FILE), doc_type)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                block = self._blocks[key] = list(self._reserve(doc_type, self.block_size))
+            value = block[0]
+            block[0] += 1
+            return value
+
+    def next_number(self, doc_type):
+        return format_number(doc_type, self.terminal_id, self.next_value(doc_type))
+
+    def high_water(self, doc_type):
+        row = database.fetch_one(
+            "SELECT high_water FROM document_sequences WHERE terminal_id = ? AND doc_type = ?",
+            (self.terminal_id, doc_type))
+        return row[0] if row else 0
+
+
+sequence_service = SequenceService()
+
+
+def next_number(doc_type):
+    """Next document number for this terminal, e.g. next_number("INV") -> "INV-T1-0000001"."""
+    return sequence_service.next_number(doc_type)
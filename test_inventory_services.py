@@ -0,0 +1,936 @@
+"""
+Inventory Services Test Suite
+Tests for the catalog import engine and other services behind the inventory screens
+"""
+
+import unittest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import database
+from database import init_db, execute_query, fetch_one, fetch_all
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pandas
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+
+class InventoryDatabaseTestCase(unittest.TestCase):
+    """Base class: fresh database per test, plus a scratch import file"""
+
+    test_db = "test_inventory_services.db"
+    test_file = "test_inventory_import.xlsx"
+
+    def setUp(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        init_db()
+
+    def tearDown(self):
+        database.DB_FILE = self.original_db
+        rejected = f"{os.path.splitext(self.test_file)[0]}_rejected.xlsx"
+        for path in (self.test_db, self.test_file, rejected):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def write_sheet(self, rows):
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        workbook.save(self.test_file)
+        return self.test_file
+
+
+@unittest.skipUnless(OPENPYXL_AVAILABLE, "openpyxl not installed")
+class TestCatalogImport(InventoryDatabaseTestCase):
+    """Test the streaming, chunked Excel import"""
+
+    HEADER = ["Item", "Code", "Brand", "Price", "Cost", "Qty", "Size", "Group", "Vendor", "UOM"]
+    MAPPING = {"Name": "Item", "Barcode": "Code", "Company": "Brand", "Sale": "Price", "Cost": "Cost",
+               "Stock": "Qty", "Size": "Size", "Category": "Group", "Supplier": "Vendor", "Unit": "UOM"}
+
+    def setUp(self):
+        super().setUp()
+        self.category = execute_query("INSERT INTO categories (name) VALUES ('Tea & Coffee')")
+        self.supplier = execute_query("INSERT INTO suppliers (name) VALUES ('Tapal Traders')")
+        self.existing = fetch_one("SELECT COUNT(*) FROM products")[0]
+
+    def imported(self):
+        return fetch_all("""
+            SELECT name, barcode, company, category_id, supplier_id, base_uom_id, cost_price, selling_price, stock
+            FROM products ORDER BY id
+        """)[self.existing:]
+
+    def test_rows_mapped_and_resolved(self):
+        """Test values, lookups and defaults match the old per-row import"""
+        from catalog_import import import_catalog
+        path = self.write_sheet([
+            self.HEADER,
+            ["Tapal Danedar", 8964000123456, "Tapal", 450, 400.5, 12, "950g", "Tea & Coffee", "Tapal Traders", "Piece"],
+            ["Loose Tea", None, None, "120", None, None, None, "Unknown", None, None],
+        ])
+        stats = import_catalog(path, self.MAPPING)
+        self.assertEqual((stats["rows"], stats["imported"], stats["variants"], stats["skipped"]), (2, 2, 1, 0))
+        piece = fetch_one("SELECT id FROM uoms WHERE name = 'Piece'")[0]
+        self.assertEqual([tuple(r) for r in self.imported()], [
+            ("Tapal Danedar", "8964000123456", "Tapal", self.category, self.supplier, piece, 400.5, 450.0, 12.0),
+            ("Loose Tea", None, None, None, None, 1, 0.0, 120.0, 0.0),
+        ])
+        variant = fetch_one("SELECT p.name, v.variant_name, v.variant_value, v.price FROM product_variants v "
+                            "JOIN products p ON p.id = v.product_id ORDER BY v.id DESC LIMIT 1")
+        self.assertEqual(tuple(variant), ("Tapal Danedar", "Size", "950g", 450.0))
+        self.assertGreater(stats["rows_per_sec"], 0)
+
+    def test_bad_rows_skipped_and_counted(self):
+        """Test rows without a name or with non-numeric prices are skipped"""
+        from catalog_import import import_catalog
+        path = self.write_sheet([
+            self.HEADER,
+            [None, "111", None, 10],
+            ["Bad Price", "222", None, "ten"],
+            [None, None, None, None],  # blank line, not a row
+            ["Good", "333", None, 10],
+        ])
+        stats = import_catalog(path, self.MAPPING)
+        self.assertEqual((stats["rows"], stats["imported"], stats["skipped"]), (3, 1, 2))
+        self.assertEqual([r[0] for r in self.imported()], ["Good"])
+
+    def test_chunks_keep_variants_on_their_products(self):
+        """Test variants follow their product across chunk boundaries"""
+        from catalog_import import import_catalog
+        rows = [self.HEADER] + [[f"Item {n}", f"B{n}", None, n, None, None, f"S{n}"] for n in range(7)]
+        progress = []
+        stats = import_catalog(self.write_sheet(rows), self.MAPPING, chunk_size=3, on_progress=progress.append)
+        self.assertEqual(stats["chunks"], 3)
+        self.assertEqual([p["rows"] for p in progress], [3, 6, 7])
+        pairs = fetch_all("SELECT p.name, v.variant_value FROM product_variants v "
+                          "JOIN products p ON p.id = v.product_id WHERE p.name LIKE 'Item %' ORDER BY p.id")
+        self.assertEqual([tuple(p) for p in pairs], [(f"Item {n}", f"S{n}") for n in range(7)])
+
+    def test_catalog_index_sees_new_products(self):
+        """Test imported barcodes scan at the POS straight away"""
+        from catalog_import import import_catalog
+        from catalog_index import catalog_index
+        catalog_index.ensure_loaded()
+        import_catalog(self.write_sheet([self.HEADER, ["Scanned", "4000123", None, 99]]), self.MAPPING)
+        self.assertEqual(catalog_index.lookup("4000123")[0][1], "Scanned")
+
+    def test_search_index_built_per_chunk(self):
+        """Test imported products and sizes are searchable and the triggers come back"""
+        from catalog_import import import_catalog
+        from migrations import fts5_available
+        with database.connection_manager.connection() as conn:
+            if not fts5_available(conn):
+                self.skipTest("SQLite built without FTS5")
+        rows = [self.HEADER] + [[f"Saffron Rice {n}", f"77{n}", None, 5, None, None, "5kg"] for n in range(5)]
+        import_catalog(self.write_sheet(rows), self.MAPPING, chunk_size=2)
+        matches = fetch_all("SELECT name, variants FROM product_search WHERE product_search MATCH 'saffron'")
+        self.assertEqual(len(matches), 5)
+        self.assertTrue(all(m[1] == "5kg" for m in matches))
+        triggers = fetch_one("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%search%'")
+        self.assertEqual(triggers[0], 6)
+        pid = execute_query("INSERT INTO products (name) VALUES ('Saffron Tea')")
+        self.assertEqual(fetch_one("SELECT rowid FROM product_search WHERE product_search MATCH 'saffron tea'")[0], pid)
+
+    def test_header_and_preview_only(self):
+        """Test the mapping screen reads just the header and a few rows"""
+        from catalog_import import read_header, row_count_hint
+        path = self.write_sheet([["Item", None, "Price"]] + [[f"P{n}", None, n] for n in range(50)])
+        columns, sample = read_header(path, preview=3)
+        self.assertEqual(columns, ["Item", "Column 2", "Price"])
+        self.assertEqual([row[0] for row in sample], ["P0", "P1", "P2"])
+        self.assertEqual(row_count_hint(path), 50)
+
+
+class TestCsvImport(InventoryDatabaseTestCase):
+    """Test CSV/TSV files through the same mapping and engine"""
+
+    test_file = "test_inventory_import.csv"
+    MAPPING = {"Name": "Item", "Barcode": "Code", "Sale": "Price", "Stock": "Qty", "Size": "Size"}
+
+    def write_text(self, text, path=None):
+        path = path or self.test_file
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def imported(self):
+        return [tuple(r) for r in fetch_all(
+            "SELECT name, barcode, selling_price, stock FROM products WHERE barcode LIKE '89%' ORDER BY id")]
+
+    def test_comma_separated(self):
+        """Test quoting, thousands separators and long barcodes kept as text"""
+        from catalog_import import import_catalog
+        path = self.write_text('Item,Code,Price,Qty,Size\n'
+                               '"Rice, Basmati",8964000123456,"1,250.50",12,5kg\n'
+                               'Sugar,8964000123457,140,,\n'
+                               '\n'
+                               'Broken,8964000123458,abc,1,\n')
+        stats = import_catalog(path, self.MAPPING)
+        self.assertEqual((stats["rows"], stats["imported"], stats["variants"], stats["skipped"]), (3, 2, 1, 1))
+        self.assertEqual(self.imported(), [("Rice, Basmati", "8964000123456", 1250.5, 12.0),
+                                           ("Sugar", "8964000123457", 140.0, 0.0)])
+
+    def test_tab_and_semicolon_delimiters(self):
+        """Test .tsv files and sniffed semicolon CSVs"""
+        from catalog_import import import_catalog
+        tsv = "test_inventory_import.tsv"
+        self.addCleanup(os.remove, tsv)
+        self.write_text("Item\tCode\tPrice\nTea\t8900000000001\t99\n", tsv)
+        self.write_text("Item;Code;Price\nSalt;8900000000002;45\n")
+        import_catalog(tsv, self.MAPPING)
+        import_catalog(self.test_file, self.MAPPING)
+        self.assertEqual(self.imported(), [("Tea", "8900000000001", 99.0, 0.0), ("Salt", "8900000000002", 45.0, 0.0)])
+
+    def test_header_preview_and_count(self):
+        from catalog_import import read_header, row_count_hint
+        path = self.write_text("Item,Price\n" + "".join(f"P{n},{n}\n" for n in range(40)))
+        columns, sample = read_header(path, preview=2)
+        self.assertEqual(columns, ["Item", "Price"])
+        self.assertEqual(sample, [["P0", "0"], ["P1", "1"]])
+        self.assertEqual(row_count_hint(path), 40)
+
+
+@unittest.skipUnless(PANDAS_AVAILABLE and OPENPYXL_AVAILABLE, "pandas/openpyxl not installed")
+class TestImportValidation(InventoryDatabaseTestCase):
+    """Test the validation stage and the rejected-rows workbook"""
+
+    test_file = "test_inventory_import.csv"
+    MAPPING = {"Name": "Item", "Barcode": "Code", "Sale": "Price", "Stock": "Qty"}
+
+    def write_csv(self, lines):
+        with open(self.test_file, "w", encoding="utf-8", newline="") as f:
+            f.write("Item,Code,Price,Qty\n" + "".join(line + "\n" for line in lines))
+        return self.test_file
+
+    def rejected_rows(self, path):
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return [row[:3] for row in workbook.active.iter_rows(min_row=2, values_only=True)]
+        finally:
+            workbook.close()
+
+    def test_check_chunk_reasons(self):
+        """Test each per-row check, first failure winning"""
+        from import_validation import check_chunk
+        rows = [("Tea", "8964000123456", "450", "3"),
+                ("", "111", "10", "1"),
+                ("Milk", "222", "ten", "1"),
+                ("Salt", "333", "1,250", "nan"),
+                ("Soap", "8.96E+12", "99", "1"),
+                ("Oil", "12 34", "99", "1"),
+                ("Jam", "", "", "")]
+        problems = check_chunk(rows, {"Name": 0, "Barcode": 1, "Sale": 2, "Stock": 3})
+        self.assertEqual(problems, [(1, "Name is required"), (2, "Sale is not a number"),
+                                    (3, "Stock is not a number"),
+                                    (4, "Barcode in scientific notation (format the column as text)"),
+                                    (5, "Barcode format is invalid")])
+
+    def test_only_valid_rows_written(self):
+        """Test rejects, duplicates in the file and against the DB, and the workbook"""
+        from catalog_import import import_catalog
+        execute_query("INSERT INTO products (name, barcode) VALUES ('Old Tea', '5000')")
+        path = self.write_csv(["Tea,1000,10,1", "Bad,1001,x,1", "Tea Again,1000,11,1",
+                               "Known,5000,12,1", ",1002,1,1", "Rice,1003,13,1"])
+        stats = import_catalog(path, self.MAPPING, chunk_size=2, workers=1)
+        self.assertEqual((stats["rows"], stats["imported"], stats["skipped"]), (6, 2, 4))
+        self.assertEqual(stats["reasons"], {"Sale is not a number": 1, "Duplicate barcode in file": 1,
+                                            "Barcode already in catalogue": 1, "Name is required": 1})
+        self.assertEqual(fetch_all("SELECT name FROM products WHERE barcode IN ('1000', '1003') ORDER BY id"),
+                         [("Tea",), ("Rice",)])
+        self.assertEqual(self.rejected_rows(stats["rejected_file"]), [
+            (2, "Sale is not a number", "Bad"),
+            (3, "Duplicate barcode in file (row 1)", "Tea Again"),
+            (4, "Barcode already in catalogue", "Known"),
+            (5, "Name is required", None),
+        ])
+
+    def test_upsert_accepts_known_barcodes(self):
+        from catalog_import import import_catalog
+        execute_query("INSERT INTO products (name, barcode, selling_price) VALUES ('Old Tea', '5000', 1)")
+        stats = import_catalog(self.write_csv(["Old Tea,5000,12,1"]), self.MAPPING, mode="upsert", workers=1)
+        self.assertEqual((stats["updated"], stats["skipped"], stats["rejected_file"]), (1, 0, None))
+
+    def test_process_pool(self):
+        """Test chunks validated in worker processes come back in file order"""
+        from catalog_import import import_catalog
+        lines = [f"Item {n},{2000 + n},{'x' if n % 5 == 0 else n},1" for n in range(40)]
+        stats = import_catalog(self.write_csv(lines), self.MAPPING, chunk_size=7, workers=2)
+        self.assertEqual((stats["imported"], stats["skipped"]), (32, 8))
+        names = [r[0] for r in fetch_all("SELECT name FROM products WHERE name LIKE 'Item %' ORDER BY id")]
+        self.assertEqual(names, [f"Item {n}" for n in range(40) if n % 5])
+
+
+class TestImportJobs(InventoryDatabaseTestCase):
+    """Test checkpointed, resumable import jobs and the background worker"""
+
+    test_file = "test_inventory_import.csv"
+    MAPPING = {"Name": "Item", "Barcode": "Code", "Sale": "Price"}
+
+    def setUp(self):
+        super().setUp()
+        with open(self.test_file, "w", encoding="utf-8", newline="") as f:
+            f.write("Item,Code,Price\n" + "".join(f"Item {n},{3000 + n},{n}\n" for n in range(10)))
+
+    def imported(self):
+        return [r[0] for r in fetch_all("SELECT name FROM products WHERE name LIKE 'Item %' ORDER BY id")]
+
+    def job_row(self, job_id):
+        return tuple(fetch_one("SELECT status, chunks_done, rows_done, imported FROM import_jobs WHERE id = ?",
+                               (job_id,)))
+
+    def crash_after(self, chunks):
+        def on_progress(stats):
+            if stats["chunks"] == chunks:
+                raise RuntimeError("power cut")
+        return on_progress
+
+    def test_resume_skips_committed_chunks(self):
+        """Test a failed job resumes after its last committed chunk"""
+        from import_jobs import open_job, run_job
+        job = open_job(self.test_file, self.MAPPING, chunk_size=3)
+        with self.assertRaises(RuntimeError):
+            run_job(job, self.test_file, self.MAPPING, on_progress=self.crash_after(2), validate=False)
+        self.assertEqual(self.job_row(job.id), ("failed", 2, 6, 6))
+
+        resumed = open_job(self.test_file, self.MAPPING, chunk_size=3)
+        self.assertEqual((resumed.id, resumed.chunks_done), (job.id, 2))
+        stats = run_job(resumed, self.test_file, self.MAPPING, validate=False)
+        self.assertEqual((stats["rows"], stats["imported"], stats["chunks"], stats["resumed_rows"]), (10, 10, 4, 6))
+        self.assertEqual(self.imported(), [f"Item {n}" for n in range(10)])
+        self.assertEqual(self.job_row(job.id), ("completed", 4, 10, 10))
+
+    def test_checkpoint_shares_the_chunk_transaction(self):
+        """Test a chunk that fails to checkpoint is not left half written"""
+        from import_jobs import ImportJob, open_job, run_job
+
+        class FailingCheckpoint(ImportJob):
+            def checkpoint(self, c, stats):
+                super().checkpoint(c, stats)
+                if stats["chunks"] == 2:
+                    raise RuntimeError("disk full")
+
+        job = open_job(self.test_file, self.MAPPING, chunk_size=3)
+        failing = FailingCheckpoint(job.id, 3)
+        with self.assertRaises(RuntimeError):
+            run_job(failing, self.test_file, self.MAPPING, validate=False)
+        self.assertEqual(self.imported(), ["Item 0", "Item 1", "Item 2"])
+        self.assertEqual(self.job_row(job.id), ("failed", 1, 3, 3))
+
+    def test_cancel_then_start_over(self):
+        """Test cancel stops between chunks and resume=False abandons the old job"""
+        from import_jobs import open_job, run_job, resumable_job
+        job = open_job(self.test_file, self.MAPPING, chunk_size=4)
+        stats = run_job(job, self.test_file, self.MAPPING, on_progress=lambda stats: job.cancel(), validate=False)
+        self.assertTrue(stats["cancelled"])
+        self.assertEqual(self.job_row(job.id), ("cancelled", 1, 4, 4))
+        self.assertEqual(resumable_job(self.test_file, self.MAPPING, chunk_size=4)["rows_done"], 4)
+        self.assertIsNone(resumable_job(self.test_file, self.MAPPING, chunk_size=5))  # other settings
+
+        fresh = open_job(self.test_file, self.MAPPING, chunk_size=4, resume=False)
+        self.assertNotEqual(fresh.id, job.id)
+        self.assertEqual(self.job_row(job.id)[0], "abandoned")
+
+    def test_progress_text(self):
+        from import_jobs import progress_text
+        self.assertEqual(progress_text({"rows": 1000, "rows_per_sec": 100.0}, 7000),
+                         "1,000 of ~7,000 rows, 100 rows/sec, ETA 1:00")
+        self.assertEqual(progress_text({"rows": 5, "rows_per_sec": 0.0}), "5 rows, 0 rows/sec")
+
+    def test_worker_reports_to_tk_thread(self):
+        """Test the background worker delivers progress and the result through after()"""
+        from import_jobs import ImportWorker
+        from test_pos_services import FakeRoot
+        root, progress, done = FakeRoot(), [], []
+        worker = ImportWorker(root, progress.append, lambda *d: done.append(d), poll_ms=10)
+        self.addCleanup(worker.shutdown)
+        worker.start(self.test_file, self.MAPPING, chunk_size=3, total_rows=10, validate=False)
+        deadline = time.time() + 5
+        while not done and time.time() < deadline:
+            root.advance(10)
+            time.sleep(0.005)
+        stats, error = done[0]
+        self.assertIsNone(error)
+        self.assertEqual(stats["imported"], 10)
+        self.assertFalse(worker.running)
+        self.assertTrue(progress and progress[-1]["rows"] <= 10)
+
+    def test_worker_done_queued_as_poll_drains(self):
+        """Test a result queued just after the poll found the queue empty still reaches on_done"""
+        import queue
+        from concurrent.futures import Future
+        from import_jobs import ImportWorker
+        from test_pos_services import FakeRoot
+        root, done = FakeRoot(), []
+        worker = ImportWorker(root, on_done=lambda *d: done.append(d), poll_ms=10)
+        future = worker._future = Future()
+
+        class RacingQueue(queue.Queue):
+            def get_nowait(self):
+                try:
+                    return super().get_nowait()
+                except queue.Empty:
+                    if not future.done():
+                        # The worker finishes between the empty read and the running check
+                        self.put(("done", ({"rows": 1}, None)))
+                        future.set_result(None)
+                    raise
+
+        worker._results = RacingQueue()
+        worker._schedule_poll()
+        for _ in range(3):
+            root.advance(10)
+        self.assertEqual(done, [({"rows": 1}, None)])
+
+    def test_worker_inspects_file_once(self):
+        """Test the file is hashed once in the background and the digest reused by the job"""
+        from unittest import mock
+        import import_jobs
+        from import_jobs import ImportWorker, resumable_job
+        from test_pos_services import FakeRoot
+        root, inspected, done = FakeRoot(), [], []
+        worker = ImportWorker(root, on_done=lambda *d: done.append(d), on_inspected=lambda *i: inspected.append(i),
+                              poll_ms=10)
+        self.addCleanup(worker.shutdown)
+        with mock.patch("import_jobs.file_hash", wraps=import_jobs.file_hash) as hashed:
+            worker.inspect(self.test_file)
+            deadline = time.time() + 5
+            while not inspected and time.time() < deadline:
+                root.advance(10)
+                time.sleep(0.005)
+            path, digest, total_rows, error = inspected[0]
+            self.assertIsNone(error)
+            self.assertEqual((path, total_rows), (self.test_file, 10))
+            self.assertIsNone(resumable_job(self.test_file, self.MAPPING, chunk_size=3, digest=digest))
+            worker.start(self.test_file, self.MAPPING, chunk_size=3, total_rows=total_rows, digest=digest,
+                         validate=False)
+            while not done and time.time() < deadline:
+                root.advance(10)
+                time.sleep(0.005)
+        self.assertIsNone(done[0][1])
+        self.assertEqual(hashed.call_count, 1)
+        self.assertEqual(fetch_one("SELECT file_hash FROM import_jobs")[0], digest)
+
+
+class TestCatalogUpsert(InventoryDatabaseTestCase):
+    """Test re-imports that update products matched on a natural key"""
+
+    POSITIONS = {"Name": 0, "Barcode": 1, "Cost": 2, "Sale": 3, "Stock": 4, "Size": 5}
+
+    def setUp(self):
+        super().setUp()
+        from catalog_import import import_rows
+        import_rows([("Milk 1L", "1001", 200, 250, 10, "1L"), ("Bread", "1002", 90, 120, 5, None)],
+                    self.POSITIONS)
+        self.products = fetch_one("SELECT COUNT(*) FROM products")[0]
+
+    def product(self, barcode):
+        return tuple(fetch_one("SELECT cost_price, selling_price, stock FROM products WHERE barcode = ?", (barcode,)))
+
+    def test_diff_summary_and_values(self):
+        """Test matched rows update in place and only unmatched rows insert"""
+        from catalog_import import import_rows
+        stats = import_rows([
+            ("Milk 1L", "1001", 210, 260, 12, "1L"),   # changed
+            ("Bread", "1002", 90, 120, 5, None),       # unchanged
+            ("Eggs", "1003", 300, 360, 30, "Dozen"),   # new
+            ("No Code", None, 1, 2, 3, None),          # no key: new, as in insert mode
+        ], self.POSITIONS, mode="upsert", updated_by=1)
+        self.assertEqual((stats["imported"], stats["updated"], stats["unchanged"], stats["skipped"]), (2, 1, 1, 0))
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM products")[0], self.products + 2)
+        self.assertEqual(fetch_one("SELECT barcode, selling_price FROM products WHERE name = 'No Code'"), (None, 2.0))
+        self.assertEqual(self.product("1001"), (210.0, 260.0, 12.0))
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM product_variants WHERE variant_value = '1L'")[0], 1)
+        eggs = fetch_one("SELECT p.name FROM product_variants v JOIN products p ON p.id = v.product_id "
+                         "WHERE v.variant_value = 'Dozen'")
+        self.assertEqual(eggs[0], "Eggs")
+        history = fetch_all("SELECT selling_price, updated_by FROM price_history")
+        self.assertEqual([tuple(h) for h in history], [(260.0, 1)])
+
+    def test_unmapped_fields_left_alone(self):
+        """Test a price-only file does not zero stock or cost"""
+        from catalog_import import import_rows
+        stats = import_rows([("Milk 1L", "1001", 275)], {"Name": 0, "Barcode": 1, "Sale": 2}, mode="upsert")
+        self.assertEqual((stats["imported"], stats["updated"]), (0, 1))
+        self.assertEqual(self.product("1001"), (200.0, 275.0, 10.0))
+
+    def test_repeated_key_last_row_wins(self):
+        """Test a key repeated in the file, within and across chunks"""
+        from catalog_import import import_rows
+        rows = [("Juice", "2001", 1, 10, 1, None), ("Juice", "2001", 1, 11, 1, None),
+                ("Juice", "2001", 1, 12, 1, None)]
+        stats = import_rows(rows, self.POSITIONS, chunk_size=2, mode="upsert")
+        self.assertEqual((stats["imported"], stats["updated"], stats["skipped"]), (1, 1, 1))
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM products WHERE barcode = '2001'")[0], 1)
+        self.assertEqual(self.product("2001"), (1.0, 12.0, 1.0))
+
+    def test_match_on_name(self):
+        """Test the natural key is configurable"""
+        from catalog_import import import_rows
+        stats = import_rows([("Bread", "9999", 95, 125, 5, None)], self.POSITIONS, mode="upsert", key="Name")
+        self.assertEqual((stats["imported"], stats["updated"]), (0, 1))
+        self.assertEqual(self.product("1002"), (95.0, 125.0, 5.0))
+
+    def test_catalog_index_sees_new_prices(self):
+        """Test the POS index picks up prices changed by an upsert"""
+        from catalog_import import import_rows
+        from catalog_index import catalog_index
+        catalog_index.ensure_loaded()
+        import_rows([("Bread", "1002", 90, 130, 5, None)], self.POSITIONS, mode="upsert")
+        self.assertEqual(catalog_index.lookup("1002")[0][2], 130.0)
+
+    def test_unknown_mode_rejected(self):
+        from catalog_import import import_rows
+        with self.assertRaises(ValueError):
+            import_rows([], self.POSITIONS, mode="merge")
+        with self.assertRaises(ValueError):
+            import_rows([], self.POSITIONS, mode="upsert", key="Colour")
+
+
+class TestCatalogGrid(InventoryDatabaseTestCase):
+    """Test the keyset-paged rows behind the items grid"""
+
+    def setUp(self):
+        super().setUp()
+        self.category = execute_query("INSERT INTO categories (name) VALUES ('Snacks')")
+        with database.connection_manager.connection() as conn:
+            conn.executemany(
+                "INSERT INTO products (name, company, category_id, selling_price, tax_type) VALUES (?, ?, ?, ?, ?)",
+                [(f"Item {n % 40:02d}", "Acme" if n % 3 else "Zeta", self.category if n % 2 else None,
+                  float(n % 7), "inclusive" if n % 5 == 0 else "exclusive") for n in range(120)])
+            conn.commit()
+
+    def expected(self, where="", order="p.name, p.id"):
+        return [row[0] for row in fetch_all(f"SELECT p.id FROM products p {where} ORDER BY {order}")]
+
+    def test_pages_follow_keyset(self):
+        """Test forward and backward pages tile the full ordering, duplicates of name included"""
+        from catalog_grid import CatalogQuery
+        query = CatalogQuery()
+        ids, after = [], None
+        while True:
+            page = query.page(after=after, limit=17)
+            if not page:
+                break
+            ids += [row[0] for row in page]
+            after = query.key(page[-1])
+        self.assertEqual(ids, self.expected())
+        back = query.page(after=after, limit=17, backwards=True)
+        self.assertEqual([row[0] for row in back], ids[-18:-1])
+
+    def test_filters_and_descending_sort(self):
+        from catalog_grid import CatalogQuery
+        query = CatalogQuery(category_id=self.category, company="Acme", tax_type="exclusive", sort="Sale",
+                             descending=True)
+        where = (f"WHERE p.category_id = {self.category} AND p.company = 'Acme' AND p.tax_type = 'exclusive'")
+        expected = self.expected(where, "COALESCE(p.selling_price, 0) DESC, p.id DESC")
+        self.assertEqual(query.count(), len(expected))
+        self.assertEqual([row[0] for row in query.page(limit=1000)], expected)
+
+    def test_window_scroll_and_jumps(self):
+        """Test every window matches the full ordering, however it was reached"""
+        from catalog_grid import CatalogQuery, PagedRows
+        expected = self.expected()
+        rows = PagedRows(CatalogQuery(), prefetch=10)
+        self.assertEqual(rows.total, len(expected))
+        for top in [0, 5, 12, 30, 29, 3, 0, 80, 200, 40, len(expected) - 25, 60]:
+            start, window = rows.window(top, 25)
+            self.assertEqual(start, max(0, min(top, len(expected) - 25)))
+            self.assertEqual([row[0] for row in window], expected[start:start + 25])
+            self.assertLessEqual(len(rows.rows), 25 + 2 * 10)
+
+    def test_locate(self):
+        from catalog_grid import CatalogQuery, PagedRows
+        expected = self.expected("WHERE p.company = 'Zeta'")
+        rows = PagedRows(CatalogQuery(company="Zeta"))
+        self.assertEqual(rows.locate(expected[7]), 7)
+        acme = fetch_one("SELECT id FROM products WHERE company = 'Acme'")[0]
+        self.assertIsNone(rows.locate(acme))
+
+    def test_jumps_walk_an_index_for_every_sort(self):
+        """Test key_at's OFFSET reads follow an index instead of sorting the catalogue"""
+        from catalog_grid import CatalogQuery, SORTS
+        for sort in SORTS:
+            for descending in (False, True):
+                query = CatalogQuery(sort=sort, descending=descending)
+                plan = fetch_all(f"EXPLAIN QUERY PLAN SELECT {SORTS[sort]}, p.id FROM products p"
+                                 f"{query._order()} LIMIT 1 OFFSET ?", (60,))
+                self.assertFalse(any("TEMP B-TREE" in row[-1] for row in plan), (sort, descending, plan))
+                expected = self.expected(order=f"{SORTS[sort]}, p.id")
+                key = query.key_at(60)
+                self.assertEqual(key[1], (expected[::-1] if descending else expected)[60])
+
+    def test_grid_values(self):
+        from catalog_grid import CatalogQuery, grid_values
+        row = CatalogQuery(tax_type="inclusive").page(limit=1)[0]
+        values = grid_values(row)
+        self.assertEqual(len(values), 15)
+        self.assertEqual(values[12], "Included in Retail Price")
+        self.assertTrue(values[10].startswith("Rs. "))
+
+
+class TestProductAttributes(InventoryDatabaseTestCase):
+    """Test the pivoted Variant/Size projection kept by triggers"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = execute_query("INSERT INTO products (name) VALUES ('Polo Shirt')")
+
+    def attributes(self, product_id=None):
+        row = fetch_one("SELECT variant, size FROM product_attributes WHERE product_id = ?",
+                        (product_id or self.product,))
+        return tuple(row) if row else None
+
+    def add_variant(self, name, value):
+        return execute_query("INSERT INTO product_variants (product_id, variant_name, variant_value) VALUES (?, ?, ?)",
+                             (self.product, name, value))
+
+    def test_triggers_follow_variant_writes(self):
+        self.assertIsNone(self.attributes())
+        self.add_variant("Barcode", "Additional")
+        self.assertIsNone(self.attributes())
+        self.add_variant("Size", "Large")
+        self.assertEqual(self.attributes(), (None, "Large"))
+        red = self.add_variant("Variant", "Red")
+        self.add_variant("Variant", "Blue")
+        self.assertEqual(self.attributes(), ("Red", "Large"))    # first row wins, as LIMIT 1 did
+        execute_query("UPDATE product_variants SET variant_value = 'Crimson' WHERE id = ?", (red,))
+        self.assertEqual(self.attributes(), ("Crimson", "Large"))
+        execute_query("DELETE FROM product_variants WHERE id = ?", (red,))
+        self.assertEqual(self.attributes(), ("Blue", "Large"))
+        execute_query("DELETE FROM products WHERE id = ?", (self.product,))
+        self.assertIsNone(self.attributes())
+
+    def test_bulk_import_and_migration_build_the_same_rows(self):
+        """Test the deferred bulk path and a full rebuild agree with the per-row subqueries"""
+        from catalog_import import import_rows
+        from migrations import _m010_product_attributes
+        import_rows([("Tea", "5001", "Green", "250g"), ("Coffee", "5002", None, "500g"), ("Salt", "5003", None, None)],
+                    {"Name": 0, "Barcode": 1, "Variant": 2, "Size": 3})
+        self.add_variant("Size", "XL")
+        expected = fetch_all("""
+            SELECT p.id,
+                   (SELECT variant_value FROM product_variants WHERE product_id = p.id AND variant_name = 'Variant' LIMIT 1),
+                   (SELECT variant_value FROM product_variants WHERE product_id = p.id AND variant_name = 'Size' LIMIT 1)
+            FROM products p
+            WHERE EXISTS (SELECT 1 FROM product_variants WHERE product_id = p.id AND variant_name IN ('Variant', 'Size'))
+            ORDER BY p.id
+        """)
+        query = "SELECT product_id, variant, size FROM product_attributes ORDER BY product_id"
+        self.assertEqual(len(expected), 3)
+        self.assertEqual(fetch_all(query), expected)
+        with database.connection_manager.connection() as conn:
+            _m010_product_attributes(conn.cursor())
+            conn.commit()
+        self.assertEqual(fetch_all(query), expected)
+        trigger = fetch_one("SELECT 1 FROM sqlite_master WHERE name = 'trg_variants_attributes_ins'")
+        self.assertIsNotNone(trigger)
+
+
+class TestEditBuffer(InventoryDatabaseTestCase):
+    """Test staged inline edits, batched flushes and undo"""
+
+    def setUp(self):
+        super().setUp()
+        self.tea = execute_query("INSERT INTO products (name, barcode, cost_price, selling_price) "
+                                 "VALUES ('Tea', '6001', 100, 120)")
+        self.salt = execute_query("INSERT INTO products (name, barcode, cost_price, selling_price) "
+                                  "VALUES ('Salt', '6002', 40, 50)")
+
+    def product(self, product_id):
+        return tuple(fetch_one("SELECT name, cost_price, selling_price, tax_type FROM products WHERE id = ?",
+                               (product_id,)))
+
+    def history(self):
+        return fetch_all("SELECT product_id, selling_price, updated_by FROM price_history ORDER BY id")
+
+    def test_edits_coalesce_and_flush_together(self):
+        from catalog_edits import EditBuffer
+        edits = EditBuffer(updated_by=1)
+        edits.stage(self.tea, "selling_price", 125.0)
+        edits.stage(str(self.tea), "selling_price", 130.0)    # Treeview iids are strings
+        edits.stage(self.tea, "name", "Green Tea")
+        edits.stage(self.salt, "tax_type", "inclusive")
+        edits.stage(self.salt, "selling_price", 50.0)
+        self.assertEqual(len(edits), 4)
+        self.assertEqual(self.product(self.tea), ("Tea", 100.0, 120.0, "exclusive"))
+
+        result = edits.flush()
+        self.assertEqual(result, {"products": sorted([self.tea, self.salt]), "cells": 4})
+        self.assertEqual(len(edits), 0)
+        self.assertEqual(self.product(self.tea), ("Green Tea", 100.0, 130.0, "exclusive"))
+        self.assertEqual(self.product(self.salt), ("Salt", 40.0, 50.0, "inclusive"))
+        self.assertEqual(self.history(), [(self.tea, 130.0, 1)])    # unchanged price: no history row
+
+    def test_undo_restores_last_batch_only(self):
+        from catalog_edits import EditBuffer
+        edits = EditBuffer()
+        edits.stage(self.tea, "cost_price", 90.0)
+        edits.flush()
+        edits.stage(self.tea, "selling_price", 99.0)
+        edits.stage(self.salt, "name", "Rock Salt")
+        edits.flush()
+        self.assertEqual(edits.undo(), sorted([self.tea, self.salt]))
+        self.assertEqual(self.product(self.tea), ("Tea", 90.0, 120.0, "exclusive"))
+        self.assertEqual(self.product(self.salt)[0], "Salt")
+        self.assertEqual([row[1] for row in self.history()], [99.0, 120.0])
+        self.assertEqual(edits.undo(), [])
+
+    def test_failed_flush_keeps_edits(self):
+        from catalog_edits import EditBuffer
+        edits = EditBuffer()
+        edits.stage(self.tea, "name", None)     # products.name is NOT NULL
+        with self.assertRaises(Exception):
+            edits.flush()
+        self.assertEqual(len(edits), 1)
+        self.assertEqual(self.product(self.tea)[0], "Tea")
+        with self.assertRaises(ValueError):
+            edits.stage(self.tea, "stock", 5)
+
+    def test_timer_flushes_after_last_edit(self):
+        from catalog_edits import EditBuffer
+        from test_pos_services import FakeRoot
+        root, flushed = FakeRoot(), []
+        edits = EditBuffer(root=root, delay_ms=1000, on_flush=lambda result, error: flushed.append(result))
+        edits.stage(self.tea, "name", "Black Tea")
+        root.advance(600)
+        edits.stage(self.salt, "name", "Sea Salt")
+        root.advance(600)
+        self.assertEqual(flushed, [])
+        root.advance(400)
+        self.assertEqual(flushed, [{"products": sorted([self.tea, self.salt]), "cells": 2}])
+        self.assertEqual(self.product(self.salt)[0], "Sea Salt")
+
+    def test_grid_rows_refresh_in_place(self):
+        """Test refreshed buffer rows keep their sort key so the keyset stays valid"""
+        from catalog_grid import CatalogQuery, PagedRows
+        rows = PagedRows(CatalogQuery())
+        rows.window(0, 10)
+        execute_query("UPDATE products SET name = 'Zinc Salt', selling_price = 55 WHERE id = ?", (self.salt,))
+        fresh = rows.refresh_rows([self.salt])
+        self.assertEqual(fresh[self.salt][3], "Zinc Salt")
+        buffered = next(row for row in rows.rows if row[0] == self.salt)
+        self.assertEqual((buffered[10], buffered[-1]), (55.0, "Salt"))
+
+
+class TestBulkEdits(InventoryDatabaseTestCase):
+    """Test set-based bulk edits over a filter or a selection"""
+
+    def setUp(self):
+        super().setUp()
+        self.drinks = execute_query("INSERT INTO categories (name) VALUES ('Drinks')")
+        self.snacks = execute_query("INSERT INTO categories (name) VALUES ('Snacks')")
+        self.supplier = execute_query("INSERT INTO suppliers (name) VALUES ('Metro')")
+        self.ids = [execute_query("INSERT INTO products (name, category_id, cost_price, selling_price) "
+                                  "VALUES (?, ?, ?, ?)", (f"Bulk {n}", self.drinks if n < 3 else self.snacks,
+                                                          50.0, price))
+                    for n, price in enumerate([100.0, 200.0, 0.5, 80.0])]
+
+    def prices(self, field="selling_price"):
+        return [fetch_one(f"SELECT {field} FROM products WHERE id = ?", (pid,))[0] for pid in self.ids]
+
+    def test_percentage_reprice_over_filter(self):
+        from catalog_bulk import reprice
+        from catalog_grid import CatalogQuery
+        result = reprice(CatalogQuery(category_id=self.drinks), percent=10, updated_by=1)
+        self.assertEqual((result["matched"], result["changed"], result["history"]), (3, 3, 3))
+        self.assertEqual(self.prices(), [110.0, 220.0, 0.55, 80.0])
+        history = fetch_all("SELECT product_id, selling_price, updated_by FROM price_history ORDER BY product_id")
+        self.assertEqual(history, [(self.ids[0], 110.0, 1), (self.ids[1], 220.0, 1), (self.ids[2], 0.55, 1)])
+
+    def test_absolute_change_on_selection_floors_at_zero(self):
+        from catalog_bulk import reprice
+        result = reprice([self.ids[2], self.ids[3], self.ids[3]], amount=-1)
+        self.assertEqual((result["matched"], result["changed"]), (2, 2))
+        self.assertEqual(self.prices(), [100.0, 200.0, 0.0, 79.0])
+        result = reprice([self.ids[2]], amount=-1)
+        self.assertEqual((result["changed"], result["history"]), (0, 0))
+
+    def test_cost_reprice_writes_no_history(self):
+        from catalog_bulk import reprice
+        result = reprice(self.ids, percent=-20, field="cost_price")
+        self.assertEqual((result["changed"], result["history"]), (4, 0))
+        self.assertEqual(self.prices("cost_price"), [40.0] * 4)
+
+    def test_reassign_and_tax_type(self):
+        from catalog_bulk import reassign, set_tax_type
+        from catalog_grid import CatalogQuery
+        result = reassign(self.ids[:2], category_id=self.snacks, supplier_id=self.supplier)
+        self.assertEqual(result["changed"], 2)
+        self.assertEqual(CatalogQuery(category_id=self.snacks, supplier_id=self.supplier).count(), 2)
+        result = set_tax_type(CatalogQuery(category_id=self.snacks), "inclusive")
+        self.assertEqual((result["matched"], result["changed"]), (3, 3))
+        self.assertEqual(set_tax_type(CatalogQuery(category_id=self.snacks), "inclusive")["changed"], 0)
+
+    def test_invalid_requests(self):
+        from catalog_bulk import reassign, reprice, set_tax_type
+        with self.assertRaises(ValueError):
+            reprice(self.ids, percent=5, amount=5)
+        with self.assertRaises(ValueError):
+            reprice(self.ids, percent=5, field="stock")
+        with self.assertRaises(ValueError):
+            reassign(self.ids)
+        with self.assertRaises(ValueError):
+            set_tax_type(self.ids, "zero-rated")
+
+    def test_catalog_index_sees_new_prices(self):
+        from catalog_bulk import reprice
+        from catalog_index import catalog_index
+        execute_query("UPDATE products SET barcode = '7001' WHERE id = ?", (self.ids[0],))
+        catalog_index.ensure_loaded()
+        catalog_index.refresh([self.ids[0]])
+        reprice([self.ids[0]], amount=5)
+        self.assertEqual(catalog_index.lookup("7001")[0][2], 105.0)
+
+
+class TestCategoryTree(InventoryDatabaseTestCase):
+    """Test the category adjacency map and the closure table behind subtree queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.food = self.add_category("Food")
+        self.drinks = self.add_category("Drinks", self.food)
+        self.tea = self.add_category("Tea", self.drinks)
+        self.bakery = self.add_category("Bakery", self.food)
+        self.home = self.add_category("Home")
+
+    def add_category(self, name, parent_id=None):
+        return execute_query("INSERT INTO categories (name, parent_id) VALUES (?, ?)", (name, parent_id))
+
+    def closure(self):
+        return set(fetch_all("SELECT ancestor_id, descendant_id, depth FROM category_closure"))
+
+    def walked_closure(self):
+        """The closure computed by walking parent_id, to compare against."""
+        parents = dict(fetch_all("SELECT id, parent_id FROM categories"))
+        rows = set()
+        for category_id in parents:
+            node, depth = category_id, 0
+            while node is not None:
+                rows.add((node, category_id, depth))
+                node, depth = parents.get(node), depth + 1
+        return rows
+
+    def test_adjacency_map(self):
+        from category_tree import load_tree
+        tree = load_tree()
+        names = [tree.nodes[cid][1] for cid in tree.roots]
+        self.assertIn("Food", names)
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(tree.children_of(self.food), [self.bakery, self.drinks])
+        self.assertTrue(tree.has_children(self.drinks))
+        self.assertFalse(tree.has_children(self.tea))
+        tree.move(self.tea, self.food)
+        self.assertEqual(tree.children_of(self.drinks), [])
+        self.assertIn(self.tea, tree.children_of(self.food))
+
+    def test_closure_follows_inserts_moves_and_deletes(self):
+        from category_tree import ancestor_ids, move_category, subtree_ids
+        self.assertEqual(self.closure(), self.walked_closure())
+        self.assertEqual(subtree_ids(self.food), [self.food, self.drinks, self.bakery, self.tea])
+        self.assertEqual(ancestor_ids(self.tea), [self.drinks, self.food])
+
+        move_category(self.drinks, self.home)      # moves Tea along with it
+        self.assertEqual(self.closure(), self.walked_closure())
+        self.assertEqual(ancestor_ids(self.tea), [self.drinks, self.home])
+        self.assertEqual(subtree_ids(self.food), [self.food, self.bakery])
+
+        move_category(self.drinks, None)
+        self.assertEqual(self.closure(), self.walked_closure())
+        execute_query("DELETE FROM categories WHERE id = ?", (self.tea,))
+        self.assertEqual(self.closure(), self.walked_closure())
+
+    def test_delete_middle_category(self):
+        """Test deleting a category with children moves them up, in the database and the tree"""
+        from category_tree import load_tree, product_count, subtree_ids
+        cup = execute_query("INSERT INTO products (name, category_id) VALUES ('Cup of Tea', ?)", (self.tea,))
+        tree = load_tree()
+        execute_query("DELETE FROM categories WHERE id = ?", (self.drinks,))
+        tree.remove(self.drinks)
+        self.assertEqual(fetch_one("SELECT parent_id FROM categories WHERE id = ?", (self.tea,))[0], self.food)
+        self.assertEqual(self.closure(), self.walked_closure())
+        self.assertEqual(set(subtree_ids(self.food)), {self.food, self.bakery, self.tea})
+        self.assertEqual(product_count(self.food), 1)
+        self.assertEqual(sorted(tree.children_of(self.food)), sorted([self.bakery, self.tea]))
+        self.assertEqual(load_tree().children_of(self.food), tree.children_of(self.food))
+        # A top-level category's children become top-level
+        execute_query("DELETE FROM categories WHERE id = ?", (self.food,))
+        tree.remove(self.food)
+        self.assertEqual(self.closure(), self.walked_closure())
+        self.assertLessEqual({self.home, self.bakery, self.tea}, set(tree.roots))
+        self.assertNotIn(self.food, tree.roots)
+        self.assertEqual(subtree_ids(self.tea), [self.tea])
+        self.assertEqual(fetch_one("SELECT category_id FROM products WHERE id = ?", (cup,))[0], self.tea)
+
+    def test_remove_orphan_shown_as_root(self):
+        """Test an orphan the tree promoted to the top level can be removed"""
+        from category_tree import CategoryTree
+        tree = CategoryTree([(1, "Orphan", 99, None), (2, "Root", None, None)])
+        self.assertEqual(tree.roots, [1, 2])
+        tree.remove(1)
+        self.assertEqual(tree.roots, [2])
+
+    def test_migration_reparents_orphans(self):
+        """Test upgrading re-parents children a pre-12 delete left pointing at a missing category"""
+        from migrations import _m012_category_delete_reparents
+        execute_query("DROP TRIGGER trg_categories_closure_del")
+        execute_query("CREATE TRIGGER trg_categories_closure_del AFTER DELETE ON categories BEGIN "
+                      "DELETE FROM category_closure WHERE descendant_id = OLD.id OR ancestor_id = OLD.id; END")
+        execute_query("DELETE FROM categories WHERE id = ?", (self.drinks,))
+        with database.connection_manager.connection() as conn:
+            _m012_category_delete_reparents(conn.cursor())
+            conn.commit()
+        self.assertEqual(fetch_one("SELECT parent_id FROM categories WHERE id = ?", (self.tea,))[0], self.food)
+        self.assertEqual(self.closure(), self.walked_closure())
+
+    def test_cycles_rejected(self):
+        import sqlite3
+        from category_tree import move_category
+        with self.assertRaises(ValueError):
+            move_category(self.food, self.tea)
+        with self.assertRaises(sqlite3.IntegrityError):
+            execute_query("UPDATE categories SET parent_id = ? WHERE id = ?", (self.tea, self.drinks))
+        self.assertEqual(self.closure(), self.walked_closure())
+
+    def test_migration_backfill(self):
+        from migrations import _m011_category_closure
+        with database.connection_manager.connection() as conn:
+            conn.execute("DELETE FROM category_closure")
+            _m011_category_closure(conn.cursor())
+            conn.commit()
+        self.assertEqual(self.closure(), self.walked_closure())
+
+    def test_subtree_filters(self):
+        from catalog_grid import CatalogQuery
+        from category_tree import product_count
+        from sales_rollup import product_totals
+        cup = execute_query("INSERT INTO products (name, category_id) VALUES ('Cup of Tea', ?)", (self.tea,))
+        execute_query("INSERT INTO products (name, category_id) VALUES ('Bun', ?)", (self.bakery,))
+        broom = execute_query("INSERT INTO products (name, category_id) VALUES ('Broom', ?)", (self.home,))
+        self.assertEqual(product_count(self.food), 2)
+        self.assertEqual(CatalogQuery(category_id=self.food, subcategories=True).count(), 2)
+        self.assertEqual(CatalogQuery(category_id=self.food).count(), 0)
+        # A category without children stays a plain equality on the (category_id, name, id) index
+        leaf = CatalogQuery(category_id=self.tea, subcategories=True)
+        self.assertEqual(leaf.filters["category_id"], self.tea)
+        self.assertEqual(leaf.count(), 1)
+        for product_id in (cup, broom):
+            execute_query("INSERT INTO daily_product_sales (sale_date, product_id, qty, revenue, txn_count) "
+                          "VALUES ('2024-05-01', ?, 2, 100, 1)", (product_id,))
+        self.assertEqual(product_totals("2024-05-01", "2024-05-31", category_id=self.drinks), {cup: (2.0, 1)})
+
+
+if __name__ == "__main__":
+    unittest.main()
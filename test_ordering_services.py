@@ -0,0 +1,414 @@
+"""
+Ordering Services Test Suite
+Tests for the reorder engine and other services behind the ordering screens
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import database
+from database import init_db, execute_query, fetch_one, fetch_all
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class OrderingDatabaseTestCase(unittest.TestCase):
+    """Base class: fresh database with two suppliers and a few products"""
+
+    test_db = "test_ordering_services.db"
+
+    def setUp(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        init_db()
+        self.sup_a = execute_query("INSERT INTO suppliers (name, lead_time_days) VALUES ('Supplier A', 3)")
+        self.sup_b = execute_query("INSERT INTO suppliers (name, lead_time_days) VALUES ('Supplier B', 5)")
+        self.sale_no = 0
+
+    def tearDown(self):
+        database.DB_FILE = self.original_db
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def add_product(self, name, stock, suppliers, cost=10.0):
+        pid = execute_query("INSERT INTO products (name, stock, cost_price, selling_price) VALUES (?, ?, ?, ?)",
+                            (name, stock, cost, cost * 1.2))
+        for sup_id in suppliers:
+            execute_query("INSERT INTO supplier_prices (product_id, supplier_id, cost_price) VALUES (?, ?, ?)",
+                          (pid, sup_id, cost))
+        return pid
+
+    def add_sale(self, days_ago, lines, is_return=0, is_held=0):
+        self.sale_no += 1
+        created = (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d %H:%M:%S")
+        sale_id = execute_query("""
+            INSERT INTO sales (invoice_no, customer_name, total, is_return, is_held, created_at)
+            VALUES (?, 'Walk-in Customer', 0, ?, ?, ?)
+        """, (f"T{self.sale_no}", is_return, is_held, created))
+        for pid, qty in lines:
+            execute_query("INSERT INTO sale_items (sale_id, product_id, quantity, unit_price, total_price) "
+                          "VALUES (?, ?, ?, 1, ?)", (sale_id, pid, qty, qty))
+        return sale_id
+
+
+def legacy_suggestions(start_date, end_date, days_needed, supplier_id=None):
+    """The per-product loop SmartOrderTab.analyze_orders used before the reorder engine"""
+    query = """
+        SELECT p.id, p.name, p.stock, sp.supplier_id FROM products p
+        JOIN supplier_prices sp ON p.id = sp.product_id
+        JOIN suppliers s ON sp.supplier_id = s.id
+        WHERE sp.is_active = 1
+    """
+    params = []
+    if supplier_id:
+        query += " AND s.id = ?"
+        params.append(supplier_id)
+    result = []
+    for product_id, name, stock, sup_id in fetch_all(query, params):
+        total, days = fetch_one("""
+            SELECT SUM(si.quantity), COUNT(DISTINCT DATE(s.created_at))
+            FROM sales s JOIN sale_items si ON s.id = si.sale_id
+            WHERE si.product_id = ? AND DATE(s.created_at) BETWEEN ? AND ?
+              AND s.is_return = 0 AND s.is_held = 0
+        """, (product_id, start_date, end_date))
+        daily = (total or 0) / (days or 1)
+        qty = max(0, round(daily * days_needed - stock, 2))
+        if qty > 0:
+            result.append((product_id, sup_id, qty, daily))
+    return result
+
+
+class TestReorderEngine(OrderingDatabaseTestCase):
+    """Test set-based Smart Order suggestions"""
+
+    def setUp(self):
+        super().setUp()
+        self.rice = self.add_product("Rice", 5, [self.sup_a, self.sup_b])
+        self.tea = self.add_product("Tea", 2, [self.sup_a])
+        self.salt = self.add_product("Salt", 500, [self.sup_b])
+        self.idle = self.add_product("Idle", 0, [self.sup_b])
+        self.add_sale(1, [(self.rice, 10), (self.tea, 3)])
+        self.add_sale(1, [(self.rice, 4)])
+        self.add_sale(3, [(self.rice, 6), (self.salt, 1)], is_held=1)
+        self.add_sale(2, [(self.tea, 50)], is_return=1)
+        self.add_sale(45, [(self.tea, 99)])
+        # The fixture writes sales directly, so bring the rollup up to date
+        from sales_rollup import rebuild
+        rebuild()
+        self.today = datetime.now().date()
+
+    def engine(self, *args, **kwargs):
+        from reorder_engine import suggest_orders
+        return [(i['product_id'], i['supplier_id'], i['suggested_qty'], i['daily_consumption'])
+                for i in suggest_orders(*args, **kwargs)]
+
+    def test_matches_legacy_loop(self):
+        """Test the grouped query gives the per-product loop's suggestions"""
+        for days_back, needed in ((30, 7), (15, 1), (60, 30)):
+            start = self.today - timedelta(days=days_back)
+            self.assertEqual(self.engine(start, self.today, needed),
+                             legacy_suggestions(start, self.today, needed))
+
+    def test_supplier_filter(self):
+        """Test the supplier filter limits rows and sales alike"""
+        start = self.today - timedelta(days=30)
+        for sup in (self.sup_a, self.sup_b):
+            self.assertEqual(self.engine(start, self.today, 7, sup),
+                             legacy_suggestions(start, self.today, 7, sup))
+
+    def test_daily_consumption(self):
+        """Test quantity over distinct sale days, returns and held invoices excluded"""
+        from reorder_engine import product_sales
+        sales = product_sales(self.today - timedelta(days=30), self.today)
+        self.assertEqual(sales[self.rice], (14.0, 1))
+        self.assertEqual(sales[self.tea], (3.0, 1))
+        self.assertNotIn(self.idle, sales)
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not installed")
+class TestForecasting(unittest.TestCase):
+    """Test the vectorized forecast methods on small demand matrices"""
+
+    def setUp(self):
+        from datetime import date
+        self.monday = date(2024, 1, 1)
+        # Product 0 steady, product 1 only sells on Saturdays, product 2 never sold
+        days = 28
+        self.matrix = np.zeros((3, days))
+        self.matrix[0] = 4.0
+        self.matrix[1, 5::7] = 14.0
+
+    def test_moving_average_and_smoothing(self):
+        """Test both levels against a plain loop"""
+        from forecasting import moving_average, exp_smoothing
+        series = [1.0, 5.0, 2.0, 8.0, 3.0]
+        matrix = np.array([series, [0.0] * 5])
+        level = series[0]
+        for x in series[1:]:
+            level = 0.3 * x + 0.7 * level
+        self.assertAlmostEqual(exp_smoothing(matrix, 0.3)[0], level)
+        self.assertEqual(exp_smoothing(matrix, 0.3)[1], 0.0)
+        self.assertAlmostEqual(moving_average(matrix, 3)[0], 13.0 / 3)
+        self.assertAlmostEqual(moving_average(matrix, 50)[0], 19.0 / 5)
+
+    def test_weekday_profile(self):
+        """Test a Saturday-only product gets all its weight on Saturday"""
+        from forecasting import weekday_profile
+        profile = weekday_profile(self.matrix, self.monday)
+        np.testing.assert_allclose(profile[0], np.ones(7))
+        np.testing.assert_allclose(profile[1], [0, 0, 0, 0, 0, 7, 0])
+        np.testing.assert_allclose(profile[2], np.ones(7))
+        np.testing.assert_allclose(weekday_profile(self.matrix[:, :10], self.monday), np.ones((3, 7)))
+
+    def test_seasonal_demand_follows_weekdays(self):
+        """Test the next Monday-Friday expects nothing of a Saturday-only product"""
+        from forecasting import expected_demand
+        rows = np.array([0, 1, 1, 2])
+        horizons = np.array([5, 5, 7, 7])
+        demand = expected_demand(self.matrix, self.monday, "seasonal", rows, horizons)
+        np.testing.assert_allclose(demand, [20.0, 0.0, 14.0, 0.0])
+        flat = expected_demand(self.matrix, self.monday, "moving_average", rows, horizons)
+        np.testing.assert_allclose(flat, [20.0, 10.0, 14.0, 0.0])
+
+    def test_safety_stock(self):
+        """Test steady demand needs none and lead time scales it by sqrt"""
+        from forecasting import safety_stock
+        rows = np.array([0, 1, 1])
+        safety = safety_stock(self.matrix, rows, np.array([4, 1, 4]), service_level=0.95)
+        self.assertEqual(safety[0], 0.0)
+        self.assertGreater(safety[1], 0.0)
+        self.assertAlmostEqual(safety[2], 2 * safety[1])
+
+    def test_candidate_missing_from_matrix(self):
+        """Test a candidate the demand matrix does not cover forecasts no demand"""
+        from forecasting import forecast_items
+        product_ids = np.array([3, 7], dtype=np.int64)
+        matrix = np.zeros((2, 28))
+        matrix[1] = 4.0
+        candidates = [(pid, f"P{pid}", 0.0, None, 1, "Supplier", 10.0, 0) for pid in (5, 7, 9)]
+        items = forecast_items(candidates, product_ids, matrix, self.monday, 7, "moving_average")
+        self.assertEqual([(i['product_id'], i['suggested_qty']) for i in items], [(7, 28.0)])
+        self.assertEqual(forecast_items(candidates, np.array([], dtype=np.int64), np.zeros((0, 28)),
+                                        self.monday, 7, "moving_average"), [])
+
+    def test_unknown_method(self):
+        """Test a typo in the method name is an error, not a zero forecast"""
+        from forecasting import expected_demand
+        with self.assertRaises(ValueError):
+            expected_demand(self.matrix, self.monday, "arima", np.array([0]), np.array([1]))
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not installed")
+class TestForecastOrders(OrderingDatabaseTestCase):
+    """Test forecast suggestions read from the rollup"""
+
+    def setUp(self):
+        super().setUp()
+        from sales_rollup import rebuild
+        self.rice = self.add_product("Rice", 5, [self.sup_a, self.sup_b])
+        self.salt = self.add_product("Salt", 500, [self.sup_b])
+        for days_ago in range(1, 29):
+            self.add_sale(days_ago, [(self.rice, 2)])
+        self.add_sale(3, [(self.salt, 1)])
+        rebuild()
+        self.today = datetime.now().date()
+        self.start = self.today - timedelta(days=27)
+
+    def test_simple_matches_reorder_engine(self):
+        """Test the simple method is the reorder engine's suggestion"""
+        from forecasting import forecast_orders
+        from reorder_engine import suggest_orders
+        self.assertEqual(forecast_orders(self.start, self.today, 7, "simple"),
+                         suggest_orders(self.start, self.today, 7))
+
+    def test_lead_time_covered(self):
+        """Test each supplier row covers its own lead time plus the days needed"""
+        from forecasting import forecast_orders
+        for method in ("moving_average", "exp_smoothing", "seasonal"):
+            items = {i['supplier_id']: i for i in forecast_orders(self.start, self.today, 7, method)}
+            self.assertEqual(set(items), {self.sup_a, self.sup_b}, method)  # salt has enough stock
+            # Today has no sales yet: 27 of the 28 days sold 2
+            rate = 2.0 * 27 / 28 if method == "moving_average" else None
+            for sup_id, lead in ((self.sup_a, 3), (self.sup_b, 5)):
+                item = items[sup_id]
+                self.assertEqual(item['product_id'], self.rice)
+                self.assertEqual(item['lead_time_days'], lead)
+                self.assertAlmostEqual(item['suggested_qty'],
+                                       round(item['forecast_qty'] + item['safety_stock'] - 5, 2))
+                if rate is not None:
+                    self.assertAlmostEqual(item['daily_consumption'], rate)
+                    self.assertAlmostEqual(item['forecast_qty'], rate * (7 + lead))
+
+    def test_supplier_filter(self):
+        """Test only the chosen supplier's rows are forecast"""
+        from forecasting import forecast_orders
+        items = forecast_orders(self.start, self.today, 7, "moving_average", supplier_id=self.sup_a)
+        self.assertEqual([(i['product_id'], i['supplier_id']) for i in items], [(self.rice, self.sup_a)])
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy not installed")
+class TestOrderAnalysis(OrderingDatabaseTestCase):
+    """Test the background analysis that streams rows to the Smart Order tab"""
+
+    def setUp(self):
+        super().setUp()
+        from sales_rollup import rebuild
+        from order_analysis import OrderAnalysis
+        from test_pos_services import FakeRoot
+        self.products = [self.add_product(f"Item {n}", n % 3, [self.sup_a if n % 2 else self.sup_b])
+                         for n in range(12)]
+        for days_ago in range(1, 20):
+            self.add_sale(days_ago, [(pid, 1 + n % 4) for n, pid in enumerate(self.products)])
+        rebuild()
+        self.today = datetime.now().date()
+        self.start = self.today - timedelta(days=30)
+
+        self.root = FakeRoot()
+        self.rows, self.progress, self.done = [], [], []
+        self.analysis = OrderAnalysis(self.root, self.rows.append, lambda *p: self.progress.append(p),
+                                      lambda *d: self.done.append(d), workers=2, chunk_size=2, poll_ms=10)
+
+    def tearDown(self):
+        self.analysis.shutdown()
+        super().tearDown()
+
+    def settle(self, timeout=5):
+        deadline = time.time() + timeout
+        while self.analysis.running and time.time() < deadline:
+            self.root.advance(10)
+            time.sleep(0.002)
+        self.root.advance(100)
+
+    def streamed(self):
+        return sorted((i['product_id'], i['supplier_id'], i['suggested_qty']) for chunk in self.rows for i in chunk)
+
+    def test_streams_same_rows_as_engines(self):
+        """Test chunked, per-supplier results add up to the one-shot suggestions"""
+        from forecasting import forecast_orders
+        for method in ("simple", "seasonal"):
+            del self.rows[:], self.progress[:], self.done[:]
+            self.analysis.start(self.start, self.today, 7, method)
+            self.settle()
+            expected = forecast_orders(self.start, self.today, 7, method)
+            self.assertEqual(self.streamed(), sorted((i['product_id'], i['supplier_id'], i['suggested_qty'])
+                                                     for i in expected))
+            self.assertTrue(all(len(chunk) <= 2 for chunk in self.rows))
+            self.assertEqual(self.progress[0], (0, 2))
+            self.assertEqual(self.progress[-1], (2, 2))
+            stats, error = self.done[0]
+            self.assertIsNone(error)
+            self.assertEqual((stats["suppliers"], stats["rows"]), (2, len(expected)))
+        # Suppliers were computed in worker processes, not threads
+        from concurrent.futures import ProcessPoolExecutor
+        self.assertIsInstance(self.analysis._pool, ProcessPoolExecutor)
+
+    def test_supplier_filter(self):
+        """Test a single supplier is one unit of work"""
+        self.analysis.start(self.start, self.today, 7, "simple", supplier_id=self.sup_a)
+        self.settle()
+        self.assertEqual({i['supplier_id'] for chunk in self.rows for i in chunk}, {self.sup_a})
+        self.assertEqual(self.progress[-1], (1, 1))
+
+    def test_cancel_stops_delivery(self):
+        """Test nothing is delivered after cancel and the later suppliers never run"""
+        import order_analysis
+        gate, started, calls = threading.Event(), threading.Event(), []
+        original = order_analysis.reorder_candidates
+
+        def slow_candidates(supplier_id=None):
+            calls.append(supplier_id)
+            started.set()
+            gate.wait(5)
+            return original(supplier_id)
+
+        order_analysis.reorder_candidates = slow_candidates
+        try:
+            self.analysis.workers = 1
+            self.analysis.start(self.start, self.today, 7, "simple")
+            self.assertTrue(started.wait(5))
+            self.analysis.cancel()
+            gate.set()
+            self.assertFalse(self.analysis.running)
+            self.settle()
+            time.sleep(0.05)
+            self.root.advance(100)
+        finally:
+            order_analysis.reorder_candidates = original
+        self.assertEqual(self.rows, [])
+        self.assertEqual(self.done, [])
+        self.assertEqual(len(calls), 1)
+
+    def test_restart_drops_old_run(self):
+        """Test a second Analyze replaces the first run's rows"""
+        self.analysis.start(self.start, self.today, 7, "simple")
+        self.analysis.start(self.start, self.today, 7, "simple", supplier_id=self.sup_b)
+        self.settle()
+        self.assertEqual({i['supplier_id'] for chunk in self.rows for i in chunk}, {self.sup_b})
+        self.assertEqual(len(self.done), 1)
+
+
+class TestPurchaseOrderService(OrderingDatabaseTestCase):
+    """Test one-transaction PO creation from Smart Order lines"""
+
+    def setUp(self):
+        super().setUp()
+        self.rice = self.add_product("Rice", 0, [self.sup_a, self.sup_b])
+        self.tea = self.add_product("Tea", 0, [self.sup_a])
+
+    def test_one_po_per_supplier(self):
+        """Test lines are grouped, numbered and totalled per supplier"""
+        from purchase_order_service import create_purchase_orders
+        summary = create_purchase_orders([
+            {'supplier_id': self.sup_a, 'product_id': self.rice, 'qty': 10.0, 'cost_price': 2.0},
+            {'supplier_id': self.sup_b, 'product_id': self.rice, 'qty': 5.0, 'cost_price': 3.0},
+            {'supplier_id': self.sup_a, 'product_id': self.tea, 'qty': 4.0, 'cost_price': 5.0},
+            {'supplier_id': self.sup_b, 'product_id': self.tea, 'qty': 0.0, 'cost_price': 5.0},
+        ], created_by=1)
+        self.assertEqual((summary['po_count'], summary['line_count'], summary['total_amount']), (2, 3, 55.0))
+        orders = {o['supplier_id']: o for o in summary['orders']}
+        self.assertEqual((orders[self.sup_a]['lines'], orders[self.sup_a]['total_amount']), (2, 40.0))
+        self.assertNotEqual(orders[self.sup_a]['po_number'], orders[self.sup_b]['po_number'])
+        for order in summary['orders']:
+            header = fetch_one("SELECT po_number, supplier_id, total_amount, status FROM purchase_orders WHERE id = ?",
+                               (order['po_id'],))
+            self.assertEqual(tuple(header), (order['po_number'], order['supplier_id'], order['total_amount'], 'draft'))
+            lines = fetch_one("SELECT COUNT(*), SUM(quantity_ordered * cost_price) FROM po_items WHERE po_id = ?",
+                              (order['po_id'],))
+            self.assertEqual(tuple(lines), (order['lines'], order['total_amount']))
+
+    def test_failure_leaves_no_partial_pos(self):
+        """Test a failing PO rolls back the POs written before it"""
+        from purchase_order_service import save_purchase_orders
+        execute_query("INSERT INTO purchase_orders (po_number, supplier_id) VALUES ('PO-TAKEN', ?)", (self.sup_b,))
+        line = {'product_id': self.rice, 'qty': 1.0, 'cost_price': 1.0}
+        with self.assertRaises(Exception):
+            save_purchase_orders([{'po_number': 'PO-NEW', 'supplier_id': self.sup_a, 'lines': [line]},
+                                  {'po_number': 'PO-TAKEN', 'supplier_id': self.sup_b, 'lines': [line]}], 1)
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM purchase_orders")[0], 1)
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM po_items")[0], 0)
+
+    def test_thousands_of_lines(self):
+        """Test a large run lands completely"""
+        from purchase_order_service import create_purchase_orders
+        suppliers = [execute_query("INSERT INTO suppliers (name) VALUES (?)", (f"Bulk {n}",)) for n in range(10)]
+        lines = [{'supplier_id': suppliers[n % 10], 'product_id': self.rice, 'qty': 1.0, 'cost_price': 1.0}
+                 for n in range(3000)]
+        summary = create_purchase_orders(lines, created_by=1)
+        self.assertEqual((summary['po_count'], summary['line_count']), (10, 3000))
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM po_items")[0], 3000)
+        self.assertEqual(fetch_one("SELECT COUNT(DISTINCT po_number) FROM purchase_orders")[0], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,715 @@
+"""
+POS Services Test Suite
+Tests for the catalog index and other services behind the POS screen
+"""
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import config
+import database
+from database import init_db, execute_query, fetch_one
+
+
+class POSDatabaseTestCase(unittest.TestCase):
+    """Base class: fresh database per test"""
+
+    test_db = "test_pos_services.db"
+
+    def setUp(self):
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        # Keep the per-terminal sale journal out of the real local data dir
+        self.original_local_dir = config.LOCAL_DATA_DIR
+        config.LOCAL_DATA_DIR = tempfile.mkdtemp()
+        init_db()
+
+    def tearDown(self):
+        database.DB_FILE = self.original_db
+        shutil.rmtree(config.LOCAL_DATA_DIR, ignore_errors=True)
+        config.LOCAL_DATA_DIR = self.original_local_dir
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+
+    def add_product(self, name, barcode, price=100.0, stock=10.0):
+        return execute_query("""
+            INSERT INTO products (name, barcode, cost_price, selling_price, stock)
+            VALUES (?, ?, ?, ?, ?)
+        """, (name, barcode, price * 0.8, price, stock))
+
+    def add_variant(self, product_id, name, value, barcode=None):
+        return execute_query("""
+            INSERT INTO product_variants (product_id, variant_name, variant_value, barcode, price, stock)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (product_id, name, value, barcode, 0.0, 0.0))
+
+
+class TestCatalogIndex(POSDatabaseTestCase):
+    """Test the in-memory barcode index"""
+
+    def setUp(self):
+        super().setUp()
+        from catalog_index import CatalogIndex
+        self.index = CatalogIndex()
+
+    def test_lookup_main_barcode(self):
+        """Test that a product barcode resolves to its row"""
+        pid = self.add_product("Tea 250g", "111")
+        self.index.load()
+        rows = self.index.lookup("111")
+        self.assertEqual(rows, [(pid, "Tea 250g", 100.0, 10.0, "111", None)])
+
+    def test_lookup_variant_barcode_and_sizes(self):
+        """Test variant barcodes and one row per Size variant"""
+        pid = self.add_product("Shampoo", "222")
+        self.add_variant(pid, "Size", "Small")
+        self.add_variant(pid, "Size", "Large", barcode="223")
+        self.index.load()
+        rows = self.index.lookup("223")
+        self.assertEqual([r[5] for r in rows], ["Small", "Large"])
+        self.assertEqual({r[0] for r in rows}, {pid})
+
+    def test_duplicate_barcodes(self):
+        """Test that a shared barcode returns every product"""
+        a = self.add_product("Soap A", "333")
+        b = self.add_product("Soap B", "333")
+        self.index.load()
+        self.assertEqual({r[0] for r in self.index.lookup("333")}, {a, b})
+
+    def test_unknown_barcode(self):
+        """Test lookup misses"""
+        self.index.load()
+        self.assertEqual(self.index.lookup("nope"), [])
+
+    def test_refresh_after_price_and_barcode_change(self):
+        """Test incremental refresh picks up edits"""
+        pid = self.add_product("Milk", "444", price=50.0)
+        self.index.load()
+        execute_query("UPDATE products SET selling_price = 60, barcode = '445' WHERE id = ?", (pid,))
+        self.index.refresh([pid])
+        self.assertEqual(self.index.lookup("444"), [])
+        self.assertEqual(self.index.lookup("445")[0][2], 60.0)
+
+    def test_refresh_removes_deleted_product(self):
+        """Test deleted products disappear from the index"""
+        a = self.add_product("Juice A", "555")
+        b = self.add_product("Juice B", "555")
+        self.index.load()
+        execute_query("DELETE FROM products WHERE id = ?", (a,))
+        self.index.refresh([a])
+        self.assertEqual([r[0] for r in self.index.lookup("555")], [b])
+
+    def test_adjust_stock(self):
+        """Test in-place stock deltas after a sale"""
+        pid = self.add_product("Rice", "666", stock=5.0)
+        self.index.load()
+        self.index.adjust_stock({pid: -2.0})
+        self.assertEqual(self.index.lookup("666")[0][3], 3.0)
+
+    def test_reload_when_database_changes(self):
+        """Test the index is not reused across database files"""
+        self.index.load()
+        self.assertTrue(self.index.loaded)
+        database.DB_FILE = "other.db"
+        try:
+            self.assertFalse(self.index.loaded)
+        finally:
+            database.DB_FILE = self.test_db
+
+
+class TestProductSearch(POSDatabaseTestCase):
+    """Test FTS5 product search and the trigram fallback"""
+
+    def setUp(self):
+        super().setUp()
+        self.coke = self.add_product("Coca Cola 1.5L", "8901111", price=180.0)
+        self.cola = self.add_product("Pepsi Cola", "8902222", price=170.0)
+        self.shirt = self.add_product("Polo Shirt", "8903333", price=1500.0)
+        self.add_variant(self.shirt, "Color", "Crimson", barcode="7709999")
+        execute_query("UPDATE products SET company = 'Nestle' WHERE id = ?", (self.cola,))
+
+    def backends(self):
+        from product_search import FTS5Search, TrigramSearch
+        return [FTS5Search(), TrigramSearch()]
+
+    def ids(self, backend, query):
+        return [row[0] for row in backend.search(query, limit=10)]
+
+    def test_fts5_table_built(self):
+        """Test the migration created the FTS5 index"""
+        from product_search import get_search_backend, set_search_backend
+        set_search_backend(None)
+        self.assertEqual(get_search_backend().name, "fts5")
+
+    def test_prefix_matching(self):
+        """Test partial words match product names"""
+        for backend in self.backends():
+            self.assertEqual(set(self.ids(backend, "col")), {self.coke, self.cola}, backend.name)
+            self.assertEqual(self.ids(backend, "coca co"), [self.coke], backend.name)
+
+    def test_name_ranked_first(self):
+        """Test a name hit outranks company or variant hits"""
+        execute_query("UPDATE products SET company = 'Pepsico' WHERE id = ?", (self.shirt,))
+        for backend in self.backends():
+            self.assertEqual(self.ids(backend, "peps")[0], self.cola, backend.name)
+
+    def test_company_barcode_and_variants(self):
+        """Test company, barcode and variant values are searchable"""
+        for backend in self.backends():
+            self.assertEqual(self.ids(backend, "nestle"), [self.cola], backend.name)
+            self.assertEqual(self.ids(backend, "89022"), [self.cola], backend.name)
+            self.assertEqual(self.ids(backend, "crims"), [self.shirt], backend.name)
+            self.assertEqual(self.ids(backend, "77099"), [self.shirt], backend.name)
+
+    def test_rows_carry_selling_price(self):
+        """Test rows are (id, name, price, barcode)"""
+        for backend in self.backends():
+            self.assertEqual(backend.search("pepsi"), [(self.cola, "Pepsi Cola", 170.0, "8902222")])
+
+    def test_triggers_follow_edits(self):
+        """Test updates and deletes reach the FTS index"""
+        from product_search import FTS5Search
+        fts = FTS5Search()
+        execute_query("UPDATE products SET name = 'Sprite 1.5L' WHERE id = ?", (self.coke,))
+        self.assertEqual(self.ids(fts, "sprite"), [self.coke])
+        self.assertEqual(self.ids(fts, "coca"), [])
+        execute_query("DELETE FROM product_variants WHERE product_id = ?", (self.shirt,))
+        self.assertEqual(self.ids(fts, "crimson"), [])
+        execute_query("DELETE FROM products WHERE id = ?", (self.cola,))
+        self.assertEqual(self.ids(fts, "pepsi"), [])
+
+    def test_trigram_refresh(self):
+        """Test the fallback index follows catalog refreshes"""
+        from product_search import TrigramSearch
+        trigram = TrigramSearch()
+        trigram.load()
+        execute_query("UPDATE products SET name = 'Sprite 1.5L' WHERE id = ?", (self.coke,))
+        trigram.refresh([self.coke])
+        self.assertEqual(self.ids(trigram, "sprite"), [self.coke])
+        self.assertEqual(self.ids(trigram, "coca"), [])
+
+    def test_punctuation_is_safe(self):
+        """Test FTS syntax characters in the query do not raise"""
+        for backend in self.backends():
+            self.assertEqual(backend.search('"'), [])
+            self.assertEqual(self.ids(backend, 'cola" OR *'), [])
+
+
+class TestSalesService(POSDatabaseTestCase):
+    """Test the single-transaction sale writer"""
+
+    def setUp(self):
+        super().setUp()
+        self.tea = self.add_product("Tea", "901", price=100.0, stock=20.0)
+        self.milk = self.add_product("Milk", "902", price=50.0, stock=10.0)
+
+    def cart(self):
+        return [
+            {'id': self.tea, 'name': "Tea", 'price': 100.0, 'qty': 2.0, 'total': 200.0},
+            {'id': self.milk, 'name': "Milk", 'price': 50.0, 'qty': 1.0, 'total': 50.0},
+            {'id': self.tea, 'name': "Tea", 'price': 100.0, 'qty': 1.0, 'total': 100.0},
+        ]
+
+    def stock(self, pid):
+        return fetch_one("SELECT stock FROM products WHERE id = ?", (pid,))[0]
+
+    def test_sale_written_with_stock(self):
+        """Test header, lines and grouped stock decrements"""
+        from sales_service import save_sale
+        sale_id = save_sale("INV-T1", "Walk-in Customer", self.cart(), 1, discount=10.0)
+        header = fetch_one("SELECT total, discount, is_held FROM sales WHERE id = ?", (sale_id,))
+        self.assertEqual(header, (340.0, 10.0, 0))
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM sale_items WHERE sale_id = ?", (sale_id,))[0], 3)
+        self.assertEqual(self.stock(self.tea), 17.0)
+        self.assertEqual(self.stock(self.milk), 9.0)
+
+    def test_held_invoice_keeps_stock(self):
+        """Test held invoices store lines without touching stock"""
+        from sales_service import save_sale
+        sale_id = save_sale("INV-T2", "Walk-in Customer", self.cart(), 1, is_held=True)
+        self.assertEqual(fetch_one("SELECT is_held FROM sales WHERE id = ?", (sale_id,))[0], 1)
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM sale_items WHERE sale_id = ?", (sale_id,))[0], 3)
+        self.assertEqual(self.stock(self.tea), 20.0)
+
+    def test_return_lines_restock(self):
+        """Test negative quantities (returns) add stock and default the line total"""
+        from sales_service import save_sale
+        save_sale("INV-T3", "Walk-in Customer", [{'id': self.milk, 'price': 50.0, 'qty': -2.0}], 1)
+        self.assertEqual(self.stock(self.milk), 12.0)
+        self.assertEqual(fetch_one("SELECT total_price FROM sale_items")[0], -100.0)
+
+    def test_failure_rolls_back_everything(self):
+        """Test a failing sale leaves no header, lines or stock change"""
+        from sales_service import save_sale
+        save_sale("INV-T4", "Walk-in Customer", self.cart(), 1)
+        with self.assertRaises(Exception):
+            save_sale("INV-T4", "Walk-in Customer", self.cart(), 1)  # duplicate invoice_no
+        bad_cart = self.cart() + [{'id': self.milk, 'price': 50.0}]
+        with self.assertRaises(KeyError):
+            save_sale("INV-T5", "Walk-in Customer", bad_cart, 1)
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM sales WHERE invoice_no LIKE 'INV-T%'")[0], 1)
+        self.assertEqual(self.stock(self.tea), 17.0)
+
+
+class TestSaleJournal(POSDatabaseTestCase):
+    """Test the fsync'd sale journal and its replay"""
+
+    def setUp(self):
+        super().setUp()
+        from sale_journal import SaleJournal
+        self.tea = self.add_product("Tea", "911", price=100.0, stock=50.0)
+        self.journal = SaleJournal(batch_size=2, retry_delay=0.05)
+
+    def tearDown(self):
+        self.journal.stop()
+        super().tearDown()
+
+    def record(self, invoice_no, qty=1.0):
+        return self.journal.record_sale(invoice_no, "Walk-in Customer",
+                                        [{'id': self.tea, 'price': 100.0, 'qty': qty}], 1)
+
+    def sales(self):
+        return fetch_one("SELECT COUNT(*) FROM sales WHERE invoice_no LIKE 'J%'")[0]
+
+    def test_journal_is_local_per_terminal(self):
+        """Test the default journal sits in the local data dir, one per terminal"""
+        from sale_journal import SaleJournal
+        self.record("J1")
+        path = self.journal.path
+        self.assertEqual(os.path.dirname(path), config.LOCAL_DATA_DIR)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(os.path.abspath(self.test_db) + ".journal"))
+        original = config.TERMINAL_ID
+        try:
+            config.TERMINAL_ID = "T2"
+            other = SaleJournal()
+            self.assertNotEqual(other.path, path)
+            self.assertEqual(other.pending(), 0)
+        finally:
+            config.TERMINAL_ID = original
+
+    def test_encode_roundtrip_and_crc(self):
+        """Test records survive encoding and corruption is detected"""
+        from sale_journal import encode, decode
+        from sales_service import make_sale
+        sale = make_sale("J1", "Ali | 0300", [{'id': 1, 'price': 2.5, 'qty': 2.0}], 1, discount=0.5)
+        record = encode(sale)
+        self.assertEqual(decode(record), sale)
+        self.assertIsNone(decode(record[:-5] + b"\n"))
+        self.assertIsNone(decode(record.replace(b"Ali", b"Alx")))
+
+    def test_replay_writes_sales_and_stock(self):
+        """Test journaled sales reach the database in batches"""
+        for n in range(5):
+            self.record(f"J{n}")
+        self.assertEqual(self.sales(), 0)
+        self.assertEqual(self.journal.replay(), (5, 0))
+        self.assertEqual(self.sales(), 5)
+        self.assertEqual(fetch_one("SELECT stock FROM products WHERE id = ?", (self.tea,))[0], 45.0)
+        self.assertEqual(self.journal.stats()["batches"], 3)
+        self.assertEqual(os.path.getsize(self.journal.path), 0)  # compacted
+
+    def test_replay_is_idempotent(self):
+        """Test a sale committed before a crash is not written twice"""
+        from sales_service import save_sales
+        first = self.record("J1")
+        self.record("J2")
+        save_sales([first])  # committed, but the checkpoint never moved
+        self.assertEqual(self.journal.replay(), (1, 1))
+        self.assertEqual(self.journal.replay(), (0, 0))
+        self.assertEqual(self.sales(), 2)
+        self.assertEqual(fetch_one("SELECT stock FROM products WHERE id = ?", (self.tea,))[0], 48.0)
+
+    def test_crash_during_compaction(self):
+        """Test a crash at either step of compaction loses no sales and writes none twice"""
+        from unittest import mock
+        from sale_journal import SaleJournal
+        real_open, real_save = open, SaleJournal._save_checkpoint
+
+        def fail_truncate(path, mode="r", *args, **kwargs):
+            if mode == "r+b":
+                raise OSError("simulated crash")
+            return real_open(path, mode, *args, **kwargs)
+
+        def fail_checkpoint_reset(journal, offset):
+            if offset == 0:
+                raise OSError("simulated crash")
+            return real_save(journal, offset)
+
+        crashes = [mock.patch("builtins.open", fail_truncate),
+                   mock.patch.object(SaleJournal, "_save_checkpoint", autospec=True,
+                                     side_effect=fail_checkpoint_reset)]
+        expected_stock = 50.0
+        for n, crash in enumerate(crashes):
+            self.record(f"J{n}a")
+            self.record(f"J{n}b")
+            with crash:
+                with self.assertRaises(OSError):
+                    self.journal.replay()
+            # After the restart more sales are journaled than the old checkpoint covered
+            restarted = SaleJournal(batch_size=2)
+            for m in range(4):
+                restarted.record_sale(f"J{n}c{m}", "Walk-in Customer",
+                                      [{'id': self.tea, 'price': 100.0, 'qty': 1.0}], 1)
+            restarted.replay()
+            expected_stock -= 6
+            self.assertEqual(self.sales(), 6 * (n + 1))
+            self.assertEqual(fetch_one("SELECT stock FROM products WHERE id = ?", (self.tea,))[0], expected_stock)
+            self.assertFalse(os.path.exists(self.journal.path + ".corrupt"))
+
+    def test_torn_tail_moved_aside(self):
+        """Test a half-written record does not block later sales"""
+        from sale_journal import SaleJournal
+        self.record("J1")
+        with open(self.journal.path, "ab") as f:
+            f.write(b"0badc0de [[\"J-torn")
+        restarted = SaleJournal(batch_size=2)
+        restarted.record_sale("J2", "Walk-in Customer", [{'id': self.tea, 'price': 100.0, 'qty': 1.0}], 1)
+        self.assertEqual(restarted.pending(), 2)
+        self.assertEqual(restarted.replay(), (2, 0))
+        with open(self.journal.path + ".corrupt", "rb") as f:
+            self.assertIn(b"J-torn", f.read())
+
+    def test_rejected_sale_quarantined(self):
+        """Test a sale the database rejects is set aside and the rest still replay"""
+        from sale_journal import read_records
+        self.record("J1")
+        self.journal.record_sale("J2", "Walk-in Customer", [{'id': self.tea, 'price': 100.0, 'qty': 1.0}], 1,
+                                 payment_method="voucher")  # fails the payment_method CHECK
+        self.record("J3")
+        self.assertEqual(self.journal.replay(), (2, 0))
+        self.assertEqual(self.sales(), 2)
+        self.assertEqual([sale['invoice_no'] for _, sale in read_records(self.journal.quarantine_path)], ["J2"])
+        self.assertEqual(self.journal.pending(), 0)
+        self.assertEqual(self.journal.stats()["quarantined"], 1)
+        reported = self.journal.take_quarantined()
+        self.assertEqual([invoice_no for invoice_no, _ in reported], ["J2"])
+        self.assertIn("CHECK", reported[0][1])
+        self.assertEqual(self.journal.take_quarantined(), [])
+
+    def test_locked_database_retried(self):
+        """Test a locked database leaves the batch in the journal for the next replay"""
+        import sqlite3
+        from unittest import mock
+        self.record("J1")
+        with mock.patch("sale_journal.save_sales", side_effect=sqlite3.OperationalError("database is locked")):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.journal.replay()
+        self.assertEqual(self.journal.pending(), 1)
+        self.assertEqual(self.journal.replay(), (1, 0))
+        self.assertFalse(os.path.exists(self.journal.quarantine_path))
+
+    def test_background_writer(self):
+        """Test the writer thread drains the journal"""
+        self.journal.start()
+        self.record("J1")
+        self.record("J2")
+        deadline = time.time() + 5
+        while self.sales() < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self.sales(), 2)
+
+
+class TestSalesRollup(POSDatabaseTestCase):
+    """Test the daily_product_sales rollup kept by the sale writer"""
+
+    def setUp(self):
+        super().setUp()
+        self.tea = self.add_product("Tea", "921", price=100.0, stock=50.0)
+        self.milk = self.add_product("Milk", "922", price=50.0, stock=50.0)
+
+    def sale(self, invoice_no, lines, created_at, is_held=False):
+        from sales_service import make_sale
+        sale = make_sale(invoice_no, "Walk-in Customer", lines, 1, is_held=is_held)
+        sale['created_at'] = created_at
+        return sale
+
+    def rollup(self):
+        rows = database.fetch_all("""
+            SELECT sale_date, product_id, qty, revenue, return_qty, txn_count
+            FROM daily_product_sales ORDER BY sale_date, product_id
+        """)
+        return [tuple(row) for row in rows]
+
+    def write_history(self):
+        from sales_service import save_sales
+        tea, milk = self.tea, self.milk
+        save_sales([
+            self.sale("R1", [{'id': tea, 'price': 100.0, 'qty': 2.0},
+                             {'id': tea, 'price': 100.0, 'qty': 1.0},
+                             {'id': milk, 'price': 50.0, 'qty': 1.0}], "2024-03-01 09:15:00"),
+            self.sale("R2", [{'id': milk, 'price': 50.0, 'qty': -2.0}], "2024-03-01 18:40:00"),
+            self.sale("R3", [{'id': tea, 'price': 100.0, 'qty': 4.0}], "2024-03-02 10:00:00"),
+            self.sale("R4", [{'id': tea, 'price': 100.0, 'qty': 9.0}], "2024-03-02 11:00:00", is_held=True),
+        ])
+
+    def test_incremental_totals(self):
+        """Test one row per day and product; returns and held invoices handled"""
+        self.write_history()
+        self.assertEqual(self.rollup(), [
+            ("2024-03-01", self.tea, 3.0, 300.0, 0.0, 1),
+            ("2024-03-01", self.milk, -1.0, -50.0, 2.0, 2),
+            ("2024-03-02", self.tea, 4.0, 400.0, 0.0, 1),
+        ])
+
+    def test_rebuild_matches_incremental(self):
+        """Test a full and a ranged rebuild reproduce the incremental rows"""
+        from datetime import date
+        from sales_rollup import rebuild
+        self.write_history()
+        incremental = self.rollup()
+        execute_query("DELETE FROM daily_product_sales")
+        self.assertEqual(rebuild(), 3)
+        self.assertEqual(self.rollup(), incremental)
+        execute_query("UPDATE daily_product_sales SET qty = 0")
+        self.assertEqual(rebuild(date(2024, 3, 2), date(2024, 3, 2)), 1)
+        self.assertEqual(self.rollup()[2], incremental[2])
+        self.assertEqual(self.rollup()[0][2], 0)  # outside the range, untouched
+
+    def test_migration_backfills_existing_sales(self):
+        """Test upgrading a database with sales history fills the rollup"""
+        self.write_history()
+        expected = self.rollup()
+        execute_query("DROP TABLE daily_product_sales")
+        execute_query("PRAGMA user_version = 5")
+        init_db()
+        self.assertEqual(self.rollup(), expected)
+
+    def test_journal_keeps_sale_time(self):
+        """Test replayed sales keep the time they were recorded"""
+        from sale_journal import SaleJournal
+        journal = SaleJournal()
+        sale = journal.record_sale("R9", "Walk-in Customer", [{'id': self.tea, 'price': 100.0, 'qty': 1.0}], 1)
+        journal.replay()
+        self.assertEqual(fetch_one("SELECT created_at FROM sales WHERE invoice_no = 'R9'")[0], sale['created_at'])
+        self.assertEqual(self.rollup(), [(sale['created_at'][:10], self.tea, 1.0, 100.0, 0.0, 1)])
+
+
+class TestSequenceService(POSDatabaseTestCase):
+    """Test block-allocated document numbers"""
+
+    def service(self, terminal="T1", block_size=10):
+        from sequences import SequenceService
+        return SequenceService(terminal, block_size=block_size)
+
+    def test_numbers_unique_with_one_reservation_per_block(self):
+        """Test numbers come from memory between block reservations"""
+        seq = self.service(block_size=10)
+        numbers = [seq.next_number("INV") for _ in range(25)]
+        self.assertEqual(numbers[0], "INV-T1-0000001")
+        self.assertEqual(len(set(numbers)), 25)
+        self.assertEqual(seq.reservations, 3)
+        self.assertEqual(seq.high_water("INV"), 30)
+
+    def test_types_and_terminals_independent(self):
+        """Test each terminal and document type has its own sequence"""
+        till1, till2 = self.service("T1"), self.service("T2")
+        self.assertEqual(till1.next_number("PO"), "PO-T1-0000001")
+        self.assertEqual(till1.next_number("GR"), "GR-T1-0000001")
+        self.assertEqual(till2.next_number("PO"), "PO-T2-0000001")
+
+    def test_restart_never_reuses(self):
+        """Test a new process continues past the persisted high-water mark"""
+        first = self.service()
+        used = [first.next_value("INV") for _ in range(3)]
+        restarted = self.service()
+        self.assertGreater(restarted.next_value("INV"), max(used))
+
+    def test_concurrent_callers(self):
+        """Test threads and two processes on one terminal never collide"""
+        a, b = self.service(block_size=7), self.service(block_size=7)
+        results = []
+
+        def worker(seq):
+            values = [seq.next_value("INV") for _ in range(300)]
+            results.extend(values)
+
+        threads = [threading.Thread(target=worker, args=(seq,)) for seq in (a, a, b, b)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(results), 1200)
+        self.assertEqual(len(set(results)), 1200)
+
+
+class TestCart(unittest.TestCase):
+    """Test the keyed cart model and its change events"""
+
+    def setUp(self):
+        from cart import Cart
+        self.cart = Cart()
+        self.events = []
+        self.cart.subscribe(lambda event, key, line: self.events.append((event, key)))
+
+    def test_rescan_tops_up_line(self):
+        """Test scanning the same product again updates one line"""
+        self.cart.add(1, "Tea", 100.0)
+        self.cart.add(1, "Tea", 100.0)
+        self.assertEqual(len(self.cart), 1)
+        self.assertEqual(self.cart.get(1)['qty'], 2.0)
+        self.assertEqual(self.events, [('add', (1, None)), ('update', (1, None))])
+
+    def test_variants_are_separate_lines(self):
+        """Test (product_id, variant_id) keys"""
+        self.cart.add(1, "Shirt S", 500.0, variant_id=10)
+        self.cart.add(1, "Shirt L", 550.0, variant_id=11)
+        self.assertEqual(len(self.cart), 2)
+        self.assertIn((1, 11), self.cart)
+
+    def test_running_subtotal(self):
+        """Test subtotal follows adds, quantity changes and removals"""
+        self.cart.add(1, "Tea", 100.0, qty=2.0)
+        self.cart.add(2, "Milk", 50.0)
+        self.assertEqual(self.cart.subtotal, 250.0)
+        self.cart.set_qty(2, 3.0)
+        self.assertEqual(self.cart.subtotal, 350.0)
+        self.cart.remove(1)
+        self.assertEqual(self.cart.subtotal, 150.0)
+        self.cart.set_qty(2, 0)
+        self.assertEqual((len(self.cart), self.cart.subtotal), (0, 0.0))
+        self.assertEqual(self.events[-1], ('remove', (2, None)))
+
+    def test_lines_match_sale_service(self):
+        """Test iteration yields scan-ordered dicts with totals"""
+        self.cart.add(2, "Milk", 50.0)
+        self.cart.add(1, "Tea", None)
+        self.assertEqual([(l['id'], l['total']) for l in self.cart], [(2, 50.0), (1, 0.0)])
+        self.cart.clear()
+        self.assertFalse(self.cart)
+        self.assertEqual(self.events[-1], ('clear', None))
+
+    def test_large_basket(self):
+        """Test thousands of lines stay keyed and summed"""
+        for pid in range(5000):
+            self.cart.add(pid, f"P{pid}", 1.0)
+        for pid in range(5000):
+            self.cart.add(pid, f"P{pid}", 1.0)
+        self.assertEqual(len(self.cart), 5000)
+        self.assertEqual(self.cart.subtotal, 10000.0)
+
+
+class FakeRoot:
+    """Stands in for Tk: after() callbacks run when the test calls advance()"""
+
+    def __init__(self):
+        self.now = 0
+        self.timers = {}
+        self.next_id = 0
+
+    def after(self, ms, func):
+        self.next_id += 1
+        self.timers[self.next_id] = (self.now + ms, func)
+        return self.next_id
+
+    def after_cancel(self, timer_id):
+        self.timers.pop(timer_id, None)
+
+    def advance(self, ms):
+        self.now += ms
+        while True:
+            due = sorted((t, i) for i, (t, _) in self.timers.items() if t <= self.now)
+            if not due:
+                return
+            func = self.timers.pop(due[0][1])[1]
+            func()
+
+
+class TestSearchExecutor(unittest.TestCase):
+    """Test the debounced background search pipeline"""
+
+    def setUp(self):
+        from search_executor import SearchExecutor
+        self.root = FakeRoot()
+        self.delivered = []
+        self.ran = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+        def search(query):
+            self.gate.wait(5)
+            self.ran.append(query)
+            return [query.upper()]
+
+        self.executor = SearchExecutor(self.root, search, lambda q, rows: self.delivered.append((q, rows)),
+                                       delay_ms=100, poll_ms=10)
+
+    def tearDown(self):
+        self.gate.set()
+        self.executor.shutdown()
+
+    def settle(self, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            self.root.advance(10)
+            if self.executor._timer is None and self.executor._in_flight == 0 and not self.executor._job:
+                return
+            time.sleep(0.005)
+
+    def test_debounce_runs_last_query_only(self):
+        """Test fast typing collapses into one query"""
+        for query in ("sh", "sha", "sham", "shamp"):
+            self.executor.submit(query)
+            self.root.advance(30)
+        self.settle()
+        self.assertEqual(self.ran, ["shamp"])
+        self.assertEqual(self.delivered, [("shamp", ["SHAMP"])])
+        stats = self.executor.stats()
+        self.assertEqual(stats["debounced"], 3)
+        self.assertEqual(stats["cancelled"], 3)
+        self.assertIn("avg_query_ms", stats)
+
+    def test_stale_result_dropped(self):
+        """Test a result for a superseded query is not delivered"""
+        self.gate.clear()
+        self.executor.submit("tea")
+        self.root.advance(100)          # "tea" starts and blocks on the gate
+        self.executor.submit("teab")
+        self.gate.set()
+        self.settle()
+        self.assertEqual([q for q, _ in self.delivered], ["teab"])
+        self.assertEqual(self.executor.stats()["stale"], 1)
+
+    def test_cancel_drops_pending(self):
+        """Test clearing the entry cancels the pending query"""
+        self.executor.submit("milk")
+        self.executor.cancel()
+        self.root.advance(200)
+        self.settle()
+        self.assertEqual(self.ran, [])
+        self.assertEqual(self.delivered, [])
+
+    def test_errors_counted(self):
+        """Test a failing search does not kill the worker"""
+        from search_executor import SearchExecutor
+        self.executor.shutdown()
+        calls = []
+
+        def search(query):
+            calls.append(query)
+            if query == "bad":
+                raise RuntimeError("boom")
+            return []
+
+        self.executor = SearchExecutor(self.root, search, lambda q, rows: self.delivered.append(q),
+                                       delay_ms=100, poll_ms=10)
+        self.executor.submit("bad")
+        self.root.advance(100)
+        self.settle()
+        self.executor.submit("good")
+        self.root.advance(100)
+        self.settle()
+        self.assertEqual(self.delivered, ["good"])
+        self.assertEqual(self.executor.stats()["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
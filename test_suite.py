@@ -700,6 +700,153 @@ class TestDataIntegrity(unittest.TestCase):
         self.assertIn('manager', valid_roles)
 
 
+class TestConnectionManager(unittest.TestCase):
+    """Test pooled connection reuse"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.test_db = "test_pool.db"
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        import database
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        init_db()
+    
+    def tearDown(self):
+        """Clean up test database"""
+        import database
+        database.DB_FILE = self.original_db
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+    
+    def test_connection_reused(self):
+        """Test that helpers reuse the same thread connection"""
+        import database
+        before = database.connection_stats()
+        for _ in range(10):
+            fetch_one("SELECT COUNT(*) FROM users")
+        after = database.connection_stats()
+        self.assertEqual(after["opened"], before["opened"])
+        self.assertEqual(after["reused"] - before["reused"], 10)
+        self.assertEqual(after["checkouts"] - before["checkouts"], after["checkins"] - before["checkins"])
+    
+    def test_wal_enabled(self):
+        """Test that pooled connections use WAL journaling"""
+        mode = fetch_one("PRAGMA journal_mode")[0]
+        self.assertEqual(mode.lower(), "wal")
+    
+    def test_close_returns_to_pool(self):
+        """Test that closing a wrapped connection keeps it open for reuse"""
+        conn = get_db_connection()
+        conn.execute("INSERT INTO categories (name) VALUES ('Uncommitted')")
+        conn.close()
+        # Uncommitted work is discarded on release, like a real close()
+        count = fetch_one("SELECT COUNT(*) FROM categories WHERE name = 'Uncommitted'")[0]
+        self.assertEqual(count, 0)
+    
+    def test_reopens_after_file_replaced(self):
+        """Test that a deleted database file is not served from a stale connection"""
+        fetch_one("SELECT 1")
+        os.remove(self.test_db)
+        init_db()
+        self.assertTrue(os.path.exists(self.test_db))
+        self.assertGreaterEqual(fetch_one("SELECT COUNT(*) FROM users")[0], 2)
+
+
+class TestSecondaryIndexes(unittest.TestCase):
+    """Test the secondary index set on hot lookup columns"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.test_db = "test_indexes.db"
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        import database
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        init_db()
+    
+    def tearDown(self):
+        """Clean up test database"""
+        import database
+        database.DB_FILE = self.original_db
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+    
+    def _index_names(self):
+        return {row[0] for row in fetch_all("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    
+    def test_indexes_created(self):
+        """Test that init_db creates every index in the set"""
+        import database
+        names = self._index_names()
+        for name, _ in database.INDEXES:
+            self.assertIn(name, names)
+    
+    def test_existing_database_upgraded(self):
+        """Test that an older store.db without indexes is upgraded on startup"""
+        import database
+        for name, _ in database.INDEXES:
+            execute_query(f"DROP INDEX {name}")
+        execute_query("PRAGMA user_version = 0")
+        init_db()
+        self.assertTrue({name for name, _ in database.INDEXES} <= self._index_names())
+    
+    def test_barcode_lookup_uses_index(self):
+        """Test that the POS barcode lookup is not a full table scan"""
+        plan = fetch_all("EXPLAIN QUERY PLAN SELECT id FROM products WHERE barcode = ?", ("123",))
+        self.assertIn("idx_products_barcode", " ".join(row[-1] for row in plan))
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """Test versioned schema migrations"""
+    
+    def setUp(self):
+        """Set up test database"""
+        self.test_db = "test_migrations.db"
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+        import database
+        self.original_db = database.DB_FILE
+        database.DB_FILE = self.test_db
+        init_db()
+    
+    def tearDown(self):
+        """Clean up test database"""
+        import database
+        database.DB_FILE = self.original_db
+        if os.path.exists(self.test_db):
+            os.remove(self.test_db)
+    
+    def test_schema_version_current(self):
+        """Test that a fresh database is stamped with the latest version"""
+        from migrations import SCHEMA_VERSION
+        self.assertEqual(fetch_one("PRAGMA user_version")[0], SCHEMA_VERSION)
+    
+    def test_missing_tables_created(self):
+        """Test tables the GUI queries are now created"""
+        for table in ("supplier_prices", "price_history", "supplier_reps"):
+            row = fetch_one("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table,))
+            self.assertIsNotNone(row, table)
+    
+    def test_rerun_is_noop(self):
+        """Test that launching again does not duplicate seed rows"""
+        counts = [fetch_one(f"SELECT COUNT(*) FROM {t}")[0] for t in ("suppliers", "products", "taxes")]
+        init_db()
+        init_db()
+        self.assertEqual(counts, [fetch_one(f"SELECT COUNT(*) FROM {t}")[0] for t in ("suppliers", "products", "taxes")])
+    
+    def test_legacy_database_upgraded(self):
+        """Test that a pre-migration store.db keeps its data and gains new tables"""
+        execute_query("DROP TABLE supplier_prices")
+        execute_query("PRAGMA user_version = 0")
+        suppliers = fetch_one("SELECT COUNT(*) FROM suppliers")[0]
+        init_db()
+        self.assertEqual(fetch_one("SELECT COUNT(*) FROM suppliers")[0], suppliers)
+        self.assertIsNotNone(fetch_one("SELECT name FROM sqlite_master WHERE name='supplier_prices'"))
+
+
 def run_tests_and_generate_report():
     """Run all tests and generate a comprehensive report"""
     
@@ -723,7 +870,10 @@ def run_tests_and_generate_report():
         TestInventoryManagement,
         TestPurchaseOrders,
         TestGoodsReceipt,
-        TestDataIntegrity
+        TestDataIntegrity,
+        TestConnectionManager,
+        TestSecondaryIndexes,
+        TestSchemaMigrations
     ]
     
     for test_class in test_classes:
@@ -757,7 +907,10 @@ def run_tests_and_generate_report():
         "Inventory Management": "✅ Complete",
         "Purchase Orders": "✅ Complete",
         "Goods Receipt": "✅ Partial",
-        "Data Integrity": "✅ Complete"
+        "Data Integrity": "✅ Complete",
+        "Connection Manager": "✅ Complete",
+        "Secondary Indexes": "✅ Complete",
+        "Schema Migrations": "✅ Complete"
     }
     
     for module, status in modules_tested.items():